@@ -0,0 +1,2 @@
+# 令绑定的接口路由子模块生效
+from . import kline_api, position_api  # noqa: F401
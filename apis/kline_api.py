@@ -0,0 +1,78 @@
+import json
+from flask import request, Response
+from flask_login import current_user
+
+from server import app
+from utils.kline_service import (
+    get_sync_watermark,
+    build_kline_payload,
+    kline_payload_cache,
+)
+
+
+def _json_response(body, status=200):
+    return Response(body, status=status, mimetype="application/json")
+
+
+@app.server.route("/api/kline/<stock_code>")
+def kline_api(stock_code):
+    """个股日K线数据接口，支持 ETag/Last-Modified 条件请求与预压缩响应"""
+
+    # 登录状态校验
+    if not current_user.is_authenticated:
+        return _json_response('{"code":401,"msg":"unauthorized","data":[]}', 401)
+
+    try:
+        return _kline_response(stock_code)
+    except Exception as e:
+        # 与其他状态一致返回 JSON，前端可统一解析并提示
+        print(f"【K线接口】{stock_code} 查询失败: {e}")
+        return _json_response(
+            json.dumps({"code": 500, "msg": str(e), "data": []}, ensure_ascii=False), 500
+        )
+
+
+def _kline_response(stock_code):
+    """按同步水位处理条件请求，返回 304 或 (预压缩的) K线数据"""
+    stock_code = stock_code.strip().upper()
+    watermark = get_sync_watermark(stock_code)
+
+    # 无数据时直接返回，不参与缓存
+    if not watermark[0]:
+        return _json_response('{"code":204,"msg":"data not found","data":[]}')
+
+    etag, last_modified = kline_payload_cache.make_validators(stock_code, watermark)
+
+    # 条件请求：If-None-Match 优先，其次 If-Modified-Since
+    not_modified = (
+        request.if_none_match.contains(etag)
+        if request.if_none_match
+        else bool(
+            request.if_modified_since and request.if_modified_since >= last_modified
+        )
+    )
+
+    if not_modified:
+        response = Response(status=304)
+    else:
+        cached = kline_payload_cache.get(stock_code, etag)
+        if cached is None:
+            cached = kline_payload_cache.put(
+                stock_code, etag, build_kline_payload(stock_code)
+            )
+        raw, compressed = cached
+
+        # 客户端支持gzip时直接返回预压缩内容
+        # 已设置Content-Encoding的响应会被flask-compress跳过，不会重复压缩
+        if "gzip" in request.accept_encodings:
+            response = _json_response(compressed)
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = _json_response(raw)
+        response.headers["Vary"] = "Accept-Encoding"
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # 允许浏览器缓存，但每次使用前需向服务端校验
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,25 @@
+import json
+from flask import request, Response
+from flask_login import current_user
+
+from server import app
+from utils.position_engine import position_engine, attach_market_prices
+
+
+@app.server.route("/api/positions")
+def position_api():
+    """当前持仓与成本接口，include_closed=1 时包含已清仓记录，refresh=1 时重新回放成交"""
+
+    # 登录状态校验
+    if not current_user.is_authenticated:
+        return Response('{"code":401,"msg":"unauthorized","data":[]}', status=401, mimetype="application/json")
+
+    if request.args.get("refresh") == "1":
+        position_engine.invalidate()
+
+    rows = position_engine.get_positions(include_closed=request.args.get("include_closed") == "1")
+    if request.args.get("with_price", "1") == "1":
+        rows = attach_market_prices(rows)
+
+    body = json.dumps({"code": 200, "msg": "success", "data": rows}, ensure_ascii=False)
+    return Response(body, mimetype="application/json")
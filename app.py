@@ -14,6 +14,9 @@ from feffery_dash_utils.version_utils import (
 
 from server import app
 from models.users import Users
+
+# 令绑定的接口路由生效
+import apis  # noqa: F401
 from views import core_pages, login
 from views.status_pages import _403, _404, _500
 from configs import BaseConfig, RouterConfig, AuthConfig
@@ -5,6 +5,129 @@
 
 let KlineChartInstance;
 
+// 列式数据 (/api/kline 接口返回) 转换为 klinecharts 所需的对象数组
+const klineColumnsToRecords = (columns) => {
+    const keys = Object.keys(columns);
+    const length = keys.length ? columns[keys[0]].length : 0;
+    const records = new Array(length);
+    for (let i = 0; i < length; i++) {
+        const item = {};
+        for (const key of keys) {
+            item[key] = columns[key][i];
+        }
+        records[i] = item;
+    }
+    return records;
+};
+
+// 根据接口返回结果渲染图表或提示信息
+const applyKlinePayload = (
+    data_dict, id,
+    candle_type, show_last_price, show_high_price, show_low_price,
+    show_last_value, axis_type, reverse_axis, show_grid
+) => {
+    if (data_dict && data_dict['code'] === 200) {
+        // 清空消息提示
+        let msg_container = document.getElementById('stock-line_message_container');
+        if (msg_container) msg_container.innerHTML = '';
+
+        // 兼容行式(df)与列式(columns)两种数据结构
+        let data = data_dict['data']['df'] || klineColumnsToRecords(data_dict['data']['columns']);
+
+        // 初始化或获取实例
+        if (!KlineChartInstance) {
+            KlineChartInstance = klinecharts.init(id);
+            // 创建指标
+            KlineChartInstance.createIndicator('VOL', false);
+            KlineChartInstance.createIndicator('MACD', false);
+            KlineChartInstance.createIndicator({
+                name: 'MA',
+                calcParams: [5, 10, 30, 60, 120, 250]
+            }, true, { id: 'candle_pane' });
+        }
+
+        // 更新数据
+        KlineChartInstance.applyNewData(data);
+
+        // 设置样式
+        KlineChartInstance.setStyles({
+            grid: { show: show_grid },
+            candle: {
+                type: candle_type,
+                tooltip: {
+                    custom: [
+                        { title: '时间：', value: '{timestamp}' },
+                        { title: '开：', value: '{open}' },
+                        { title: '高：', value: '{high}' },
+                        { title: '低：', value: '{low}' },
+                        { title: '收：', value: '{close}' },
+                        { title: '量：', value: '{volume}' },
+                        { title: '额：', value: '{turnover}' },
+                    ]
+                },
+                priceMark: {
+                    high: { show: show_high_price },
+                    low: { show: show_low_price },
+                    last: { show: show_last_price }
+                }
+            },
+            yAxis: {
+                type: axis_type,
+                reverse: reverse_axis
+            },
+            indicator: {
+                lastValueMark: { show: show_last_value }
+            }
+        });
+
+        // 自适应大小
+        KlineChartInstance.resize();
+
+    } else if (data_dict && data_dict['code'] === 204) {
+        // 处理无数据的情况
+        const msg_component = {
+            type: 'AntdMessage',
+            namespace: 'feffery_antd_components',
+            props: {
+                type: 'warning',
+                content: '未查询到该标的数据，请确认代码是否正确或已运行数据同步任务',
+            }
+        };
+        window.dash_clientside.set_props('stock-line_message_container', { children: msg_component });
+    } else if (data_dict && data_dict['code'] === 401) {
+        // 登录状态失效
+        const msg_component = {
+            type: 'AntdMessage',
+            namespace: 'feffery_antd_components',
+            props: {
+                type: 'warning',
+                content: '登录状态已失效，请重新登录后查看K线数据',
+            }
+        };
+        window.dash_clientside.set_props('stock-line_message_container', { children: msg_component });
+    } else if (data_dict && data_dict['code'] !== undefined) {
+        // 服务端查询异常及其他非正常状态
+        const msg_component = {
+            type: 'AntdMessage',
+            namespace: 'feffery_antd_components',
+            props: {
+                type: 'error',
+                content: `K线数据加载失败: ${data_dict['msg'] || data_dict['code']}`,
+            }
+        };
+        window.dash_clientside.set_props('stock-line_message_container', { children: msg_component });
+    }
+};
+
+// 接口响应转换为统一结构，缺少 code 的异常响应 (如代理返回的错误页) 按 HTTP 状态码处理
+const readKlineResponse = (response) => response.json()
+    .catch(() => null)
+    .then((payload) => (payload && payload['code'] !== undefined) ? payload : {
+        code: response.ok ? 500 : response.status,
+        msg: response.statusText || `HTTP ${response.status}`,
+        data: [],
+    });
+
 window.dash_clientside = Object.assign({}, window.dash_clientside, {
     kline: {
         renderChart: (
@@ -17,81 +140,24 @@ window.dash_clientside = Object.assign({}, window.dash_clientside, {
                 let container = document.getElementById(id);
                 if (!container) return window.dash_clientside.no_update;
 
-                // 清空容器防止重复渲染
-                // while (container.firstChild) {
-                //     container.removeChild(container.firstChild);
-                // }
-
-                if (data_dict && data_dict['code'] === 200) {
-                    // 清空消息提示
-                    let msg_container = document.getElementById('stock-line_message_container');
-                    if (msg_container) msg_container.innerHTML = '';
+                const styleArgs = [
+                    candle_type, show_last_price, show_high_price, show_low_price,
+                    show_last_value, axis_type, reverse_axis, show_grid
+                ];
 
-                    let data = data_dict['data']['df'];
-                    
-                    // 初始化或获取实例
-                    if (!KlineChartInstance) {
-                        KlineChartInstance = klinecharts.init(id);
-                        // 创建指标
-                        KlineChartInstance.createIndicator('VOL', false);
-                        KlineChartInstance.createIndicator('MACD', false);
-                        KlineChartInstance.createIndicator({
-                            name: 'MA',
-                            calcParams: [5, 10, 30, 60, 120, 250]
-                        }, true, { id: 'candle_pane' });
-                    }
-                    
-                    // 更新数据
-                    KlineChartInstance.applyNewData(data);
-
-                    // 设置样式
-                    KlineChartInstance.setStyles({
-                        grid: { show: show_grid },
-                        candle: {
-                            type: candle_type,
-                            tooltip: {
-                                custom: [
-                                    { title: '时间：', value: '{timestamp}' },
-                                    { title: '开：', value: '{open}' },
-                                    { title: '高：', value: '{high}' },
-                                    { title: '低：', value: '{low}' },
-                                    { title: '收：', value: '{close}' },
-                                    { title: '量：', value: '{volume}' },
-                                    { title: '额：', value: '{turnover}' },
-                                ]
-                            },
-                            priceMark: {
-                                high: { show: show_high_price },
-                                low: { show: show_low_price },
-                                last: { show: show_last_price }
-                            }
-                        },
-                        yAxis: {
-                            type: axis_type,
-                            reverse: reverse_axis
-                        },
-                        indicator: {
-                            lastValueMark: { show: show_last_value }
-                        }
-                    });
-
-                    // 自适应大小
-                    KlineChartInstance.resize();
-                    
-                    return window.dash_clientside.no_update;
-
-                } else if (data_dict && data_dict['code'] === 204) {
-                    // 处理无数据的情况
-                    const msg_component = {
-                        type: 'AntdMessage',
-                        namespace: 'feffery_antd_components',
-                        props: {
-                            type: 'warning',
-                            content: '未查询到该标的数据，请确认代码是否正确或已运行数据同步任务',
-                        }
-                    };
-                    window.dash_clientside.set_props('stock-line_message_container', { children: msg_component });
-                    return window.dash_clientside.no_update;
+                if (data_dict && data_dict['contract'] && data_dict['code'] === undefined) {
+                    // 直接请求K线数据接口，重复加载时由浏览器缓存配合ETag返回304
+                    fetch(`/api/kline/${encodeURIComponent(data_dict['contract'])}`, {
+                        credentials: 'same-origin'
+                    })
+                        .then(readKlineResponse)
+                        .then((payload) => applyKlinePayload(payload, id, ...styleArgs))
+                        .catch((error) => {
+                            console.error('K线数据加载失败', error);
+                            applyKlinePayload({ code: 500, msg: String(error), data: [] }, id, ...styleArgs);
+                        });
+                } else {
+                    applyKlinePayload(data_dict, id, ...styleArgs);
                 }
             }
             return window.dash_clientside.no_update;
@@ -18,12 +18,15 @@ from views.core_pages import (
     # 系统管理相关页面
     login_logs,
     market_monitor, 
+    quote_board,
     trade_management,
+    positions,
+    performance,
     fee_management,
     stock_kline
 )
 
-from . import market_c, trade_c, fee_management_c, system_c
+from . import market_c, quote_board_c, trade_c, positions_c, performance_c, fee_management_c, system_c
 
 # 路由配置参数
 from configs import RouterConfig
@@ -191,8 +194,14 @@ def core_router(
         page_content = login_logs.render()
     elif pathname == "/quant/market":
         page_content = market_monitor.render()
+    elif pathname == "/quant/quotes":
+        page_content = quote_board.render()
     elif pathname == "/quant/trade":
         page_content = trade_management.render()
+    elif pathname == "/quant/positions":
+        page_content = positions.render()
+    elif pathname == "/quant/performance":
+        page_content = performance.render()
     elif pathname == "/quant/fees":
         page_content = fee_management.render()
     elif pathname == "/quant/stock-kline":
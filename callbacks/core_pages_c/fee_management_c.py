@@ -4,6 +4,7 @@ from dash import set_props
 import feffery_antd_components as fac
 from server import app
 from configs.fee_config import fee_manager
+from utils.fee_recompute import recompute_trade_fees
 
 # 字段映射字典，用于前端友好显示
 FEE_TYPE_MAP = {
@@ -19,9 +20,17 @@ MODE_MAP = {
     "none": {"tag": "不收", "color": "default"}
 }
 
-def get_flattened_fees():
+def get_schedule_options():
+    """费率版本下拉选项"""
+    current = fee_manager.get_effective_from()
+    return [
+        {'label': f"{d} 起生效" + ("（当前）" if d == current else ""), 'value': d}
+        for d, _ in fee_manager.get_schedules()
+    ]
+
+def get_flattened_fees(effective_from=None):
     """读取配置并将嵌套字典转换为扁平列表，供表格展示"""
-    config = fee_manager.get_config()
+    config = fee_manager.get_config(effective_from)
     data = []
     
     # 遍历: 市场 -> 品种 -> 费用类型
@@ -45,13 +54,16 @@ def get_flattened_fees():
 
 # --- 回调1: 刷新表格 & 保存修改 ---
 @app.callback(
-    Output('fee-config-table', 'data'),
+    [Output('fee-config-table', 'data'),
+     Output('fee-schedule-select', 'options'),
+     Output('fee-schedule-select', 'value')],
     [
         # 1. 监听 URL 变化 (页面进入时自动加载)
         Input('core-url', 'pathname'),
         # 2. 监听 弹窗确认 (保存后自动刷新)
-        Input('fee-edit-modal', 'okCounts')
-        # 【修改】删除了按钮点击的 Input
+        Input('fee-edit-modal', 'okCounts'),
+        # 3. 切换费率版本
+        Input('fee-schedule-select', 'value')
     ],
     [
         State('fee-edit-form', 'values'),
@@ -60,7 +72,7 @@ def get_flattened_fees():
     
     # prevent_initial_call=True
 )
-def refresh_fee_table(pathname, ok_count, form_values, target_context):
+def refresh_fee_table(pathname, ok_count, effective_from, form_values, target_context):
     ctx = dash.callback_context
     trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
@@ -69,7 +81,10 @@ def refresh_fee_table(pathname, ok_count, form_values, target_context):
     # 这样确保了每次点击菜单进入该页面，都会重新读取最新的 json 配置
     
     if pathname != '/quant/fees':
-        return dash.no_update
+        return dash.no_update, dash.no_update, dash.no_update
+
+    # 默认展示当日生效的版本
+    effective_from = effective_from or fee_manager.get_effective_from()
 
     # 2. 保存修改逻辑
     if trigger_id == 'fee-edit-modal':
@@ -78,9 +93,12 @@ def refresh_fee_table(pathname, ok_count, form_values, target_context):
             market = target_context.get('market')
             product = target_context.get('product')
             fee_type = target_context.get('fee_type')
+            # 生效日期与所编辑版本不同时，以该日期适用的配置为基础新增版本
+            target_date = (form_values.get('edit-effective-from') or target_context.get('effective_from'))[:10]
             
             if market and product and fee_type:
-                current_config = fee_manager.get_config()
+                # get_config 返回副本，修改后整体提交，不影响正在使用的配置快照
+                current_config = fee_manager.get_config(target_date)
                 # 检查键是否存在，防止报错
                 if market in current_config and product in current_config[market]:
                     target = current_config[market][product][fee_type]
@@ -90,15 +108,16 @@ def refresh_fee_table(pathname, ok_count, form_values, target_context):
                     target['mode'] = form_values.get('edit-mode', 'none')
                     
                     # 写入文件
-                    fee_manager.update_config(current_config)
+                    fee_manager.update_config(current_config, effective_from=target_date)
+                    effective_from = target_date
                     
                     # 提示用户
                     set_props("global-message", {
-                        "children": fac.AntdMessage(content="费率配置已更新", type="success")
+                        "children": fac.AntdMessage(content=f"费率配置已更新（{target_date} 起生效）", type="success")
                     })
 
     # 3. 最终返回：重新读取文件并刷新表格
-    return get_flattened_fees()
+    return get_flattened_fees(effective_from), get_schedule_options(), effective_from
 
 # --- 回调2: 点击编辑按钮 (保持不变) ---
 @app.callback(
@@ -107,13 +126,16 @@ def refresh_fee_table(pathname, ok_count, form_values, target_context):
      Output('fee-edit-target-store', 'data')], 
     Input('fee-config-table', 'nClicksButton'),
     [State('fee-config-table', 'clickedContent'),
-     State('fee-config-table', 'recentlyButtonClickedRow')],
+     State('fee-config-table', 'recentlyButtonClickedRow'),
+     State('fee-schedule-select', 'value')],
     prevent_initial_call=True
 )
-def open_edit_modal(nClicks, content, row):
+def open_edit_modal(nClicks, content, row, effective_from):
     if content == '编辑' and row:
+        effective_from = effective_from or fee_manager.get_effective_from()
         # 1. 表单回填数据 (只填可见的)
         form_values = {
+            'edit-effective-from': effective_from,
             'edit-rate': row['rate'],
             'edit-min-fee': row['min_fee'],
             'edit-mode': row['mode']
@@ -123,8 +145,29 @@ def open_edit_modal(nClicks, content, row):
         context_data = {
             'market': row['market'],
             'product': row['product'],
-            'fee_type': row['fee_type']
+            'fee_type': row['fee_type'],
+            'effective_from': effective_from
         }
         
         return True, form_values, context_data
-    return dash.no_update
\ No newline at end of file
+    return dash.no_update
+
+# --- 回调3: 按适用费率重算历史成交费用 ---
+@app.callback(
+    Output('fee-recompute-result', 'children'),
+    Input('fee-recompute-btn', 'nClicks'),
+    State('fee-recompute-range', 'value'),
+    running=[[Output('fee-recompute-btn', 'loading'), True, False]],
+    prevent_initial_call=True
+)
+def recompute_fees(n, date_range):
+    start_date, end_date = date_range or (None, None)
+    try:
+        scanned, updated, skipped = recompute_trade_fees(start_date, end_date)
+    except Exception as e:
+        return f"重算失败: {e}"
+    scope = f"{start_date} ~ {end_date}" if start_date else "全部成交"
+    result = f"{scope}：扫描 {scanned} 条，更新 {updated} 条"
+    if skipped:
+        result += f"，跳过缺少成交日期的记录 {skipped} 条"
+    return result
@@ -1,24 +1,33 @@
-from dash.dependencies import Input, Output
+import dash
+import threading
+from collections import OrderedDict
+from dash.dependencies import Input, Output, State
 import plotly.graph_objects as go
 from server import app
 from utils.xt_manager import xt_manager
+from utils.stock_search import stock_search_index
 from dash import dcc
 
 @app.callback(
-    Output('market-kline-container', 'children'),
-    [Input('market-stock-select', 'value'),
-     Input('market-period-select', 'value')]
+    Output('market-stock-select', 'options'),
+    Input('market-stock-select', 'debounceSearchValue'),
+    State('market-stock-select', 'value'),
+    prevent_initial_call=True
 )
-def update_kline(stock_code, period):
-    if not stock_code: return None
-    
-    # 从 XtQuant 获取数据
-    df = xt_manager.get_market_data(stock_code, period=period)
-    
-    if df.empty:
-        return dcc.Graph()
+def search_stock_options(keyword, current_value):
+    """证券代码联想检索"""
+    if not keyword:
+        return dash.no_update
+    return stock_search_index.select_options(keyword, current_value)
 
-    # 使用 Plotly 绘制 K 线
+# K线图缓存：(code, period) -> (行情 DataFrame, figure)
+# xt_manager 在缓存有效期内返回同一个 DataFrame 对象，据此判断是否可复用已生成的图表
+_FIGURE_CACHE = OrderedDict()
+_FIGURE_CACHE_SIZE = 64
+_FIGURE_CACHE_LOCK = threading.Lock()
+
+def _build_kline_figure(df, stock_code, period):
+    """使用 Plotly 绘制 K 线"""
     fig = go.Figure(data=[go.Candlestick(
         x=df['time'],
         open=df['open'],
@@ -33,5 +42,38 @@ def update_kline(stock_code, period):
         margin=dict(l=20, r=20, t=40, b=20),
         height=500
     )
+    # 转换为字典，避免每次回调重复序列化 Figure 对象
+    return fig.to_dict()
+
+def get_kline_figure(df, stock_code, period):
+    """获取K线图 (按行情数据对象记忆化)"""
+    key = (stock_code, period)
+    with _FIGURE_CACHE_LOCK:
+        cached = _FIGURE_CACHE.get(key)
+        if cached is not None and cached[0] is df:
+            _FIGURE_CACHE.move_to_end(key)
+            return cached[1]
+
+    figure = _build_kline_figure(df, stock_code, period)
+    with _FIGURE_CACHE_LOCK:
+        _FIGURE_CACHE[key] = (df, figure)
+        _FIGURE_CACHE.move_to_end(key)
+        while len(_FIGURE_CACHE) > _FIGURE_CACHE_SIZE:
+            _FIGURE_CACHE.popitem(last=False)
+    return figure
+
+@app.callback(
+    Output('market-kline-container', 'children'),
+    [Input('market-stock-select', 'value'),
+     Input('market-period-select', 'value')]
+)
+def update_kline(stock_code, period):
+    if not stock_code: return None
+    
+    # 从 XtQuant 获取数据 (带缓存)
+    df = xt_manager.get_market_data(stock_code, period=period)
     
-    return dcc.Graph(figure=fig)
\ No newline at end of file
+    if df.empty:
+        return dcc.Graph()
+
+    return dcc.Graph(figure=get_kline_figure(df, stock_code, period))
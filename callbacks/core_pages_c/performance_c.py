@@ -0,0 +1,100 @@
+import dash
+import numpy as np
+import feffery_antd_components as fac
+import plotly.graph_objects as go
+from dash import dcc, set_props
+from dash.dependencies import Input, Output
+from server import app
+from utils.performance_builder import build_daily_performance
+from utils.performance_metrics import performance_report_cache
+
+_CHART_LAYOUT = dict(template='plotly_white', margin=dict(l=40, r=20, t=20, b=30), hovermode='x unified')
+
+
+def _series(values):
+    """NaN 转为 None，图表中显示为断点"""
+    return [None if np.isnan(v) else v for v in np.asarray(values, dtype=np.float64).tolist()]
+
+
+def _format_pct(value):
+    return '-' if value is None else f"{value * 100:.2f}%"
+
+
+def _build_stats(stats):
+    items = [
+        ('累计收益', _format_pct(stats['total_return'])),
+        ('年化收益', _format_pct(stats['annual_return'])),
+        ('年化波动率', _format_pct(stats['annual_volatility'])),
+        ('夏普比率', '-' if stats['sharpe'] is None else f"{stats['sharpe']:.2f}"),
+        ('最大回撤', _format_pct(stats['max_drawdown'])),
+        ('卡玛比率', '-' if stats['calmar'] is None else f"{stats['calmar']:.2f}"),
+    ]
+    if 'excess_return' in stats:
+        items.append(('超额收益', _format_pct(stats['excess_return'])))
+    return [
+        fac.AntdCol(fac.AntdStatistic(title=title, value=value), flex='1')
+        for title, value in items
+    ]
+
+
+def _build_figures(report):
+    dates = report['dates']
+
+    nav_fig = go.Figure(go.Scatter(x=dates, y=_series(report['nav']), name='账户净值'))
+    if report['benchmark_nav'] is not None:
+        nav_fig.add_trace(go.Scatter(x=dates, y=_series(report['benchmark_nav']), name='基准', line=dict(dash='dot')))
+    nav_fig.update_layout(**_CHART_LAYOUT)
+
+    dd_fig = go.Figure(go.Scatter(x=dates, y=_series(report['drawdown']), fill='tozeroy', name='回撤', line=dict(color='#cf1322')))
+    dd_fig.update_layout(**_CHART_LAYOUT, yaxis=dict(tickformat='.0%'))
+
+    rolling_fig = go.Figure([
+        go.Scatter(x=dates, y=_series(report['rolling_vol']), name='年化波动率'),
+        go.Scatter(x=dates, y=_series(report['rolling_sharpe']), name='夏普比率', yaxis='y2'),
+    ])
+    rolling_fig.update_layout(**_CHART_LAYOUT, yaxis=dict(tickformat='.0%'),
+                              yaxis2=dict(overlaying='y', side='right', showgrid=False))
+
+    monthly = report['monthly_returns']
+    monthly_fig = go.Figure(go.Bar(
+        x=report['months'], y=_series(monthly), name='月度收益',
+        marker_color=np.where(monthly >= 0, '#cf1322', '#3f8600').tolist()
+    ))
+    monthly_fig.update_layout(**_CHART_LAYOUT, yaxis=dict(tickformat='.1%'))
+
+    return [dcc.Graph(figure=fig, style={'height': '100%'}) for fig in (nav_fig, dd_fig, rolling_fig, monthly_fig)]
+
+
+@app.callback(
+    [Output('performance-stats', 'children'),
+     Output('performance-nav-chart', 'children'),
+     Output('performance-drawdown-chart', 'children'),
+     Output('performance-rolling-chart', 'children'),
+     Output('performance-monthly-chart', 'children')],
+    [Input('performance-init-trigger', 'timeoutCount'),
+     Input('performance-benchmark-select', 'value'),
+     Input('performance-window-select', 'value'),
+     Input('performance-rebuild-btn', 'nClicks')],
+    running=[[Output('performance-rebuild-btn', 'loading'), True, False]],
+    prevent_initial_call=True
+)
+def update_performance(init, benchmark, window, rebuild_clicks):
+    # 手动增量构建绩效快照
+    if dash.ctx.triggered_id == 'performance-rebuild-btn':
+        try:
+            count = build_daily_performance()
+            set_props("global-message", {
+                "children": fac.AntdMessage(content=f"绩效快照已更新 {count} 日", type="success")
+            })
+        except Exception as e:
+            set_props("global-message", {
+                "children": fac.AntdMessage(content=f"构建失败: {e}", type="error")
+            })
+
+    # 指标按快照版本缓存，快照未更新时不重复计算
+    report = performance_report_cache.get_report(benchmark, window)
+    if report is None:
+        empty = fac.AntdEmpty(description='暂无绩效快照，请先构建')
+        return [fac.AntdCol(empty, span=24)], None, None, None, None
+
+    return [_build_stats(report['stats']), *_build_figures(report)]
@@ -0,0 +1,36 @@
+import dash
+from dash.dependencies import Input, Output, State
+from server import app
+from utils.position_engine import position_engine, attach_market_prices
+from utils.stock_info_manager import stock_info_manager
+
+
+def get_position_rows(include_closed=False):
+    """持仓表格数据 (含最新价与浮动盈亏)"""
+    rows = attach_market_prices(position_engine.get_positions(include_closed=include_closed))
+    for r in rows:
+        r['stock_name'] = stock_info_manager.get_stock_name(r['stock_code'])
+        for k, v in r.items():
+            if isinstance(v, float):
+                r[k] = round(v, 3 if k in ('avg_cost', 'fifo_cost', 'last_price') else 2)
+    return rows
+
+
+@app.callback(
+    [Output('positions-table', 'data'),
+     Output('positions-summary', 'children')],
+    [Input('positions-init-trigger', 'timeoutCount'),
+     Input('positions-refresh-btn', 'nClicks'),
+     Input('positions-rebuild-btn', 'nClicks'),
+     Input('positions-include-closed', 'checked')],
+    prevent_initial_call=True
+)
+def update_positions(init, refresh_clicks, rebuild_clicks, include_closed):
+    # 手动回放：丢弃内存状态后从成交记录重建
+    if dash.ctx.triggered_id == 'positions-rebuild-btn':
+        position_engine.invalidate()
+
+    rows = get_position_rows(include_closed)
+    market_value = sum(r['market_value'] or 0 for r in rows)
+    realized = sum(r['realized_pnl_avg'] for r in rows)
+    return rows, f"共 {len(rows)} 个持仓，市值 {market_value:,.2f}，已实现盈亏(平均) {realized:,.2f}"
@@ -0,0 +1,38 @@
+import dash
+from datetime import datetime
+from dash import Patch
+from dash.dependencies import Input, Output, State
+from server import app
+from utils.quote_board import quote_board
+
+@app.callback(
+    [Output('quote-board-table', 'data'),
+     Output('quote-board-version-store', 'data'),
+     Output('quote-board-status', 'children')],
+    Input('quote-board-interval', 'n_intervals'),
+    State('quote-board-version-store', 'data')
+)
+def refresh_quote_board(n, client_state):
+    """按客户端版本增量刷新行情看板，仅下发发生变化的行"""
+    client_state = client_state or {}
+    epoch, version, is_full, rows = quote_board.get_changes(
+        client_state.get('epoch'), client_state.get('version', 0)
+    )
+
+    # 快照尚未就绪
+    if epoch is None:
+        return dash.no_update, dash.no_update, '行情快照加载中...'
+
+    status = f"共 {quote_board.row_count} 个标的，更新于 {datetime.now().strftime('%H:%M:%S')}"
+
+    if is_full:
+        return rows, {'epoch': epoch, 'version': version}, status
+
+    if not rows:
+        return dash.no_update, dash.no_update, status
+
+    # 按行号局部更新表格数据
+    p = Patch()
+    for index, row in rows:
+        p[index] = row
+    return p, {'epoch': epoch, 'version': version}, status
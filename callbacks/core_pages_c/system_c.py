@@ -1,26 +1,49 @@
 from dash.dependencies import Input, Output, State
-from dash import set_props, dash, callback
+from dash import set_props, callback, no_update
 import feffery_antd_components as fac
 from server import app
+from configs import BaseConfig
 from utils.xt_manager import xt_manager
+from utils.qmt_health import qmt_health
 from utils.stock_info_manager import stock_info_manager
+from utils.instrument_master import instrument_master
+from utils.trade_persistence import trade_persistence
+
+# 手动重连后轮询连接状态的间隔 (毫秒)，重连结束后恢复为常规间隔
+RECONNECT_POLL_INTERVAL = 2000
 
 # --- 回调1: 定时检查 QMT 连接状态 ---
 @app.callback(
     [Output("core-qmt-status-badge", "count"),
      Output("core-qmt-status-popover", "content")],
-    Input("core-qmt-check-interval", "n_intervals")
+    Input("core-qmt-check-interval", "n_intervals"),
+    State("core-qmt-check-interval", "interval")
 )
-def check_qmt_status(n):
-    # 执行检查（内部会自动重连）
-    is_connected, msg = xt_manager.check_connection()
+def check_qmt_status(n, interval):
+    # 只读取后台健康监测的缓存结果，不在页面回调中发起连接
+    status = qmt_health.get_status()
+    msg = status['message']
+
+    # 手动重连已有结果：恢复常规检查间隔
+    reconnecting = status['trader_state'] in (xt_manager.STATE_CONNECTING, xt_manager.STATE_SYNCING)
+    if interval == RECONNECT_POLL_INTERVAL and not reconnecting:
+        set_props("core-qmt-check-interval", {"interval": BaseConfig.qmt_check_interval * 1000})
+
+    # 交易数据写入队列状态
+    metrics = trade_persistence.get_metrics()
+    writer_msg = f"写入队列：{metrics['queue_depth']} 条，延迟 {metrics['current_lag_ms']}ms"
     
-    if is_connected:
+    if status['connected']:
         # 连接正常：清除红点，提示正常
-        return 0, f"当前状态：{msg}"
+        return 0, f"当前状态：{msg}（{status['checked_at']} 检测）；{writer_msg}"
+    elif reconnecting:
+        # 后台初始化中：显示红点，提示所处阶段
+        return 1, f"交易接口{status['trader_label']}：{status['trader_message']}（{status['trader_since']} 开始）；{writer_msg}"
     else:
-        # 连接失败：显示红点，更新提示文字
-        return 1, f"警告：{msg}，系统正在尝试自动重连..."
+        # 连接失败：显示红点，已完成探测时提示下次重连时间
+        if status['next_check_at'] is None:
+            return 1, f"警告：{msg}；{writer_msg}"
+        return 1, f"警告：{msg}，系统将于 {status['next_check_at']} 自动重连（已失败 {status['failures']} 次）；{writer_msg}"
 
 # --- 回调2: 打开设置模态框 ---
 @app.callback(
@@ -38,37 +61,57 @@ def open_setting_modal(n):
     prevent_initial_call=True
 )
 def manual_reconnect(n):
-    # 强制重新初始化
-    xt_manager.init_trader()
-    
-    # 再次检查
-    is_connected, msg = xt_manager.check_connection()
-    
-    if is_connected:
-        set_props("global-message", {
-            "children": fac.AntdMessage(content="手动连接成功！", type="success")
-        })
-    else:
-        set_props("global-message", {
-            "children": fac.AntdMessage(content=f"连接失败: {msg}", type="error")
-        })
-        
+    # 唤醒健康监测线程立即探测 (断开时在后台重连)，回调不等待结果，
+    # 临时缩短状态检查间隔，重连结果由状态提示展示
+    qmt_health.request_probe()
+    set_props("core-qmt-check-interval", {"interval": RECONNECT_POLL_INTERVAL})
+    set_props("global-message", {
+        "children": fac.AntdMessage(content="已发起重连检测，结果请查看连接状态", type="info")
+    })
     return False # 关闭loading
 
 @app.callback(
-    Output("core-update-stock-list-btn", "loading"),
+    Output("core-update-stock-list-interval", "disabled"),
     Input("core-update-stock-list-btn", "nClicks"),
     prevent_initial_call=True
 )
 def update_stock_list_manually(n):
-    try:
-        count = stock_info_manager.refresh_mapping()
+    # 在后台线程中更新，回调立即返回，由定时器轮询进度
+    if not stock_info_manager.start_refresh_mapping():
         set_props("global-message", {
-            "children": fac.AntdMessage(content=f"更新完成，共收录 {count} 个证券品种", type="success")
+            "children": fac.AntdMessage(content="证券代码表正在更新中", type="info")
         })
-    except Exception as e:
+    set_props("core-update-stock-list-btn", {"loading": True})
+    return False
+
+@app.callback(
+    [Output("core-update-stock-list-progress", "percent"),
+     Output("core-update-stock-list-progress", "style"),
+     Output("core-update-stock-list-status", "children"),
+     Output("core-update-stock-list-btn", "loading"),
+     Output("core-update-stock-list-interval", "disabled", allow_duplicate=True)],
+    Input("core-update-stock-list-interval", "n_intervals"),
+    prevent_initial_call=True
+)
+def poll_stock_list_progress(n):
+    progress = instrument_master.get_progress()
+    percent = int(progress['done'] * 100 / progress['total']) if progress['total'] else 0
+    if progress['state'] == 'running' or instrument_master.is_refreshing():
+        status = f"{progress['stage']}：{progress['done']}/{progress['total']}" if progress['total'] else progress['stage']
+        return percent, {}, status, True, False
+
+    # 尚未开始过刷新：停止轮询，无结果可提示
+    if progress['state'] == 'idle':
+        return no_update, no_update, no_update, False, True
+
+    # 已结束：停止轮询并提示结果
+    if progress['state'] == 'failed':
         set_props("global-message", {
-            "children": fac.AntdMessage(content=f"更新失败: {str(e)}", type="error")
+            "children": fac.AntdMessage(content=f"更新失败: {progress['message']}", type="error")
         })
-        
-    return False
\ No newline at end of file
+        return percent, {}, f"更新失败：{progress['message']}", False, True
+
+    set_props("global-message", {
+        "children": fac.AntdMessage(content=f"更新完成，{progress['message']}", type="success")
+    })
+    return 100, {}, f"更新完成：{progress['message']}", False, True
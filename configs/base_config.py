@@ -8,6 +8,18 @@ class BaseConfig:
     # QMT 连接状态检查间隔（秒）
     qmt_check_interval: int = 300
 
+    # QMT 后台健康探测间隔（秒），所有页面共享同一探测结果
+    qmt_health_interval: int = 30
+
+    # QMT 重连失败后的最大退避间隔（秒）
+    qmt_reconnect_max_backoff: int = 600
+
+    # 行情看板快照刷新间隔（秒）
+    quote_board_interval: Union[int, float] = 3
+
+    # 行情看板自选标的列表，为空时展示全市场
+    quote_board_watchlist: List[str] = []
+
     # 应用基础标题
     app_title: str = "Dash Qmt"
 
@@ -0,0 +1,46 @@
+# 券商交割单格式配置
+# columns: 标准字段 -> 交割单列名，可为多个候选列名 (取第一个存在的列)
+#   必需字段: date, code, volume, price, amount
+#   可选字段: flag (业务标志), time (成交时间), contract (成交/合同编号), account (股东账号)
+# buy_flags / sell_flags: 业务标志包含其中任一关键字即判定为买入/卖出，均不包含时按数量正负判断
+# skip_flags: 业务标志包含其中任一关键字的行不是成交 (如 银行转证券、红利入账)，导入时跳过
+# 未指定券商时，按列名匹配程度自动选择
+
+BROKER_PROFILES = {
+    "default": {
+        "name": "通用交割单",
+        "columns": {
+            "date": "日期",
+            "code": "证券代码",
+            "flag": "业务标志",
+            "volume": "发生数量",
+            "price": "成交均价",
+            "amount": "成交金额",
+            "contract": ["合同编号", "成交编号"],
+            "account": "股东账号",
+        },
+        "buy_flags": ["买入"],
+        "sell_flags": ["卖出"],
+        "skip_flags": [],
+    },
+    "tdx": {
+        "name": "通达信/同花顺 历史成交",
+        "columns": {
+            "date": "成交日期",
+            "time": "成交时间",
+            "code": "证券代码",
+            "flag": ["操作", "买卖标志"],
+            "volume": "成交数量",
+            "price": ["成交价格", "成交均价"],
+            "amount": "成交金额",
+            "contract": ["成交编号", "合同编号"],
+            "account": ["股东代码", "股东账号"],
+        },
+        "buy_flags": ["买入", "证券买入"],
+        "sell_flags": ["卖出", "证券卖出"],
+        "skip_flags": ["撤单"],
+    },
+}
+
+# 必需的标准字段
+REQUIRED_FIELDS = ("date", "code", "volume", "price", "amount")
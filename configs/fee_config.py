@@ -1,8 +1,18 @@
+import copy
 import json
+import os
+import time
+import threading
+from bisect import bisect_right
+from datetime import date
 from pathlib import Path
 from configs.settings import DATA_DIR
 
 FEE_CONFIG_PATH = DATA_DIR / "fees_config.json"
+FEE_SCHEDULES_PATH = DATA_DIR / "fee_schedules.json"
+
+# 最早版本的生效日期 (早于所有成交)
+DEFAULT_EFFECTIVE_FROM = "1970-01-01"
 
 # 默认费率配置
 DEFAULT_FEES = {
@@ -49,41 +59,193 @@ DEFAULT_FEES = {
     }
 }
 
+class FeeSchedulesSnapshot:
+    """
+    费率计划快照 (构建后只读)
+    更新时整体构建新快照再替换引用，读取端拿到的始终是完整的一版，无需加锁
+    """
+    __slots__ = ('version', 'dates', 'configs', 'mtime')
+
+    def __init__(self, schedules, version, mtime=None):
+        schedules = sorted(schedules)
+        self.version = version
+        self.dates = tuple(d for d, _ in schedules)
+        self.configs = tuple(c for _, c in schedules)
+        # 对应 fee_schedules.json 的修改时间，用于发现其他进程的更新
+        self.mtime = mtime
+
+    def get_effective_from(self, on_date=None):
+        """指定日期 (YYYY-MM-DD，默认当日) 适用的费率版本生效日期"""
+        on_date = (on_date or date.today().isoformat())[:10]
+        index = bisect_right(self.dates, on_date) - 1
+        return self.dates[max(index, 0)]
+
+    def get_config(self, effective_from):
+        """指定生效日期的配置 (共享对象，调用方不得修改)"""
+        return self.configs[self.dates.index(effective_from)]
+
+    def items(self):
+        return list(zip(self.dates, self.configs))
+
+
+def _dump_json_atomic(path, data):
+    """写入临时文件后原子替换，其他进程不会读到写了一半的文件"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
 class FeeConfigManager:
+    """
+    费率配置管理
+    费率计划按生效日期分版本保存在 fee_schedules.json，
+    fees_config.json 始终为当日生效的配置 (兼容旧版本)
+    多进程部署时各进程按文件修改时间 (每 RELOAD_CHECK_INTERVAL 秒至多检查一次) 发现并加载其他进程的修改
+    """
     _instance = None
-    _config = None
+    # 当前生效的费率计划快照
+    _snapshot = None
+    # 检查配置文件是否被其他进程修改的最小间隔 (秒)
+    RELOAD_CHECK_INTERVAL = 1.0
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(FeeConfigManager, cls).__new__(cls)
+            cls._instance._write_lock = threading.Lock()
+            cls._instance._next_check = 0.0
             cls._instance.load_config()
         return cls._instance
 
+    @property
+    def version(self):
+        """配置版本号，每次加载/更新后递增，供费率计划判断是否需要重新编译"""
+        return self.snapshot.version
+
+    @property
+    def snapshot(self):
+        """当前费率计划快照 (热路径只读取引用，按间隔检查文件是否被其他进程更新)"""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.RELOAD_CHECK_INTERVAL
+            if _file_mtime(FEE_SCHEDULES_PATH) != snapshot.mtime:
+                snapshot = self._reload()
+        return snapshot
+
+    def _read_schedules(self):
+        with open(FEE_SCHEDULES_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        # 兼容旧格式 (直接为版本列表)
+        items = data.get('schedules', []) if isinstance(data, dict) else data
+        return [(item['effective_from'], item['config']) for item in items]
+
+    def _reload(self):
+        """配置文件被其他进程修改后重新加载 (读取失败时沿用当前快照)"""
+        with self._write_lock:
+            snapshot = self._snapshot
+            mtime = _file_mtime(FEE_SCHEDULES_PATH)
+            if mtime == snapshot.mtime:
+                return snapshot
+            try:
+                schedules = self._read_schedules()
+            except Exception as e:
+                print(f"重新加载分期费率失败，沿用当前配置: {e}")
+                return snapshot
+            if schedules:
+                snapshot = FeeSchedulesSnapshot(schedules, snapshot.version + 1, mtime)
+                self._snapshot = snapshot
+                print(f"【费率配置】检测到配置文件更新，已重新加载")
+            return snapshot
+
     def load_config(self):
         """加载配置，如果不存在则创建默认配置"""
+        config = None
         if not FEE_CONFIG_PATH.exists():
-            self._config = DEFAULT_FEES
-            self.save_config()
+            config = DEFAULT_FEES
+            _dump_json_atomic(FEE_CONFIG_PATH, config)
             print(f"已生成默认费率配置文件: {FEE_CONFIG_PATH}")
         else:
             try:
                 with open(FEE_CONFIG_PATH, 'r', encoding='utf-8') as f:
-                    self._config = json.load(f)
+                    config = json.load(f)
             except Exception as e:
                 print(f"加载费率配置失败，使用默认配置: {e}")
-                self._config = DEFAULT_FEES
+                config = DEFAULT_FEES
 
-    def save_config(self):
-        """保存配置到文件"""
-        with open(FEE_CONFIG_PATH, 'w', encoding='utf-8') as f:
-            json.dump(self._config, f, indent=4, ensure_ascii=False)
+        schedules = None
+        if FEE_SCHEDULES_PATH.exists():
+            try:
+                schedules = self._read_schedules()
+            except Exception as e:
+                print(f"加载分期费率失败，使用当前配置: {e}")
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        if schedules:
+            self._snapshot = FeeSchedulesSnapshot(schedules, version, _file_mtime(FEE_SCHEDULES_PATH))
+        else:
+            # 首次启用分期费率：当前配置作为最早生效的版本
+            self._commit([(DEFAULT_EFFECTIVE_FROM, config)], version)
 
-    def get_config(self):
-        return self._config
+    def _commit(self, schedules, version):
+        """写入文件后构建新快照并替换引用"""
+        snapshot = FeeSchedulesSnapshot(schedules, version)
+        _dump_json_atomic(FEE_SCHEDULES_PATH, {
+            'schedules': [{'effective_from': d, 'config': c} for d, c in snapshot.items()],
+        })
+        _dump_json_atomic(FEE_CONFIG_PATH, snapshot.get_config(snapshot.get_effective_from()))
+        snapshot.mtime = _file_mtime(FEE_SCHEDULES_PATH)
+        self._snapshot = snapshot
+        return snapshot
 
-    def update_config(self, new_config):
-        self._config = new_config
-        self.save_config()
+    def get_effective_from(self, on_date=None):
+        """指定日期 (YYYY-MM-DD，默认当日) 适用的费率版本生效日期"""
+        return self.snapshot.get_effective_from(on_date)
+
+    def get_config(self, on_date=None):
+        """指定日期 (默认当日) 适用的费率配置 (副本，可自由修改)"""
+        snapshot = self.snapshot
+        return copy.deepcopy(snapshot.get_config(snapshot.get_effective_from(on_date)))
+
+    def get_schedules(self):
+        """全部费率版本 [(effective_from, config), ...]，按生效日期升序 (副本)"""
+        return copy.deepcopy(self.snapshot.items())
+
+    def update_config(self, new_config, effective_from=None):
+        """
+        更新费率配置
+        effective_from 为空时修改当日生效的版本，否则新增/覆盖该日期生效的版本
+        """
+        with self._write_lock:
+            # 以磁盘上的最新版本为基础，避免覆盖其他进程的修改
+            snapshot = self._snapshot
+            try:
+                schedules = dict(self._read_schedules()) or dict(snapshot.items())
+            except Exception:
+                schedules = dict(snapshot.items())
+            effective_from = effective_from or snapshot.get_effective_from()
+            schedules[effective_from] = copy.deepcopy(new_config)
+            self._commit(schedules.items(), snapshot.version + 1)
+
+    def delete_schedule(self, effective_from):
+        """删除指定版本 (至少保留一个版本)"""
+        with self._write_lock:
+            snapshot = self._snapshot
+            try:
+                schedules = dict(self._read_schedules()) or dict(snapshot.items())
+            except Exception:
+                schedules = dict(snapshot.items())
+            if len(schedules) <= 1 or effective_from not in schedules:
+                return False
+            del schedules[effective_from]
+            self._commit(schedules.items(), snapshot.version + 1)
+            return True
 
 # 全局单例
-fee_manager = FeeConfigManager()
\ No newline at end of file
+fee_manager = FeeConfigManager()
@@ -35,6 +35,15 @@ class RouterConfig:
                         "href": "/quant/market",
                     },
                 },
+                {
+                    "component": "Item",
+                    "props": {
+                        "title": "行情看板",
+                        "key": "/quant/quotes",
+                        "icon": "antd-table",
+                        "href": "/quant/quotes",
+                    },
+                },
                 {
                     "component": "Item",
                     "props": {
@@ -44,6 +53,15 @@ class RouterConfig:
                         "href": "/quant/trade",
                     },
                 },
+                {
+                    "component": "Item",
+                    "props": {
+                        "title": "持仓分析",
+                        "key": "/quant/positions",
+                        "icon": "antd-pie-chart",
+                        "href": "/quant/positions",
+                    },
+                },
                 {
                     "component": "Item",
                     "props": {
@@ -206,7 +224,9 @@ class RouterConfig:
         # 独立渲染页面
         "/core/independent-page/demo": "独立页面演示示例",
         "/quant/market": "行情监控",
+        "/quant/quotes": "行情看板",
         "/quant/trade": "交易管理",
+        "/quant/positions": "持仓分析",
         "/quant/performance": "账户绩效",
         "/quant/fees": "费率管理",
         "/quant/stock-kline": "个股K线分析",
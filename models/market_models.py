@@ -1,4 +1,4 @@
-from peewee import CharField, FloatField, IntegerField, DateTimeField, CompositeKey
+from peewee import AutoField, CharField, FloatField, IntegerField, DateTimeField, CompositeKey
 from . import market_db, MarketBaseModel
 
 class KlineData(MarketBaseModel):
@@ -24,6 +24,37 @@ class KlineData(MarketBaseModel):
         # 联合主键更新为 stock_code + date
         primary_key = CompositeKey('stock_code', 'date')
 
+class KlineSyncState(MarketBaseModel):
+    """K线同步状态 (每次写入某标的K线时递增 generation，用于生成内容相关的 ETag)"""
+    stock_code = CharField(primary_key=True)
+    generation = IntegerField(default=0)
+    updated_at = DateTimeField(null=True)
+
+class Instrument(MarketBaseModel):
+    """合约主数据表 (id 为代码的整数编号，分配后不变)"""
+    id = AutoField()
+    stock_code = CharField(unique=True)
+    name = CharField(null=True)
+    exchange = CharField(null=True)
+    price_tick = FloatField(null=True)       # 最小变动价位
+    up_stop_price = FloatField(null=True)    # 涨停价
+    down_stop_price = FloatField(null=True)  # 跌停价
+    pre_close = FloatField(null=True)        # 前收盘价
+    open_date = CharField(null=True)         # 上市日期 YYYY-MM-DD
+    expire_date = CharField(null=True)       # 退市/到期日期 YYYY-MM-DD，无则为空
+    total_volume = FloatField(null=True)     # 总股本
+    float_volume = FloatField(null=True)     # 流通股本
+    updated_at = DateTimeField(null=True)
+
+
+class InstrumentSector(MarketBaseModel):
+    """板块成分索引 (板块 -> 合约编号)"""
+    sector = CharField(index=True)
+    instrument_id = IntegerField()
+
+    class Meta:
+        primary_key = CompositeKey('sector', 'instrument_id')
+
 # 确保表存在
 market_db.connect()
-market_db.create_tables([KlineData])
\ No newline at end of file
+market_db.create_tables([KlineData, KlineSyncState, Instrument, InstrumentSector])
\ No newline at end of file
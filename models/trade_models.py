@@ -95,6 +95,15 @@ class DailyPerformance(TradeBaseModel):
     cash = FloatField()           # 可用资金
     daily_return = FloatField()   # 当日收益
 
+class NavSnapshot(TradeBaseModel):
+    """单位净值快照 (按出入金申购/赎回份额)"""
+    date = CharField(unique=True) # YYYY-MM-DD
+    total_asset = FloatField()    # 当日总资产 (含当日出入金)
+    net_flow = FloatField(default=0.0) # 当日净入金 (出金为负)
+    units = FloatField()          # 日终份额
+    unit_nav = FloatField()       # 单位净值
+    daily_return = FloatField()   # 时间加权日收益率
+
 # 初始化表
 trade_db.connect()
-trade_db.create_tables([TradeRecord, FundFlow, DailyPerformance, OrderRecord], safe=True)
\ No newline at end of file
+trade_db.create_tables([TradeRecord, FundFlow, DailyPerformance, OrderRecord, NavSnapshot], safe=True)
\ No newline at end of file
@@ -11,6 +11,9 @@ from configs import BaseConfig, AuthConfig
 from datetime import datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from utils.market_data_sync import run_daily_sync_task
+from utils.instrument_master import run_instrument_refresh_task
+from utils.performance_builder import run_daily_performance_task
+from utils.qmt_health import qmt_health
 
 
 external_js = [
@@ -54,6 +57,26 @@ scheduler.add_job(
     replace_existing=True
 )
 
+# 添加定时任务：每天开盘前增量刷新合约主数据 (涨跌停价、股本、板块成分等每日变化)
+scheduler.add_job(
+    func=run_instrument_refresh_task,
+    trigger='cron',
+    hour=9,
+    minute=0,
+    id='daily_instrument_refresh',
+    replace_existing=True
+)
+
+# 添加定时任务：每天 17:30 在行情同步之后增量构建每日绩效快照
+scheduler.add_job(
+    func=run_daily_performance_task,
+    trigger='cron',
+    hour=17,
+    minute=30,
+    id='daily_performance_build',
+    replace_existing=True
+)
+
 # 可选：在启动时立即执行一次（用于测试，生产环境可注释掉）
 # scheduler.add_job(func=run_daily_sync_task, trigger='date', run_date=datetime.now() + timedelta(seconds=10))
 
@@ -63,6 +86,9 @@ scheduler.add_job(
 if not scheduler.running:
     scheduler.start()
 
+# 启动 QMT 健康监测：首次探测在后台连接交易接口并同步当日成交/委托，不阻塞应用启动
+qmt_health.start()
+
 
 class User(UserMixin):
     """flask-login专用用户类"""
@@ -0,0 +1,55 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+from configs.database_config import DatabaseConfig
+
+# 测试使用临时数据库，不读写本地的系统/行情/交易数据 (须在导入任何模型之前设置)
+_DB_DIR = tempfile.mkdtemp(prefix='magic_dash_test_')
+DatabaseConfig.database_type = 'sqlite'
+DatabaseConfig.system_db_name = os.path.join(_DB_DIR, 'magic_dash_pro.db')
+DatabaseConfig.market_db_name = os.path.join(_DB_DIR, 'market_data.db')
+DatabaseConfig.trade_db_name = os.path.join(_DB_DIR, 'trade_data.db')
+atexit.register(shutil.rmtree, _DB_DIR, ignore_errors=True)
+
+import itertools
+import numpy as np
+import pytest
+from peewee import SqliteDatabase
+
+from configs.fee_config import DEFAULT_EFFECTIVE_FROM, DEFAULT_FEES, FeeSchedulesSnapshot
+from models.market_models import Instrument
+from utils import fee_calculator
+from utils.code_registry import CodeRegistry
+
+# 测试用费率快照版本号 (与运行中的配置版本区分，避免命中已编译的费率计划)
+_versions = itertools.count(-1, -1)
+
+
+@pytest.fixture
+def registry():
+    """绑定内存数据库的代码登记表"""
+    db = SqliteDatabase(':memory:')
+    with db.bind_ctx([Instrument]):
+        db.create_tables([Instrument])
+        yield CodeRegistry()
+    db.close()
+
+
+class _FeeManagerStub:
+    """不读写配置文件的费率配置管理器"""
+    def __init__(self, schedules):
+        self.snapshot = FeeSchedulesSnapshot(schedules, next(_versions))
+
+
+@pytest.fixture
+def fee_schedules(monkeypatch, registry):
+    """替换费率计划与代码登记表，返回设置费率版本的函数 [(生效日期, 配置), ...]"""
+    monkeypatch.setattr(fee_calculator, 'code_registry', registry)
+    monkeypatch.setattr(fee_calculator, '_category_by_id', np.empty(0, dtype=np.int8))
+
+    def install(schedules=((DEFAULT_EFFECTIVE_FROM, DEFAULT_FEES),)):
+        monkeypatch.setattr(fee_calculator, 'fee_manager', _FeeManagerStub(list(schedules)))
+    install()
+    return install
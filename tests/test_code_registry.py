@@ -0,0 +1,25 @@
+import numpy as np
+
+from models.market_models import Instrument
+from utils.code_registry import UNKNOWN_ID
+
+
+def test_intern_many_assigns_stable_ids(registry):
+    ids = registry.intern_many(['600000.SH', '000001.SZ', None, '600000.SH'])
+
+    assert ids.dtype == np.int32
+    assert ids[0] == ids[3]
+    assert ids[0] != ids[1]
+    assert ids[2] == UNKNOWN_ID
+    # 仅登记真实代码，不产生多余记录
+    assert sorted(Instrument.select(Instrument.stock_code).tuples()) == [('000001.SZ',), ('600000.SH',)]
+    assert registry.codes_of(ids).tolist() == ['600000.SH', '000001.SZ', None, '600000.SH']
+
+
+def test_intern_many_reuses_registered_ids(registry):
+    first = registry.intern('000001.SZ')
+    ids = registry.intern_many(['000001.SZ', '300750.SZ'])
+
+    assert ids[0] == first
+    assert registry.get_id('300750.SZ') == ids[1]
+    assert Instrument.select().count() == 2
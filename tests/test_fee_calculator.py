@@ -0,0 +1,80 @@
+import copy
+import numpy as np
+
+from configs.fee_config import DEFAULT_EFFECTIVE_FROM, DEFAULT_FEES
+from models.market_models import Instrument
+from utils.fee_calculator import CompiledFeeSchedule, FeeCalculator
+
+
+def test_batch_with_trade_dates_uses_effective_schedule(fee_schedules):
+    later = copy.deepcopy(DEFAULT_FEES)
+    later['SH']['STOCK']['commission'] = {"rate": 0.0003, "min_fee": 5.0, "mode": "both"}
+    fee_schedules([(DEFAULT_EFFECTIVE_FROM, DEFAULT_FEES), ('2024-01-01', later)])
+
+    codes = ['600000.SH', '600000.SH', '000001.SZ']
+    prices = [10.0, 10.0, 10.0]
+    volumes = [10000, 10000, 10000]
+    sides = [1, 1, -1]
+    dates = ['2023-12-29', '2024-01-02 09:30:00', '2024-01-02']
+    fees = FeeCalculator.calculate_fees_batch(codes, prices, volumes, sides, trade_dates=dates)
+
+    assert fees['commission'].tolist() == [10.0, 30.0, 10.0]
+    for i in range(len(codes)):
+        expected = FeeCalculator.calculate_all_fees(codes[i], prices[i], volumes[i], sides[i], trade_date=dates[i][:10])
+        assert {k: v[i] for k, v in fees.items()} == expected
+
+
+def _random_trades(n, seed=0):
+    rng = np.random.default_rng(seed)
+    numbers = ['600000', '688981', '510300', '113050', '000001', '300750', '159915', '123100', '830799', '430047']
+    suffixes = ['.SH', '.SZ', '.BJ']
+    codes = [f"{rng.choice(numbers)}{rng.choice(suffixes)}" for _ in range(n)]
+    prices = np.round(rng.uniform(0.5, 300.0, n), 2)
+    volumes = rng.integers(1, 2000, n) * 100
+    sides = rng.choice([1, -1, 0], n)
+    # 费用恰好落在分位 .5 上的成交 (可转债佣金 0.125、印花税 5.005)
+    codes += ['113050.SH', '123100.SZ', '600000.SH', '000001.SZ']
+    prices = np.r_[prices, 31.25, 31.25, 100.1, 100.1]
+    volumes = np.r_[volumes, 100, 100, 100, 100]
+    sides = np.r_[sides, 1, -1, -1, -1]
+    return codes, prices, volumes, sides
+
+
+def test_batch_matches_scalar(fee_schedules):
+    codes, prices, volumes, sides = _random_trades(5000)
+    fees = FeeCalculator.calculate_fees_batch(codes, prices, volumes, sides)
+
+    for i in range(len(codes)):
+        expected = FeeCalculator.calculate_all_fees(codes[i], float(prices[i]), int(volumes[i]), int(sides[i]))
+        assert {k: float(v[i]) for k, v in fees.items()} == expected, codes[i]
+
+
+def test_compiled_schedule_matches_scalar(fee_schedules):
+    config = copy.deepcopy(DEFAULT_FEES)
+    # 仅买方收取的费用；北交所未配置 ETF/BOND，回退到 STOCK
+    config['SZ']['ETF']['other_fees'] = {"rate": 0.0002, "min_fee": 1.0, "mode": "buy"}
+    config['BJ']['STOCK']['commission'] = {"rate": 0.0003, "min_fee": 0.1, "mode": "both"}
+    schedule = CompiledFeeSchedule(config)
+
+    codes, prices, volumes, sides = _random_trades(2000, seed=1)
+    fees = FeeCalculator.calculate_fees_batch(codes, prices, volumes, sides, schedule=schedule)
+
+    for i in range(len(codes)):
+        expected = FeeCalculator.calculate_all_fees(codes[i], float(prices[i]), int(volumes[i]), int(sides[i]),
+                                                    schedule=schedule)
+        assert {k: float(v[i]) for k, v in fees.items()} == expected, codes[i]
+
+
+def test_batch_does_not_register_codes(fee_schedules, registry):
+    registry.intern('600000.SH')
+    codes = ['600000.SH', '688981.SH', '00001.SZ', None, '159915.SZ']
+    prices = [10.0, 50.0, 8.0, 10.0, 1.0]
+    volumes = [1000, 200, 500, 100, 10000]
+    sides = [1, -1, -1, 1, 1]
+    fees = FeeCalculator.calculate_fees_batch(codes, prices, volumes, sides)
+
+    assert Instrument.select().count() == 1
+    assert registry.get_id('688981.SH') is None
+    for i in range(len(codes)):
+        expected = FeeCalculator.calculate_all_fees(codes[i] or '', prices[i], volumes[i], sides[i])
+        assert {k: float(v[i]) for k, v in fees.items()} == expected, codes[i]
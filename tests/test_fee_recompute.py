@@ -0,0 +1,37 @@
+import pytest
+from datetime import datetime
+from peewee import SqliteDatabase
+
+pytest.importorskip('xtquant')
+
+from models.trade_models import TradeRecord
+from utils import fee_recompute
+from utils.fee_calculator import FeeCalculator
+
+
+@pytest.fixture
+def trade_table(monkeypatch):
+    """成交表绑定内存数据库，写入在当前线程执行"""
+    db = SqliteDatabase(':memory:')
+    monkeypatch.setattr(fee_recompute, 'trade_db', db)
+    monkeypatch.setattr(fee_recompute.trade_persistence, 'run', lambda fn: fn())
+    monkeypatch.setattr(fee_recompute.position_engine, 'invalidate', lambda: None)
+    with db.bind_ctx([TradeRecord]):
+        db.create_tables([TradeRecord])
+        yield TradeRecord
+    db.close()
+
+
+def test_trades_without_date_are_skipped(trade_table, fee_schedules):
+    rows = [('1', '2024-01-02'), ('2', ''), ('3', '2024-01-03')]
+    TradeRecord.insert_many([
+        {'traded_id': traded_id, 'order_id': traded_id, 'stock_code': '600000.SH',
+         'trade_time': datetime(2024, 1, 2, 10), 'trade_date': trade_date, 'order_type': 23,
+         'price': 10.0, 'volume': 1000, 'amount': 10000.0, 'side': 1}
+        for traded_id, trade_date in rows
+    ]).execute()
+
+    assert fee_recompute.recompute_trade_fees(batch_size=2) == (3, 2, 1)
+    expected = FeeCalculator.calculate_all_fees('600000.SH', 10.0, 1000, 1, trade_date='2024-01-02')['total_fees']
+    fees = dict(TradeRecord.select(TradeRecord.traded_id, TradeRecord.total_fees).tuples())
+    assert fees == {'1': expected, '2': 0.0, '3': expected}
@@ -0,0 +1,34 @@
+from utils.fill_aggregator import FillAggregator
+
+
+def _fill(traded_id, order_id='1', traded_time=100, volume=100, price=10.0):
+    return {
+        'traded_id': traded_id, 'order_id': order_id, 'stock_code': '600000.SH', 'traded_time': traded_time,
+        'order_type': 23, 'direction': 48, 'offset_flag': 48, 'traded_price': price,
+        'traded_volume': volume, 'traded_amount': price * volume, 'strategy_name': '', 'order_remark': '',
+    }
+
+
+def test_apply_merges_and_dedupes():
+    aggregator = FillAggregator()
+    aggregator.reset([])
+    merged, stale = aggregator.apply(_fill('b', traded_time=200))
+    assert (merged['volume'], merged['primary_traded_id'], stale) == (100, 'b', [])
+    assert aggregator.apply(_fill('b', traded_time=200)) is None
+
+    # 乱序到达的更早成交成为主记录
+    merged, stale = aggregator.apply(_fill('a', traded_time=100))
+    assert (merged['volume'], merged['primary_traded_id'], merged['last_time'], stale) == (200, 'a', 200, ['b'])
+
+
+def test_pending_fills_are_merged_by_reconcile():
+    aggregator = FillAggregator()
+    assert not aggregator.seeded
+    assert aggregator.defer([_fill('a'), _fill('c', traded_time=300)]) == 2
+
+    # 查询结果只包含其中一笔，暂存的推送补齐另一笔
+    queried = [_fill('a')]
+    merged = aggregator.reset(queried + aggregator.take_pending())
+    assert aggregator.seeded
+    assert aggregator.take_pending() == []
+    assert [(m['volume'], m['last_time']) for m in merged] == [(200, 300)]
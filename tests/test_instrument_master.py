@@ -0,0 +1,53 @@
+import threading
+import pytest
+
+pytest.importorskip('xtquant')
+
+from utils import instrument_master as module
+from utils.instrument_master import InstrumentMaster
+
+
+@pytest.fixture
+def master(monkeypatch):
+    master = InstrumentMaster()
+    monkeypatch.setattr(master, '_refresh', lambda sectors, full: (1, '更新 1 条'))
+    monkeypatch.setattr(module, 'instrument_master', master)
+    return master
+
+
+def _wait(master):
+    master._refresh_thread.join(5)
+    return master.get_progress()
+
+
+def test_failed_on_complete_marks_failed(master):
+    def on_complete():
+        raise RuntimeError('写入名称失败')
+
+    assert master.start_refresh(on_complete=on_complete)
+    progress = _wait(master)
+    assert progress['state'] == 'failed'
+    assert progress['message'] == '写入名称失败'
+
+
+def test_scheduled_refresh_shares_state(master, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_refresh(sectors, full):
+        started.set()
+        release.wait(5)
+        return 1, '更新 1 条'
+
+    monkeypatch.setattr(master, '_refresh', slow_refresh)
+    job = threading.Thread(target=module.run_instrument_refresh_task)
+    job.start()
+    started.wait(5)
+    # 定时任务进行中：手动刷新与再次触发的定时任务均不重复执行
+    assert master.is_refreshing()
+    assert not master.start_refresh()
+    assert master.refresh(blocking=False) is None
+
+    release.set()
+    job.join(5)
+    assert not master.is_refreshing()
+    assert master.get_progress()['state'] == 'done'
@@ -0,0 +1,41 @@
+import pytest
+from peewee import SqliteDatabase
+
+from models.market_models import KlineData, KlineSyncState
+from utils.kline_service import bump_sync_generation, get_sync_watermark, kline_payload_cache
+
+
+@pytest.fixture
+def kline_tables():
+    db = SqliteDatabase(':memory:')
+    with db.bind_ctx([KlineData, KlineSyncState]):
+        db.create_tables([KlineData, KlineSyncState])
+        yield db
+    db.close()
+
+
+def _bar(date, close):
+    return {'stock_code': '600000.SH', 'date': date, 'open': 10.0, 'high': 11.0, 'low': 9.0,
+            'close': close, 'volume': 1000, 'amount': 10000.0}
+
+
+def test_revised_bar_changes_etag(kline_tables):
+    with kline_tables.atomic():
+        KlineData.insert_many([_bar('2024-01-02', 10.0), _bar('2024-01-03', 10.5)]).execute()
+        bump_sync_generation(['600000.SH'])
+    etag, last_modified = kline_payload_cache.make_validators('600000.SH', get_sync_watermark('600000.SH'))
+
+    # 原地修订最新一根K线：日期与记录数不变
+    with kline_tables.atomic():
+        KlineData.insert_many([_bar('2024-01-03', 10.8)]).on_conflict_replace().execute()
+        bump_sync_generation(['600000.SH'])
+    revised_etag, revised_modified = kline_payload_cache.make_validators('600000.SH', get_sync_watermark('600000.SH'))
+
+    assert revised_etag != etag
+    assert revised_modified >= last_modified
+
+
+def test_watermark_without_sync_state(kline_tables):
+    KlineData.insert_many([_bar('2024-01-02', 10.0)]).execute()
+    assert get_sync_watermark('600000.SH')[:3] == ('2024-01-02', 1, 0)
+    assert get_sync_watermark('000001.SZ')[0] is None
@@ -0,0 +1,25 @@
+import numpy as np
+
+from utils.nav_unitisation import compute_unit_nav
+
+
+def test_resume_matches_full_computation():
+    # 含入金、出金、清仓后重新入金
+    assets = [100.0, 110.0, 160.0, 150.0, 0.0, 0.0, 50.0, 55.0]
+    flows = [100.0, 0.0, 50.0, -20.0, -140.0, 0.0, 50.0, 0.0]
+    units, nav, daily_return = compute_unit_nav(assets, flows)
+
+    for split in range(1, len(assets)):
+        tail = compute_unit_nav(assets[split:], flows[split:],
+                                units[split - 1], nav[split - 1], assets[split - 1])
+        np.testing.assert_allclose(tail[0], units[split:])
+        np.testing.assert_allclose(tail[1], nav[split:])
+        np.testing.assert_allclose(tail[2], daily_return[split:])
+
+
+def test_restart_after_empty_account():
+    # 上一日份额仍为正但资产已归零：以上一净值重新起算，而不是除以旧份额
+    units, nav, _ = compute_unit_nav([80.0], [70.0], prev_units=0.5, prev_nav=1.2, prev_assets=0.0)
+
+    assert nav.tolist() == [1.2]
+    np.testing.assert_allclose(units, [80.0 / 1.2])
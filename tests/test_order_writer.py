@@ -0,0 +1,71 @@
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from models.trade_models import OrderRecord
+from utils.order_writer import OrderRecordWriter
+from utils.trade_persistence import TradePersistenceService, WriteEvent
+
+
+def _order(order_id, status, traded_volume=0):
+    now = datetime.now()
+    return {
+        'order_id': order_id, 'stock_code': '600000.SH', 'stock_name': '浦发银行',
+        'order_time': now, 'order_date': now.strftime('%Y-%m-%d'),
+        'order_type': 23, 'order_volume': 1000, 'price': 10.0,
+        'traded_volume': traded_volume, 'traded_price': 10.0 if traded_volume else 0.0,
+        'order_status': status, 'side': 1,
+    }
+
+
+def _event(kind, payload):
+    return WriteEvent(kind, payload, time.monotonic(), None, None)
+
+
+def _failing_trades(payloads):
+    raise RuntimeError('写入成交失败')
+
+
+def test_rolled_back_push_is_written_again():
+    pytest.importorskip('xtquant')
+    from utils.trade_persistence import trade_persistence
+    # 导入时注册成交/委托处理函数
+    import utils.xt_manager  # noqa: F401
+
+    # 使用行情管理器注册的委托处理函数，成交处理函数替换为必定失败
+    service = TradePersistenceService()
+    service._handlers['order'] = trade_persistence._handlers['order']
+    service.register_handler('trade', _failing_trades)
+
+    filled = SimpleNamespace(
+        order_id=91001, stock_code='600000.SH', order_time=int(datetime.now().timestamp()),
+        order_type=23, direction=48, offset_flag=48, price_type=11, order_volume=1000, price=10.0,
+        traded_volume=1000, traded_price=10.0, order_status=56, status_msg='', strategy_name='',
+        order_remark='',
+    )
+    # 同一批次的成交处理失败，委托更新随事务回滚
+    service._process([_event('order', filled), _event('trade', None)])
+    assert not OrderRecord.select().where(OrderRecord.order_id == '91001').exists()
+
+    # 之后相同的推送不能被当作未变化而跳过
+    service._process([_event('order', filled)])
+    assert OrderRecord.get(OrderRecord.order_id == '91001').order_status == 56
+
+
+def test_state_is_kept_only_after_commit():
+    writer = OrderRecordWriter()
+    service = TradePersistenceService()
+    service.register_handler('order', writer.save, writer.rollback, writer.commit)
+    service.register_handler('trade', _failing_trades)
+
+    reported = _order('commit-1', 50)
+    service._process([_event('order', reported), _event('trade', None)])
+    assert 'commit-1' not in writer._state
+
+    service._process([_event('order', reported)])
+    assert OrderRecord.get(OrderRecord.order_id == 'commit-1').order_status == 50
+    # 已提交的状态不再重复写入，状态变化后照常写入
+    assert writer.filter_changed([reported]) == []
+    assert len(writer.filter_changed([_order('commit-1', 56, 1000)])) == 1
@@ -0,0 +1,90 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+from peewee import SqliteDatabase
+
+from models.market_models import KlineData
+from models.trade_models import DailyPerformance, FundFlow, TradeRecord
+
+from utils import performance_builder
+from utils.performance_metrics import PerformanceReportCache
+
+
+def _write_state(path, version, mtime_ns):
+    path.write_text(json.dumps({'version': version}), encoding='utf-8')
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_external_rebuild_invalidates_cached_reports(tmp_path, monkeypatch):
+    path = tmp_path / 'performance_state.json'
+    _write_state(path, 1, 1_000_000_000)
+    monkeypatch.setattr(performance_builder, 'PERFORMANCE_STATE_PATH', path)
+    monkeypatch.setattr(performance_builder, 'VERSION_CHECK_INTERVAL', 0.0)
+    monkeypatch.setattr(performance_builder, '_version', None)
+
+    builds = []
+    monkeypatch.setattr(PerformanceReportCache, '_build',
+                        staticmethod(lambda benchmark, window: builds.append(benchmark) or {'n': len(builds)}))
+    cache = PerformanceReportCache()
+
+    assert cache.get_report('000300.SH', 60) == {'n': 1}
+    assert cache.get_report('000300.SH', 60) == {'n': 1}
+
+    # 其他进程重建快照：状态文件版本号与修改时间变化
+    _write_state(path, 2, 2_000_000_000)
+    assert performance_builder.get_performance_version() == 2
+    assert cache.get_report('000300.SH', 60) == {'n': 2}
+
+
+@pytest.fixture
+def performance_tables():
+    db = SqliteDatabase(':memory:')
+    models = [KlineData, TradeRecord, FundFlow, DailyPerformance]
+    with db.bind_ctx(models):
+        db.create_tables(models)
+        yield db
+    db.close()
+
+
+def _buy(traded_id, code, trade_date, volume, price):
+    return {'traded_id': traded_id, 'order_id': traded_id, 'stock_code': code,
+            'trade_time': datetime.fromisoformat(f"{trade_date} 10:00:00"), 'trade_date': trade_date,
+            'order_type': 23, 'price': price, 'volume': volume, 'amount': volume * price, 'side': 1}
+
+
+def _close(code, day, close):
+    return {'stock_code': code, 'date': day, 'open': close, 'high': close, 'low': close,
+            'close': close, 'volume': 0, 'amount': 0.0}
+
+
+def test_long_suspended_base_holding_is_seeded(performance_tables, capsys):
+    TradeRecord.insert_many([
+        _buy('1', '600000.SH', '2023-01-05', 1000, 10.0),
+        _buy('2', '000001.SZ', '2023-01-05', 100, 20.0),
+        _buy('3', '830799.BJ', '2023-01-05', 10, 5.0),
+        _buy('4', '830799.BJ', '2023-01-06', 30, 7.0),
+    ]).execute()
+    # 600000.SH 停牌至窗口之后；830799.BJ 没有任何行情
+    KlineData.insert_many([
+        _close('600000.SH', '2023-03-01', 12.0),
+        _close('000001.SZ', '2024-01-02', 21.0),
+        _close('000001.SZ', '2024-01-03', 22.0),
+        _close('600000.SH', '2024-01-03', 13.0),
+    ]).execute()
+
+    df = performance_builder.compute_performance('2024-01-02', '2024-01-03')
+
+    assert df['market_value'].tolist() == [12000.0 + 2100.0 + 260.0, 13000.0 + 2200.0 + 260.0]
+    assert '830799.BJ' not in capsys.readouterr().out
+
+
+def test_unpriced_base_holding_warns(performance_tables, capsys):
+    # 缺少早期买入记录的卖出：既无行情也无买入均价
+    TradeRecord.insert_many([_buy('1', '600000.SH', '2023-01-05', 1000, 10.0)]).execute()
+    TradeRecord.update(side=-1, order_type=24).execute()
+    TradeRecord.insert_many([_buy('2', '000001.SZ', '2024-01-02', 100, 20.0)]).execute()
+
+    performance_builder.compute_performance('2024-01-02', '2024-01-02')
+    assert '600000.SH' in capsys.readouterr().out
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('xtquant')
+
+from utils.position_engine import _Position, replay_positions
+
+
+def _reference(df):
+    """逐笔应用成交的参考实现"""
+    positions = {}
+    for row in df.itertuples(index=False):
+        key = (row.stock_code, row.strategy_name)
+        pos = positions.setdefault(key, _Position(*key))
+        pos.apply(row.side, row.volume, row.amount, row.total_fees, row.trade_time)
+    return positions
+
+
+def test_many_partial_sells_match_reference():
+    rng = np.random.default_rng(0)
+    rows = [('600000.SH', 1, 1000, 10.0)]
+    # 每轮卖出几乎全部持仓再补回：保留比例连乘远低于浮点下限
+    for _ in range(300):
+        rows.append(('600000.SH', -1, 999, float(rng.uniform(8.0, 12.0))))
+        rows.append(('600000.SH', 1, 999, float(rng.uniform(8.0, 12.0))))
+    # 另一只股票的数百次小额部分卖出
+    rows.append(('000001.SZ', 1, 100000, 12.0))
+    rows += [('000001.SZ', -1, int(rng.integers(1, 300)), float(rng.uniform(10.0, 14.0))) for _ in range(400)]
+
+    start = pd.Timestamp('2024-01-02 09:30:00')
+    df = pd.DataFrame({
+        'order_id': [str(i) for i in range(len(rows))],
+        'stock_code': [r[0] for r in rows],
+        'strategy_name': '测试策略',
+        'trade_time': [start + pd.Timedelta(seconds=i) for i in range(len(rows))],
+        'side': [r[1] for r in rows],
+        'volume': [r[2] for r in rows],
+        'amount': [r[2] * r[3] for r in rows],
+        'total_fees': [round(r[2] * r[3] * 0.0003, 2) for r in rows],
+    })
+
+    expected = _reference(df)
+    positions = replay_positions(df.copy())
+    assert positions.keys() == expected.keys()
+    for key, pos in positions.items():
+        ref = expected[key]
+        assert pos.quantity == ref.quantity
+        assert np.isfinite(pos.cost)
+        assert pos.cost == pytest.approx(ref.cost, rel=1e-9)
+        assert pos.realized_avg == pytest.approx(ref.realized_avg, rel=1e-9)
+        assert pos.realized_fifo == pytest.approx(ref.realized_fifo, rel=1e-9)
@@ -0,0 +1,29 @@
+import json
+import pytest
+
+pytest.importorskip('xtquant')
+
+from utils import stock_info_manager as module
+from utils.stock_info_manager import stock_info_manager
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(stock_info_manager, '_cache', {})
+    monkeypatch.setattr(stock_info_manager, '_dirty', False)
+    monkeypatch.setattr(module, 'CACHE_FILE', tmp_path / 'missing' / 'stock_names.json')
+    yield tmp_path
+    stock_info_manager.flush()
+
+
+def test_failed_save_keeps_dirty(cache, monkeypatch):
+    stock_info_manager._put_name('600000.SH', '浦发银行')
+    stock_info_manager.save_cache()
+    # 目录不存在，写入失败后仍待写盘
+    assert stock_info_manager._dirty
+
+    path = cache / 'stock_names.json'
+    monkeypatch.setattr(module, 'CACHE_FILE', path)
+    stock_info_manager.flush()
+    assert not stock_info_manager._dirty
+    assert json.loads(path.read_text(encoding='utf-8')) == {'600000.SH': '浦发银行'}
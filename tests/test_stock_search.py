@@ -0,0 +1,63 @@
+import pytest
+
+pytest.importorskip('xtquant')
+
+from utils.stock_info_manager import stock_info_manager
+from utils.stock_search import StockSearchIndex
+
+
+@pytest.fixture
+def names(monkeypatch):
+    monkeypatch.setattr(stock_info_manager, '_cache', {'600000.SH': '浦发银行', '000001.SZ': '平安银行'})
+    monkeypatch.setattr(stock_info_manager, 'version', stock_info_manager.version + 1)
+    return stock_info_manager._cache
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = StockSearchIndex()
+    monkeypatch.setattr(index, '_snapshot', None)
+    return index
+
+
+def _wait_rebuild(index):
+    if index._rebuild_thread is not None:
+        index._rebuild_thread.join(5)
+
+
+def test_rebuilds_after_rename(names, index):
+    assert index.search('浦发') == [('600000.SH', '浦发银行')]
+
+    # 改名不改变映射大小，仍需重建；重建在后台进行，期间沿用旧索引
+    names['600000.SH'] = '上海浦发'
+    stock_info_manager.version += 1
+    assert index.search('浦发') == [('600000.SH', '浦发银行')]
+
+    _wait_rebuild(index)
+    assert index.search('浦发') == []
+    assert index.search('上海') == [('600000.SH', '上海浦发')]
+
+
+def test_name_insert_does_not_block_search(names, index, monkeypatch):
+    index.search('浦发')
+    builds = []
+    build = index._build
+    monkeypatch.setattr(index, '_build', lambda mapping: builds.append(len(mapping)) or build(mapping))
+
+    # 连续补充多个名称：检索不等待重建，重建合并执行
+    for i in range(5):
+        names[f"30075{i}.SZ"] = f"测试{i}"
+        stock_info_manager.version += 1
+        assert index.search('浦发') == [('600000.SH', '浦发银行')]
+    _wait_rebuild(index)
+
+    assert builds and builds[-1] == 7
+    assert index.search('测试') == [(f"30075{i}.SZ", f"测试{i}") for i in range(5)]
+
+
+def test_select_options_keeps_current_value(names, index):
+    options = index.select_options('600', current_value='000001.SZ')
+    assert options == [
+        {'label': '浦发银行 (600000.SH)', 'value': '600000.SH'},
+        {'label': '平安银行 (000001.SZ)', 'value': '000001.SZ'},
+    ]
@@ -0,0 +1,139 @@
+import pandas as pd
+import pytest
+from peewee import SqliteDatabase
+
+pytest.importorskip('xtquant')
+
+from models.trade_models import TradeRecord
+from utils import trade_importer
+from utils.broker_statement import NORMALIZED_COLUMNS
+from utils.fee_calculator import FeeCalculator
+
+# 合约主数据：000001 同时存在深市股票与沪市指数
+_CANDIDATES = {'000001': ('000001.SH', '000001.SZ'), '600000': ('600000.SH',)}
+_INDEXES = {'000001.SH'}
+
+
+@pytest.fixture
+def names(monkeypatch):
+    table = {'600000.SH': '浦发银行', '000001.SZ': '平安银行'}
+    monkeypatch.setattr(trade_importer.stock_info_manager, 'get_stock_name', lambda code: table.get(code, code))
+    return table
+
+
+@pytest.fixture
+def master(monkeypatch):
+    monkeypatch.setattr(trade_importer.instrument_master, 'get_candidates', lambda n: _CANDIDATES.get(n, ()))
+    monkeypatch.setattr(trade_importer.instrument_master, 'in_sector', lambda code, sector: code in _INDEXES)
+
+
+@pytest.fixture
+def trade_table(monkeypatch):
+    """成交表绑定内存数据库，写入在当前线程执行"""
+    db = SqliteDatabase(':memory:')
+    monkeypatch.setattr(trade_importer, 'trade_db', db)
+    monkeypatch.setattr(trade_importer.trade_persistence, 'run', lambda fn: fn())
+    monkeypatch.setattr(trade_importer.position_engine, 'invalidate', lambda: None)
+    with db.bind_ctx([TradeRecord]):
+        db.create_tables([TradeRecord])
+        yield TradeRecord
+    db.close()
+
+
+def _statement(rows):
+    return pd.DataFrame(rows, columns=NORMALIZED_COLUMNS)
+
+
+def test_resolve_stock_codes(master):
+    codes = trade_importer.resolve_stock_codes(
+        ['000001', '000001', '600000', '510300.SH', '300750', '000001'],
+        ['A123', '0123', '', '', '', None]
+    )
+    # 沪市账号选沪市，深市账号选深市，无账号时排除指数；主数据中没有的按前缀补全
+    assert codes.tolist() == ['000001.SH', '000001.SZ', '600000.SH', '510300.SH', '300750.SZ', '000001.SZ']
+
+
+def test_prepare_statement_and_build_records(fee_schedules, names, master):
+    frame = _statement([
+        [0, '0123', '2024-01-02', '09:30:00', '000001', 1, 100.0, 12.5, 1250.0, ''],
+        [1, '0123', '2024-01-02', '', '000001', 1, 100.0, 12.5, 1250.0, ''],
+        [2, 'A123', '2024-01-02', '10:00:00', '600000', -1, 200.0, 10.0, 2000.0, '88'],
+    ])
+    prepared = trade_importer.prepare_statement(frame)
+
+    assert prepared['stock_code'].tolist() == ['000001.SZ', '000001.SZ', '600000.SH']
+    # 完全相同的两笔成交以出现序号区分，有成交编号的直接使用
+    assert prepared['traded_id'].tolist() == [
+        '0123_2024-01-02_000001.SZ_12.5_100.0_1',
+        '0123_2024-01-02_000001.SZ_12.5_100.0_1_1',
+        'A123_2024-01-02_600000.SH_88',
+    ]
+    assert prepared['legacy_id'].tolist() == ['2024-01-02_000001.SZ_12.5_100.0_1', None,
+                                              '2024-01-02_600000.SH_10.0_200.0_-1']
+
+    records, _ = trade_importer.build_records(prepared, 'tag')
+    assert [r['stock_name'] for r in records] == ['平安银行', '平安银行', '浦发银行']
+
+
+def test_import_statements_skips_failed_file(tmp_path, fee_schedules, names, master, trade_table):
+    good = tmp_path / 'b.csv'
+    pd.DataFrame({
+        '日期': ['2024-01-02', '2024-01-02'], '证券代码': ['600000', '000001'], '业务标志': ['证券买入', '证券卖出'],
+        '发生数量': [100, -100], '成交均价': [10.0, 12.5], '成交金额': [1000.0, 1250.0], '股东账号': ['A123', '0123'],
+    }).to_csv(good, index=False)
+    (tmp_path / 'a.csv').write_text('列1,列2\n1,2\n', encoding='utf-8')
+
+    summary = trade_importer.import_statements([tmp_path], workers=1)
+
+    assert summary['failed'] == 1
+    assert summary['files'] == 1
+    assert summary['inserted'] == 2
+    assert trade_table.select().count() == 2
+    # 重复导入不再写入
+    assert trade_importer.import_statements([good], workers=1)['inserted'] == 0
+
+
+def test_build_records(fee_schedules, names):
+    frame = pd.DataFrame({
+        'row': [0, 1, 2],
+        'account': ['A123', '0123', 'A123'],
+        'date': ['2024-01-02', '2024-01-02', '2024-01-03'],
+        'time': ['09:30:01', '', '10:00:00'],
+        'code': ['600000', '000001', '600000'],
+        'side': [1, 1, -1],
+        'volume': [1000.0, 500.0, 1000.0],
+        'price': [10.0, 12.5, 10.5],
+        'amount': [10000.0, 6250.0, 10500.0],
+        'contract': ['', '', ''],
+        'stock_code': ['600000.SH', '000001.SZ', '600000.SH'],
+        'traded_id': ['t0', 't1', 't2'],
+        'legacy_id': ['l0', 'l1', None],
+    })
+    records, legacy_ids = trade_importer.build_records(frame, 'tag')
+
+    assert legacy_ids == ['l0', 'l1', None]
+    assert [r['stock_name'] for r in records] == ['浦发银行', '平安银行', '浦发银行']
+    assert [r['order_id'] for r in records] == ['IMPORT_tag_0', 'IMPORT_tag_1', 'IMPORT_tag_2']
+    # 无成交时间的记为 15:00
+    assert str(records[1]['trade_time']) == '2024-01-02 15:00:00'
+    assert [r['side'] for r in records] == [1, 1, -1]
+    expected = FeeCalculator.calculate_all_fees('600000.SH', 10.5, 1000, -1, trade_date='2024-01-03')
+    assert {k: records[2][k] for k in expected} == expected
+
+
+def test_legacy_trade_is_claimed_by_one_account(tmp_path, fee_schedules, names, master, trade_table):
+    # 旧版导入的成交编号不含账号
+    trade_table.create(traded_id='2024-01-02_600000.SH_10.0_100.0_1', order_id='IMPORT_old_0',
+                       stock_code='600000.SH', trade_time=pd.Timestamp('2024-01-02 15:00:00').to_pydatetime(),
+                       trade_date='2024-01-02', order_type=23, price=10.0, volume=100, amount=1000.0, side=1)
+    path = tmp_path / 'accounts.csv'
+    pd.DataFrame({
+        '日期': ['2024-01-02', '2024-01-02'], '证券代码': ['600000', '600000'], '业务标志': ['证券买入', '证券买入'],
+        '发生数量': [100, 100], '成交均价': [10.0, 10.0], '成交金额': [1000.0, 1000.0], '股东账号': ['A123', 'A456'],
+    }).to_csv(path, index=False)
+
+    assert trade_importer.import_statements([path], workers=1)['inserted'] == 1
+    assert sorted(t for (t,) in trade_table.select(trade_table.traded_id).tuples()) == [
+        'A123_2024-01-02_600000.SH_10.0_100.0_1', 'A456_2024-01-02_600000.SH_10.0_100.0_1',
+    ]
+    assert trade_importer.import_statements([path], workers=1)['inserted'] == 0
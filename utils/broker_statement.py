@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from configs.broker_config import BROKER_PROFILES, REQUIRED_FIELDS
+
+# 每次读取的行数
+READ_CHUNK_SIZE = 20000
+
+# 支持的交割单文件类型
+STATEMENT_SUFFIXES = ('.xlsx', '.xlsm', '.csv', '.txt')
+
+# 解析结果的标准列
+NORMALIZED_COLUMNS = ['row', 'account', 'date', 'time', 'code', 'side', 'volume', 'price', 'amount', 'contract']
+
+# 按文本处理的标准字段 (纯数字单元格补齐前导0)
+_TEXT_FIELDS = {'code': 6, 'account': 0, 'contract': 0}
+
+
+def _candidates(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+def resolve_profile(columns, broker=None):
+    """
+    根据列名选择券商格式，返回 (券商标识, 格式配置, {标准字段: 实际列名})
+    broker 为空时选择必需字段齐全且匹配列数最多的格式
+    """
+    columns = [str(c).strip() for c in columns]
+    best = None
+    for key, profile in BROKER_PROFILES.items():
+        if broker and key != broker:
+            continue
+        mapping = {}
+        for field, names in profile['columns'].items():
+            found = next((n for n in _candidates(names) if n in columns), None)
+            if found:
+                mapping[field] = found
+        if all(f in mapping for f in REQUIRED_FIELDS) and (best is None or len(mapping) > len(best[2])):
+            best = (key, profile, mapping)
+    if best is None:
+        raise ValueError(f"无法识别的交割单格式{f' ({broker})' if broker else ''}，列名: {columns}")
+    return best
+
+
+def _read_header(path):
+    if Path(path).suffix.lower() in ('.csv', '.txt'):
+        for encoding in ('utf-8-sig', 'gbk'):
+            try:
+                return list(pd.read_csv(path, nrows=0, encoding=encoding).columns), encoding
+            except UnicodeDecodeError:
+                continue
+        raise ValueError(f"无法识别文件编码: {path}")
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        header = next(workbook.worksheets[0].iter_rows(values_only=True), None) or ()
+    finally:
+        workbook.close()
+    return [str(c).strip() if c is not None else '' for c in header], None
+
+
+def _iter_csv(path, text_columns, encoding, chunk_size):
+    yield from pd.read_csv(path, dtype={c: str for c in text_columns}, chunksize=chunk_size, encoding=encoding)
+
+
+def _iter_excel(path, chunk_size):
+    """以只读模式逐行读取工作簿第一张表，每 chunk_size 行组成一个 DataFrame"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c).strip() if c is not None else '' for c in header]
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def _text(series, width):
+    """文本字段：数值单元格转为整数文本 (width > 0 时补齐前导0)，缺失为空串"""
+    def convert(v):
+        if v is None or (isinstance(v, float) and v != v):
+            return ''
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            return f"{int(v):0{width}d}" if width else str(int(v))
+        return str(v).strip()
+    return series.map(convert)
+
+
+def _contains_any(flags, keywords):
+    mask = np.zeros(len(flags), dtype=bool)
+    for keyword in keywords:
+        mask |= flags.str.contains(keyword, regex=False).to_numpy()
+    return mask
+
+
+def normalize_chunk(df, profile, mapping, row_offset=0):
+    """
+    向量化解析一块交割单为标准列
+    返回 (标准列 DataFrame, 无法解析的行数, 跳过的非成交行数)
+    """
+    df = df.rename(columns=lambda c: str(c).strip())
+    n = len(df)
+
+    def column(field):
+        if field in mapping:
+            return df[mapping[field]]
+        return pd.Series([None] * n, index=df.index, dtype=object)
+
+    flags = column('flag').fillna('').astype(str)
+    skipped = _contains_any(flags, profile.get('skip_flags', []))
+
+    dates = pd.to_datetime(column('date').astype(str).str.split(' ').str[0], errors='coerce')
+    volume = pd.to_numeric(column('volume'), errors='coerce')
+    price = pd.to_numeric(column('price'), errors='coerce')
+    amount = pd.to_numeric(column('amount'), errors='coerce').abs()
+    codes = _text(column('code'), _TEXT_FIELDS['code'])
+
+    valid = (dates.notna() & volume.notna() & price.notna() & amount.notna() & (codes != '')).to_numpy()
+    # 数量为 0 的行 (如 利息归本) 不是成交
+    zero = (volume.fillna(0) == 0).to_numpy()
+    keep = valid & ~skipped & ~zero
+
+    # 方向：业务标志优先，否则按数量正负
+    side = np.where(volume.fillna(0).to_numpy() < 0, -1, 1)
+    side = np.where(_contains_any(flags, profile.get('sell_flags', [])), -1, side)
+    side = np.where(_contains_any(flags, profile.get('buy_flags', [])), 1, side)
+
+    # 成交时间：取最后一段 HH:MM:SS (兼容 日期+时间 的单元格)，无法解析时为空
+    time_str = pd.Series([''] * n, index=df.index)
+    if 'time' in mapping:
+        times = column('time').astype(str).str.strip().str.split(' ').str[-1]
+        time_str = pd.to_datetime(times, format='%H:%M:%S', errors='coerce').dt.strftime('%H:%M:%S')
+
+    result = pd.DataFrame({
+        'row': row_offset + np.arange(n),
+        'account': _text(column('account'), _TEXT_FIELDS['account']).to_numpy(),
+        'date': dates.dt.strftime('%Y-%m-%d').to_numpy(),
+        'time': time_str.fillna('').to_numpy(),
+        'code': codes.to_numpy(),
+        'side': side.astype(np.int8),
+        'volume': volume.abs().to_numpy(dtype=np.float64),
+        'price': price.to_numpy(dtype=np.float64),
+        'amount': amount.to_numpy(dtype=np.float64),
+        'contract': _text(column('contract'), _TEXT_FIELDS['contract']).to_numpy(),
+    })[keep]
+    return result.reset_index(drop=True), int((~valid & ~skipped).sum()), int((skipped | (valid & zero)).sum())
+
+
+def parse_statement_file(path, broker=None, chunk_size=READ_CHUNK_SIZE):
+    """
+    逐块读取并解析一个交割单文件 (不访问数据库与行情接口，可在子进程中执行)
+    返回 (券商标识, 标准列 DataFrame, {'rows', 'invalid', 'skipped'})
+    """
+    header, encoding = _read_header(path)
+    key, profile, mapping = resolve_profile(header, broker)
+    if encoding is not None:
+        text_columns = [mapping[f] for f in _TEXT_FIELDS if f in mapping]
+        chunks = _iter_csv(path, text_columns, encoding, chunk_size)
+    else:
+        chunks = _iter_excel(path, chunk_size)
+
+    frames = []
+    stats = {'rows': 0, 'invalid': 0, 'skipped': 0}
+    for df in chunks:
+        frame, invalid, skipped = normalize_chunk(df, profile, mapping, stats['rows'])
+        frames.append(frame)
+        stats['rows'] += len(df)
+        stats['invalid'] += invalid
+        stats['skipped'] += skipped
+    frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=NORMALIZED_COLUMNS)
+    return key, frame, stats
+
+
+def expand_statement_paths(paths):
+    """展开目录为其中的交割单文件 (按文件名排序)"""
+    files = []
+    for path in ([paths] if isinstance(paths, (str, Path)) else paths):
+        path = Path(path)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir()
+                                if p.suffix.lower() in STATEMENT_SUFFIXES and not p.name.startswith('~$')))
+        else:
+            files.append(path)
+    return files
@@ -0,0 +1,119 @@
+import threading
+import numpy as np
+import pandas as pd
+from peewee import chunked
+
+from models.market_models import Instrument
+
+# 未登记代码的编号
+UNKNOWN_ID = -1
+
+
+class CodeRegistry:
+    """
+    证券代码 <-> 整数编号 登记表
+    编号持久化在合约主数据表 (Instrument.id)，分配后不变，各进程共享；
+    缓存与批量计算可用 int32 编号及按编号下标的数组代替字符串键
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = None
+        # 编号 -> 代码 (下标即编号，空位为 None)
+        self._codes = []
+        self._code_array = np.empty(0, dtype=object)
+
+    def _ensure_loaded(self):
+        if self._ids is None:
+            with self._lock:
+                if self._ids is None:
+                    self._merge(Instrument.select(Instrument.id, Instrument.stock_code).tuples())
+
+    def _merge(self, pairs):
+        """合并 (编号, 代码) 到内存映射 (调用方持有锁)"""
+        ids = dict(self._ids or {})
+        codes = list(self._codes)
+        for code_id, code in pairs:
+            ids[code] = code_id
+            if code_id >= len(codes):
+                codes.extend([None] * (code_id + 1 - len(codes)))
+            codes[code_id] = code
+        # 先替换反查表再替换正查表，读取端拿到编号时必能反查到代码
+        self._codes = codes
+        self._code_array = np.array(codes, dtype=object)
+        self._ids = ids
+
+    @property
+    def size(self):
+        """编号上界 (最大编号 + 1)，可用作按编号下标的数组长度"""
+        self._ensure_loaded()
+        return len(self._codes)
+
+    def get_id(self, stock_code):
+        """代码的编号，未登记返回 None (不登记)"""
+        self._ensure_loaded()
+        return self._ids.get(stock_code)
+
+    def get_code(self, code_id):
+        codes = self._codes
+        return codes[code_id] if 0 <= code_id < len(codes) else None
+
+    def intern(self, stock_code):
+        """代码的编号，未登记时分配新编号"""
+        code_id = self.get_id(stock_code)
+        if code_id is None:
+            code_id = self._register([stock_code]).get(stock_code, UNKNOWN_ID)
+        return code_id
+
+    def intern_many(self, stock_codes):
+        """批量转换为编号数组 (int32)，未登记的代码统一分配新编号 (空代码为 UNKNOWN_ID)"""
+        index, codes = pd.factorize(pd.Series(stock_codes, dtype=object), sort=False)
+        self._ensure_loaded()
+        ids = self._ids
+        unique_ids = [ids.get(c) for c in codes]
+        missing = [c for c, i in zip(codes, unique_ids) if i is None]
+        if missing:
+            registered = self._register(missing)
+            unique_ids = [registered.get(c, UNKNOWN_ID) if i is None else i for c, i in zip(codes, unique_ids)]
+        result = np.asarray(unique_ids + [UNKNOWN_ID], dtype=np.int32)[index]
+        # factorize 将缺失值标为 -1，恰好取到末尾的 UNKNOWN_ID
+        return result
+
+    def lookup_many(self, stock_codes):
+        """批量转换为编号数组 (int32)，只读不登记：未登记或空代码为 UNKNOWN_ID"""
+        index, codes = pd.factorize(pd.Series(stock_codes, dtype=object), sort=False)
+        self._ensure_loaded()
+        ids = self._ids
+        unique_ids = [ids.get(c, UNKNOWN_ID) for c in codes]
+        return np.asarray(unique_ids + [UNKNOWN_ID], dtype=np.int32)[index]
+
+    def codes_of(self, code_ids):
+        """编号数组转换为代码数组 (object)，无效编号为 None"""
+        code_ids = np.asarray(code_ids, dtype=np.int64)
+        table = self._code_array
+        valid = (code_ids >= 0) & (code_ids < len(table))
+        result = np.full(len(code_ids), None, dtype=object)
+        result[valid] = table[code_ids[valid]]
+        return result
+
+    def _register(self, stock_codes):
+        """
+        登记新代码并返回 {代码: 编号}
+        插入仅含代码的主数据记录 (已存在则忽略) 后回读编号，其他进程同时登记同一代码时结果一致
+        """
+        stock_codes = sorted({c for c in stock_codes if c})
+        with self._lock:
+            for batch in chunked(stock_codes, 500):
+                Instrument.insert_many([{'stock_code': c} for c in batch]).on_conflict_ignore().execute()
+            pairs = []
+            for batch in chunked(stock_codes, 500):
+                pairs.extend(Instrument
+                             .select(Instrument.id, Instrument.stock_code)
+                             .where(Instrument.stock_code.in_(batch))
+                             .tuples())
+            self._merge(pairs)
+            return {code: code_id for code_id, code in pairs}
+
+
+# 全局单例
+code_registry = CodeRegistry()
@@ -1,5 +1,163 @@
-import re
+import threading
+import numpy as np
+import pandas as pd
+from functools import lru_cache
 from configs.fee_config import fee_manager
+from utils.code_registry import UNKNOWN_ID, code_registry
+
+# 费用项 (与配置键一致)
+FEE_TYPES = ('commission', 'stamp_duty', 'other_fees')
+
+# 代码后缀 -> 市场
+MARKET_SUFFIXES = {'.SH': 'SH', '.SZ': 'SZ', '.BJ': 'BJ'}
+
+# 品种前缀表 (简单规则，可根据实际需求扩展)
+# 沪市: 60/68开头是股票, 5开头是ETF/基金, 11开头是可转债
+# 深市: 00/30开头是股票, 15开头是ETF/LOF, 12开头是可转债
+# 北交所: 8/4开头
+PRODUCT_PREFIXES = {
+    'SH': {'5': 'ETF', '11': 'BOND', '10': 'BOND'},
+    'SZ': {'15': 'ETF', '16': 'ETF', '12': 'BOND'},
+    'BJ': {},
+}
+
+# 费率计划覆盖的全部 (市场, 品种) 类别
+CATEGORIES = tuple((m, p) for m in ('SH', 'SZ', 'BJ') for p in ('STOCK', 'ETF', 'BOND'))
+CATEGORY_INDEX = {c: i for i, c in enumerate(CATEGORIES)}
+
+
+def round_half_even(values, ndigits):
+    """
+    数组版 round，结果与 Python 内置 round 逐位一致
+    np.round 先放大再取整，在恰好处于 .5 附近的值上可能与 round 的十进制舍入不同，这些值退回内置 round
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, ndigits)
+    scaled = values * 10.0 ** ndigits
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if len(ties):
+        rounded[ties] = [round(v, ndigits) for v in values[ties].tolist()]
+    return rounded
+
+
+@lru_cache(maxsize=16384)
+def classify_code(stock_code):
+    """
+    根据代码识别市场和品种 (结果与费率配置无关，按代码缓存)
+    返回: (market, product_type)
+    """
+    code = stock_code.upper()
+    market = MARKET_SUFFIXES.get(code[-3:], "SH")  # 未知后缀默认沪市
+    number_part = code.split('.')[0]
+    prefixes = PRODUCT_PREFIXES[market]
+    product = prefixes.get(number_part[:2]) or prefixes.get(number_part[:1]) or "STOCK"
+    return market, product
+
+
+_category_lock = threading.Lock()
+# 代码编号 -> 类别下标 (按编号下标的数组，登记新代码后扩展)
+_category_by_id = np.empty(0, dtype=np.int8)
+
+
+def categories_of(code_ids):
+    """代码编号数组 -> 类别下标数组 (未登记的编号按默认规则归为沪市股票)"""
+    global _category_by_id
+    code_ids = np.asarray(code_ids, dtype=np.int64)
+    table = _category_by_id
+    if len(code_ids) and code_ids.max() >= len(table):
+        with _category_lock:
+            table = _category_by_id
+            size = code_registry.size
+            if size > len(table):
+                codes = code_registry.codes_of(np.arange(len(table), size))
+                extra = np.fromiter(
+                    (CATEGORY_INDEX[classify_code(c)] if c else CATEGORY_INDEX[('SH', 'STOCK')] for c in codes),
+                    dtype=np.int8, count=len(codes)
+                )
+                # 扩展后整体替换，读取端无需加锁
+                table = np.concatenate([table, extra])
+                _category_by_id = table
+    valid = (code_ids >= 0) & (code_ids < len(table))
+    result = np.full(len(code_ids), CATEGORY_INDEX[('SH', 'STOCK')], dtype=np.int64)
+    result[valid] = table[code_ids[valid]]
+    return result
+
+
+def categories_of_codes(stock_codes):
+    """
+    代码数组 -> 类别下标数组 (只读，不登记新代码)
+    已登记的代码按编号查类别数组，未登记的代码去重后直接按代码规则分类，空代码归为沪市股票
+    """
+    code_index, codes = pd.factorize(pd.Series(stock_codes, dtype=object), sort=False)
+    codes = np.asarray(codes, dtype=object)
+    code_ids = code_registry.lookup_many(codes)
+    categories = categories_of(code_ids)
+    unknown = np.flatnonzero(code_ids == UNKNOWN_ID)
+    categories[unknown] = [CATEGORY_INDEX[classify_code(c)] for c in codes[unknown]]
+    return np.append(categories, CATEGORY_INDEX[('SH', 'STOCK')])[code_index]
+
+
+class CompiledFeeSchedule:
+    """
+    编译后的费率计划 (配置变化时整体重建，构建后只读)
+    - fees[(类别下标, 方向)]: 三项费用的 (费率, 最低收费) 元组，不收取的项为 None
+    - 各类别的费率/最低收费/收取方式数组，供批量计算按下标取值
+    """
+
+    def __init__(self, config, version=None):
+        self.version = version
+        self.fees = {}
+        product_configs = [FeeCalculator._resolve_product_config(config, m, p) for m, p in CATEGORIES]
+
+        for i, product_config in enumerate(product_configs):
+            for side in (1, -1, 0):
+                self.fees[(i, side)] = tuple(
+                    self._compile_item(product_config[fee_type], side) for fee_type in FEE_TYPES
+                )
+
+        self.rates = {}
+        self.min_fees = {}
+        self.modes = {}
+        for fee_type in FEE_TYPES:
+            items = [c[fee_type] for c in product_configs]
+            self.rates[fee_type] = np.array([c.get("rate", 0) for c in items], dtype=np.float64)
+            self.min_fees[fee_type] = np.array([c.get("min_fee", 0) for c in items], dtype=np.float64)
+            self.modes[fee_type] = [c.get("mode", "both") for c in items]
+
+    @staticmethod
+    def _compile_item(item, side):
+        """判断该方向是否收取，收取时返回 (费率, 最低收费)"""
+        mode = item.get("mode", "both")
+        if mode == "both" or (mode == "buy" and side == 1) or (mode == "sell" and side == -1):
+            return item.get("rate", 0), item.get("min_fee", 0)
+        return None
+
+
+_schedule_lock = threading.Lock()
+# 配置快照版本号 -> {生效日期: CompiledFeeSchedule}
+_compiled = (None, {})
+
+
+def get_fee_schedule(trade_date=None):
+    """获取指定成交日期 (默认当日) 适用的费率计划 (配置快照变化时重新编译)"""
+    global _compiled
+    # 只取一次快照引用，生效日期与配置来自同一版本
+    snapshot = fee_manager.snapshot
+    effective_from = snapshot.get_effective_from(trade_date)
+    version, schedules = _compiled
+    schedule = schedules.get(effective_from) if version == snapshot.version else None
+    if schedule is not None:
+        return schedule
+    with _schedule_lock:
+        schedules = _compiled[1] if _compiled[0] == snapshot.version else {}
+        schedule = schedules.get(effective_from)
+        if schedule is None:
+            schedule = CompiledFeeSchedule(snapshot.get_config(effective_from), snapshot.version)
+            # 复制后整体替换，读取端无需加锁
+            schedules = {**schedules, effective_from: schedule}
+            _compiled = (snapshot.version, schedules)
+        return schedule
+
 
 class FeeCalculator:
     @staticmethod
@@ -8,44 +166,7 @@ class FeeCalculator:
         根据代码识别市场和品种
         返回: (market, product_type)
         """
-        code = stock_code.upper()
-        
-        # 1. 识别市场
-        if code.endswith('.SH'):
-            market = "SH"
-        elif code.endswith('.SZ'):
-            market = "SZ"
-        elif code.endswith('.BJ'):
-            market = "BJ"
-        else:
-            market = "SH" # 默认
-
-        # 2. 识别品种 (简单规则，可根据实际需求扩展)
-        # 沪市: 60/68开头是股票, 5开头是ETF/基金, 11开头是可转债
-        # 深市: 00/30开头是股票, 15开头是ETF/LOF, 12开头是可转债
-        # 北交所: 8/4开头
-        number_part = code.split('.')[0]
-        
-        if market == "SH":
-            if number_part.startswith(('5', '51', '56', '58')):
-                product = "ETF"
-            elif number_part.startswith(('11', '10')): # 11转债
-                product = "BOND"
-            else:
-                product = "STOCK"
-        elif market == "SZ":
-            if number_part.startswith(('15', '16')):
-                product = "ETF"
-            elif number_part.startswith('12'):
-                product = "BOND"
-            else:
-                product = "STOCK"
-        elif market == "BJ":
-            product = "STOCK"
-        else:
-            product = "STOCK"
-            
-        return market, product
+        return classify_code(stock_code)
 
     @staticmethod
     def calculate_single_fee(amount, config, direction_side):
@@ -56,7 +177,7 @@ class FeeCalculator:
         direction_side: 1(买入), -1(卖出)
         """
         mode = config.get("mode", "both")
-        
+
         # 判断是否收取
         should_charge = False
         if mode == "both":
@@ -65,39 +186,107 @@ class FeeCalculator:
             should_charge = True
         elif mode == "sell" and direction_side == -1:
             should_charge = True
-            
+
         if not should_charge:
             return 0.0
-            
+
         fee = round(amount * config.get("rate", 0), 2)
         min_fee = config.get("min_fee", 0)
-        
+
         return max(fee, min_fee)
 
     @classmethod
-    def calculate_all_fees(cls, stock_code, price, volume, direction_side):
+    def _resolve_product_config(cls, config, market, product):
+        """获取对应产品配置，如果没有则使用默认兜底"""
+        market_config = config.get(market, config.get("SH"))
+        return market_config.get(product, market_config.get("STOCK"))
+
+    @classmethod
+    def calculate_fees_batch(cls, stock_codes, prices, volumes, direction_sides, trade_dates=None, schedule=None):
+        """
+        批量计算费用 (与 calculate_all_fees 逐笔结果一致)
+        参数为等长数组，返回 {'commission', 'stamp_duty', 'other_fees', 'total_fees'} -> ndarray
+        trade_dates 不为空时按各笔成交日期适用的费率版本分组计算
+        """
+        if trade_dates is not None and schedule is None:
+            return cls._calculate_fees_by_schedule(stock_codes, prices, volumes, direction_sides, trade_dates)
+
+        schedule = schedule or get_fee_schedule()
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        sides = np.asarray(direction_sides)
+
+        # 1. 代码按编号查类别数组 (计算费用不登记新代码)
+        category_index = categories_of_codes(stock_codes)
+
+        amount = prices * volumes
+        is_buy = sides == 1
+        is_sell = sides == -1
+        result = {}
+        total = np.zeros(len(amount))
+        for fee_type in FEE_TYPES:
+            rate = schedule.rates[fee_type][category_index]
+            min_fee = schedule.min_fees[fee_type][category_index]
+            modes = schedule.modes[fee_type]
+            # 收取方式掩码：按类别生成后再映射到每笔成交
+            charge_both = np.array([m == "both" for m in modes], dtype=bool)[category_index]
+            charge_buy = np.array([m == "buy" for m in modes], dtype=bool)[category_index]
+            charge_sell = np.array([m == "sell" for m in modes], dtype=bool)[category_index]
+
+            charge = charge_both | (charge_buy & is_buy) | (charge_sell & is_sell)
+            fee = np.maximum(round_half_even(amount * rate, 2), min_fee)
+            fee = np.where(charge, fee, 0.0)
+            total = total + fee
+            result[fee_type] = round_half_even(fee, 4)
+
+        result["total_fees"] = round_half_even(total, 4)
+        return result
+
+    @classmethod
+    def _calculate_fees_by_schedule(cls, stock_codes, prices, volumes, direction_sides, trade_dates):
+        """按成交日期所属费率版本分组批量计算，再按原顺序合并"""
+        stock_codes = np.asarray(stock_codes, dtype=object)
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        sides = np.asarray(direction_sides)
+
+        date_index, dates = pd.factorize(pd.Series(trade_dates, dtype=object).astype(str).str[:10], sort=False)
+        snapshot = fee_manager.snapshot
+        effective = np.array([snapshot.get_effective_from(d) for d in dates], dtype=object)
+        groups = pd.Series(effective[date_index] if len(dates) else [], dtype=object)
+
+        result = {k: np.zeros(len(prices)) for k in (*FEE_TYPES, "total_fees")}
+        for effective_from, rows in groups.groupby(groups, sort=False).indices.items():
+            part = cls.calculate_fees_batch(
+                stock_codes[rows], prices[rows], volumes[rows], sides[rows],
+                schedule=get_fee_schedule(effective_from)
+            )
+            for k, v in part.items():
+                result[k][rows] = v
+        return result
+
+    @classmethod
+    def calculate_all_fees(cls, stock_code, price, volume, direction_side, trade_date=None, schedule=None):
         """
         计算所有费用
         direction_side: 1 (买入), -1 (卖出)
+        trade_date: 成交日期 (YYYY-MM-DD)，用于选择适用的费率版本，默认当日
         """
-        market, product = cls.identify_market_product(stock_code)
-        config = fee_manager.get_config()
-        
-        # 获取对应产品配置，如果没有则使用默认兜底（防止报错）
-        market_config = config.get(market, config.get("SH"))
-        product_config = market_config.get(product, market_config.get("STOCK"))
-        
+        schedule = schedule or get_fee_schedule(trade_date)
+        # 分类与费率均为元组查表 (非买卖方向仅收取双边费用)
+        side = direction_side if direction_side in (1, -1) else 0
+        items = schedule.fees[(CATEGORY_INDEX[classify_code(stock_code)], side)]
+
         amount = price * volume
-        
-        commission = cls.calculate_single_fee(amount, product_config["commission"], direction_side)
-        stamp_duty = cls.calculate_single_fee(amount, product_config["stamp_duty"], direction_side)
-        other_fees = cls.calculate_single_fee(amount, product_config["other_fees"], direction_side)
-        
+
+        fees = [max(round(amount * item[0], 2), item[1]) if item else 0.0 for item in items]
+        commission, stamp_duty, other_fees = fees
+
         total_fees = commission + stamp_duty + other_fees
-        
+
         return {
             "commission": round(commission, 4),
             "stamp_duty": round(stamp_duty, 4),
             "other_fees": round(other_fees, 4),
             "total_fees": round(total_fees, 4)
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,99 @@
+import time
+import numpy as np
+import pandas as pd
+from peewee import chunked
+
+from models.trade_models import TradeRecord, trade_db
+from utils.fee_calculator import FeeCalculator, FEE_TYPES
+from utils.trade_persistence import trade_persistence
+from utils.position_engine import position_engine
+
+# 每个事务处理的成交条数
+RECOMPUTE_BATCH_SIZE = 5000
+
+_FEE_FIELDS = (*FEE_TYPES, 'total_fees')
+
+
+def _load_trades(start_date, end_date, last_id, limit):
+    """按主键分页读取区间内的成交"""
+    query = (TradeRecord
+             .select(TradeRecord.id, TradeRecord.stock_code, TradeRecord.trade_date, TradeRecord.price,
+                     TradeRecord.volume, TradeRecord.side, *[getattr(TradeRecord, f) for f in _FEE_FIELDS])
+             .where(TradeRecord.id > last_id)
+             .order_by(TradeRecord.id)
+             .limit(limit))
+    if start_date:
+        query = query.where(TradeRecord.trade_date >= start_date)
+    if end_date:
+        query = query.where(TradeRecord.trade_date <= end_date)
+    return pd.DataFrame(
+        list(query.tuples()),
+        columns=['id', 'stock_code', 'trade_date', 'price', 'volume', 'side', *_FEE_FIELDS]
+    )
+
+
+def _apply_updates(rows):
+    """批量更新费用字段 (运行于交易数据写线程)"""
+    with trade_db.atomic():
+        for batch in chunked(rows, 100):
+            TradeRecord.bulk_update(batch, fields=[getattr(TradeRecord, f) for f in _FEE_FIELDS])
+    return len(rows)
+
+
+def recompute_trade_fees(start_date=None, end_date=None, batch_size=RECOMPUTE_BATCH_SIZE, progress=None):
+    """
+    按各笔成交日期适用的费率版本重算区间内成交的费用
+    分批读取、批量计算，仅更新费用发生变化的记录，每批一个事务
+    缺少成交日期的记录无法确定适用费率，跳过并在日志中列出
+    progress(scanned, updated): 可选的进度回调
+    返回 (扫描条数, 更新条数, 跳过条数)
+    """
+    started = time.monotonic()
+    scanned = updated = 0
+    last_id = 0
+    skipped_ids = []
+    while True:
+        df = _load_trades(start_date, end_date, last_id, batch_size)
+        if df.empty:
+            break
+        last_id = int(df['id'].iloc[-1])
+        scanned += len(df)
+
+        # 成交日期为空时不能按字符串 'None' 匹配费率版本 (会落到最新版本)
+        dated = df['trade_date'].fillna('').astype(str).str.strip() != ''
+        if not dated.all():
+            skipped_ids.extend(df.loc[~dated, 'id'].tolist())
+            df = df[dated].reset_index(drop=True)
+            if df.empty:
+                if progress:
+                    progress(scanned, updated)
+                continue
+
+        fees = FeeCalculator.calculate_fees_batch(
+            df['stock_code'].to_numpy(), df['price'].to_numpy(), df['volume'].abs().to_numpy(),
+            df['side'].to_numpy(), trade_dates=df['trade_date'].to_numpy()
+        )
+        changed = np.zeros(len(df), dtype=bool)
+        for f in _FEE_FIELDS:
+            changed |= ~np.isclose(df[f].fillna(0.0).to_numpy(), fees[f], rtol=0.0, atol=1e-9)
+
+        indexes = np.flatnonzero(changed)
+        if len(indexes):
+            rows = []
+            for i in indexes.tolist():
+                row = TradeRecord(id=int(df['id'].iat[i]))
+                for f in _FEE_FIELDS:
+                    setattr(row, f, float(fees[f][i]))
+                rows.append(row)
+            updated += trade_persistence.run(lambda: _apply_updates(rows))
+
+        if progress:
+            progress(scanned, updated)
+
+    # 费用变化影响持仓成本与已实现盈亏
+    if updated:
+        position_engine.invalidate()
+    if skipped_ids:
+        print(f"【费用重算】跳过 {len(skipped_ids)} 条缺少成交日期的记录 (id: {skipped_ids[:20]})")
+    print(f"【费用重算】扫描 {scanned} 条，更新 {updated} 条，耗时 {time.monotonic() - started:.2f}s")
+    return scanned, updated, len(skipped_ids)
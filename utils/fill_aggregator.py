@@ -0,0 +1,168 @@
+import threading
+from datetime import date
+
+
+def trade_to_dict(t):
+    """将 XtTrade 成交对象转换为字典 (已是字典则原样返回)"""
+    if isinstance(t, dict):
+        return t
+    return {
+        'traded_id': str(t.traded_id),
+        'order_id': str(t.order_id),
+        'stock_code': t.stock_code,
+        'traded_time': t.traded_time,
+        'order_type': t.order_type,
+        'direction': t.direction,
+        'offset_flag': t.offset_flag,
+        'traded_price': t.traded_price,
+        'traded_volume': t.traded_volume,
+        'traded_amount': t.traded_amount,
+        'strategy_name': t.strategy_name,
+        'order_remark': t.order_remark
+    }
+
+
+class _OrderFills:
+    """单个委托的分笔成交累计状态"""
+    __slots__ = (
+        'order_id', 'stock_code', 'order_type', 'direction', 'offset_flag',
+        'strategy_name', 'order_remark',
+        'volume', 'amount', 'primary_traded_id', 'first_time', 'last_time', 'traded_ids'
+    )
+
+    def __init__(self, fill):
+        self.order_id = fill['order_id']
+        self.volume = 0
+        self.amount = 0.0
+        self.primary_traded_id = None
+        self.first_time = None
+        self.last_time = None
+        self.traded_ids = set()
+        self._set_identity(fill)
+
+    def _set_identity(self, fill):
+        """以最早一笔成交作为委托的身份信息"""
+        self.primary_traded_id = fill['traded_id']
+        self.first_time = fill['traded_time']
+        self.stock_code = fill['stock_code']
+        self.order_type = fill['order_type']
+        self.direction = fill['direction']
+        self.offset_flag = fill['offset_flag']
+        self.strategy_name = fill['strategy_name']
+        self.order_remark = fill['order_remark']
+
+    def add(self, fill):
+        """
+        累加一笔成交
+        返回因主记录变更而需要删除的旧 traded_id 列表
+        """
+        stale_ids = []
+        if self.first_time is not None and fill['traded_time'] < self.first_time:
+            # 乱序到达的更早成交：主键切换为该笔，旧主记录作废
+            stale_ids.append(self.primary_traded_id)
+            self._set_identity(fill)
+
+        self.traded_ids.add(fill['traded_id'])
+        self.volume += fill['traded_volume']
+        self.amount += fill['traded_amount']
+        if self.last_time is None or fill['traded_time'] >= self.last_time:
+            self.last_time = fill['traded_time']
+        return stale_ids
+
+    def to_merged(self):
+        """输出合并后的委托成交"""
+        return {
+            'order_id': self.order_id,
+            'primary_traded_id': self.primary_traded_id,
+            'stock_code': self.stock_code,
+            'order_type': self.order_type,
+            'direction': self.direction,
+            'offset_flag': self.offset_flag,
+            'strategy_name': self.strategy_name,
+            'order_remark': self.order_remark,
+            'volume': self.volume,
+            'amount': self.amount,
+            'last_time': self.last_time,
+        }
+
+
+class FillAggregator:
+    """
+    分笔成交增量聚合器
+    按 order_id 累计成交量、成交额、首笔 traded_id 与最新成交时间，
+    并以 traded_id 去重，单笔推送的处理代价与当日成交总数无关
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._orders = {}
+        # 最近一次全量对账所在的交易日
+        self._seeded_day = None
+        # 对账完成前到达的推送成交，由下一次对账合并 (查询结果可能尚未包含这些成交)
+        self._pending = []
+
+    @property
+    def seeded(self):
+        """当日是否已通过全量查询完成对账初始化"""
+        return self._seeded_day == date.today()
+
+    def apply(self, trade):
+        """
+        应用一笔推送成交
+        返回 (合并结果, 需删除的旧 traded_id 列表)，重复推送返回 None
+        """
+        fill = trade_to_dict(trade)
+        with self._lock:
+            order = self._orders.get(fill['order_id'])
+            if order is None:
+                order = self._orders[fill['order_id']] = _OrderFills(fill)
+            elif fill['traded_id'] in order.traded_ids:
+                return None
+            stale_ids = order.add(fill)
+            return order.to_merged(), stale_ids
+
+    def defer(self, trades):
+        """暂存尚未对账时到达的推送成交"""
+        with self._lock:
+            self._pending.extend(trade_to_dict(t) for t in trades)
+            return len(self._pending)
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def take_pending(self):
+        """取出全部暂存的推送成交"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return pending
+
+    def reset(self, trades):
+        """
+        以全量成交列表重建聚合状态 (对账)
+        返回全部委托的合并结果列表
+        """
+        orders = {}
+        for t in trades or []:
+            fill = trade_to_dict(t)
+            order = orders.get(fill['order_id'])
+            if order is None:
+                order = orders[fill['order_id']] = _OrderFills(fill)
+            elif fill['traded_id'] in order.traded_ids:
+                continue
+            order.add(fill)
+
+        with self._lock:
+            self._orders = orders
+            self._seeded_day = date.today()
+        return [o.to_merged() for o in orders.values()]
+
+    def clear(self):
+        """清空状态 (如跨交易日)"""
+        with self._lock:
+            self._orders = {}
+            self._seeded_day = None
+
+
+# 全局单例
+fill_aggregator = FillAggregator()
@@ -0,0 +1,302 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from peewee import chunked
+from xtquant import xtdata
+
+from models.market_models import Instrument, InstrumentSector, market_db
+from utils.code_registry import code_registry
+
+xtdata.enable_hello = False
+
+# 证券池覆盖的板块
+UNIVERSE_SECTORS = ('沪深A股', '沪深ETF', '沪深指数', '沪深转债', '北交所')
+
+# 并发查询合约详情的线程数
+REFRESH_WORKERS = 8
+
+# 参与变化比较的主数据字段
+_FIELDS = ('name', 'exchange', 'price_tick', 'up_stop_price', 'down_stop_price', 'pre_close',
+           'open_date', 'expire_date', 'total_volume', 'float_volume')
+
+
+def _to_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def _to_date(value):
+    """xtdata 日期 (YYYYMMDD 整数或字符串) 转为 YYYY-MM-DD，0 / 99999999 等无效值返回 None"""
+    try:
+        text = str(int(value))
+    except (TypeError, ValueError):
+        return None
+    if len(text) != 8 or text == '99999999' or text < '19000101':
+        return None
+    return f"{text[:4]}-{text[4:6]}-{text[6:]}"
+
+
+def parse_instrument_detail(code, detail):
+    """get_instrument_detail 结果转为主数据记录"""
+    return {
+        'stock_code': code,
+        'name': detail.get('InstrumentName'),
+        'exchange': detail.get('ExchangeID'),
+        'price_tick': _to_float(detail.get('PriceTick')),
+        'up_stop_price': _to_float(detail.get('UpStopPrice')),
+        'down_stop_price': _to_float(detail.get('DownStopPrice')),
+        'pre_close': _to_float(detail.get('PreClose')),
+        'open_date': _to_date(detail.get('OpenDate')),
+        'expire_date': _to_date(detail.get('ExpireDate')),
+        'total_volume': _to_float(detail.get('TotalVolume')),
+        'float_volume': _to_float(detail.get('FloatVolume')),
+    }
+
+
+class _MasterSnapshot:
+    """主数据快照 (构建后只读，刷新时整体替换)"""
+    __slots__ = ('records', 'sectors', 'by_number')
+
+    def __init__(self, records, sectors):
+        # code -> 记录 (含 id)
+        self.records = records
+        # 板块 -> 按代码排序的成分元组
+        self.sectors = {s: tuple(sorted(codes)) for s, codes in sectors.items()}
+        # 不含后缀的代码 -> 带后缀的代码 (同一数字代码可能同时存在于多个市场，如 000001)
+        by_number = {}
+        for code in sorted(records):
+            by_number.setdefault(code.split('.')[0], []).append(code)
+        self.by_number = {k: tuple(v) for k, v in by_number.items()}
+
+
+class InstrumentMaster:
+    """
+    合约主数据
+    一次遍历板块成分与合约详情，保存价格步长、涨跌停价、上市/退市日期、股本及板块归属，
+    作为证券池、名称与上市日期的统一来源；代码编号由 code_registry 统一分配
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 同一时间只允许一次刷新 (定时任务与手动刷新互斥)
+        self._refresh_lock = threading.Lock()
+        self._snapshot = None
+        self._refresh_thread = None
+        self._progress = {'state': 'idle', 'stage': '', 'done': 0, 'total': 0, 'updated': 0, 'message': ''}
+
+    @property
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load()
+                snapshot = self._snapshot
+        return snapshot
+
+    @staticmethod
+    def _load():
+        records = {
+            r['stock_code']: r
+            for r in Instrument.select(Instrument.id, Instrument.stock_code, *[getattr(Instrument, f) for f in _FIELDS]).dicts()
+        }
+        codes = {r['id']: code for code, r in records.items()}
+        sectors = {}
+        for sector, instrument_id in InstrumentSector.select(InstrumentSector.sector, InstrumentSector.instrument_id).tuples():
+            code = codes.get(instrument_id)
+            if code:
+                sectors.setdefault(sector, set()).add(code)
+        return _MasterSnapshot(records, sectors)
+
+    def is_empty(self):
+        # 仅经 code_registry 登记的代码没有板块归属，不算已初始化
+        return not self.snapshot.sectors
+
+    def _set_progress(self, **kwargs):
+        # 整体替换，读取端拿到的始终是一致的一份
+        self._progress = {**self._progress, **kwargs}
+
+    def get_progress(self):
+        """刷新进度：state (idle/running/done/failed)、stage、done/total、updated、message"""
+        return self._progress
+
+    def is_refreshing(self):
+        """是否有刷新在进行 (后台线程或定时任务直接调用的 refresh)"""
+        thread = self._refresh_thread
+        return self._refresh_lock.locked() or (thread is not None and thread.is_alive())
+
+    def start_refresh(self, sectors=UNIVERSE_SECTORS, full=False, on_complete=None):
+        """
+        在后台线程中刷新，立即返回 (已有刷新在进行时返回 False)
+        on_complete(): 刷新成功后、进度标记为完成前调用，失败时进度标记为 failed
+        """
+        with self._lock:
+            if self.is_refreshing():
+                return False
+            self._set_progress(state='running', stage='准备中', done=0, total=0, updated=0, message='')
+
+            def target():
+                try:
+                    self.refresh(sectors, full, on_complete=on_complete)
+                except Exception as e:
+                    print(f"【合约主数据】刷新失败: {e}")
+
+            self._refresh_thread = threading.Thread(target=target, name='instrument-refresh', daemon=True)
+            self._refresh_thread.start()
+        return True
+
+    @staticmethod
+    def _fetch_detail(code):
+        detail = xtdata.get_instrument_detail(code)
+        return parse_instrument_detail(code, detail) if detail else None
+
+    def refresh(self, sectors=UNIVERSE_SECTORS, full=False, on_complete=None, blocking=True):
+        """
+        从 xtdata 刷新主数据与板块索引
+        合约详情由线程池并发查询；仅写入新增或字段发生变化的合约、以及成分发生变化的板块，
+        已不在任何板块中的合约保留 (历史成交仍需名称)
+        full: 同时下载已退市合约数据 (主数据为空时自动进行)
+        on_complete(): 刷新成功后、进度标记为完成前调用
+        blocking: 为 False 时若已有刷新在进行则直接返回 None
+        返回写入的合约条数
+        """
+        if not self._refresh_lock.acquire(blocking=blocking):
+            return None
+        try:
+            count, message = self._refresh(sectors, full)
+            if on_complete:
+                self._set_progress(stage='同步名称')
+                on_complete()
+        except Exception as e:
+            self._set_progress(state='failed', message=str(e))
+            raise
+        finally:
+            self._refresh_lock.release()
+        self._set_progress(state='done', stage='完成', updated=count, message=message)
+        return count
+
+    def _refresh(self, sectors, full):
+        started = time.monotonic()
+        self._set_progress(state='running', stage='读取板块成分', done=0, total=0, updated=0, message='')
+        sector_codes = {}
+        for sector in sectors:
+            try:
+                sector_codes[sector] = set(xtdata.get_stock_list_in_sector(sector) or [])
+            except Exception as e:
+                print(f"【合约主数据】获取板块 {sector} 失败: {e}")
+
+        if full or self.is_empty():
+            self._set_progress(stage='下载历史合约')
+            xtdata.download_history_contracts()  # 下载已退市合约数据
+
+        codes = sorted(set().union(*sector_codes.values()))
+        self._set_progress(stage='查询合约详情', total=len(codes))
+        details = {}
+        with ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix='instrument-detail') as pool:
+            futures = [pool.submit(self._fetch_detail, code) for code in codes]
+            for done, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                if record:
+                    details[record['stock_code']] = record
+                if done % 200 == 0 or done == len(codes):
+                    self._set_progress(done=done)
+
+        self._set_progress(stage='写入变化')
+        with self._lock:
+            count = self._apply(details, sector_codes)
+            self._snapshot = self._load()
+        elapsed = time.monotonic() - started
+        print(f"【合约主数据】刷新完成，共 {len(self._snapshot.records)} 个合约，"
+              f"更新 {count} 条，耗时 {elapsed:.2f}s")
+        return count, f"共 {len(self._snapshot.records)} 个合约，更新 {count} 条，耗时 {elapsed:.1f}s"
+
+    def _apply(self, details, sector_codes):
+        """对比现有主数据，写入变化部分 (编号经 code_registry 分配，已有代码编号不变)"""
+        current = self._snapshot if self._snapshot is not None else self._load()
+        now = datetime.now()
+
+        all_codes = sorted(set(details).union(*sector_codes.values()).union(*current.sectors.values()))
+        ids = dict(zip(all_codes, code_registry.intern_many(all_codes).tolist()))
+
+        rows = []
+        for code in sorted(details):
+            record = details[code]
+            old = current.records.get(code)
+            if old is not None and all(old.get(f) == record[f] for f in _FIELDS):
+                continue
+            rows.append({**record, 'id': ids[code], 'updated_at': now})
+
+        with market_db.atomic():
+            for batch in chunked(rows, 500):
+                Instrument.insert_many(batch).on_conflict_replace().execute()
+
+            for sector, codes in sector_codes.items():
+                old_codes = set(current.sectors.get(sector, ()))
+                removed = [ids[c] for c in old_codes - codes if c in ids]
+                added = [{'sector': sector, 'instrument_id': ids[c]} for c in codes - old_codes if c in ids]
+                for batch in chunked(removed, 500):
+                    (InstrumentSector.delete()
+                     .where(InstrumentSector.sector == sector, InstrumentSector.instrument_id.in_(batch))
+                     .execute())
+                for batch in chunked(added, 500):
+                    InstrumentSector.insert_many(batch).on_conflict_ignore().execute()
+        return len(rows)
+
+    # ---------- 查询 ----------
+
+    def get_codes(self, sectors=UNIVERSE_SECTORS):
+        """指定板块的成分代码 (去重，按代码排序)"""
+        index = self.snapshot.sectors
+        codes = set()
+        for sector in sectors:
+            codes.update(index.get(sector, ()))
+        return sorted(codes)
+
+    def get(self, stock_code):
+        """合约主数据记录 (dict)，不存在返回 None"""
+        return self.snapshot.records.get(stock_code)
+
+    def get_name(self, stock_code):
+        record = self.snapshot.records.get(stock_code)
+        return record['name'] if record else None
+
+    def get_names(self):
+        """代码 -> 名称"""
+        return {code: r['name'] for code, r in self.snapshot.records.items() if r['name']}
+
+    def get_candidates(self, number):
+        """不含后缀的代码对应的全部带后缀代码"""
+        return self.snapshot.by_number.get(number, ())
+
+    def in_sector(self, stock_code, sector):
+        return stock_code in self.snapshot.sectors.get(sector, ())
+
+    def get_listing_dates(self, stock_code):
+        """(上市日期, 退市日期)，未知返回 (None, None)"""
+        record = self.snapshot.records.get(stock_code)
+        return (record['open_date'], record['expire_date']) if record else (None, None)
+
+    def get_id(self, stock_code):
+        """代码的整数编号，未登记返回 None"""
+        return code_registry.get_id(stock_code)
+
+    def get_code(self, instrument_id):
+        return code_registry.get_code(instrument_id)
+
+
+def run_instrument_refresh_task():
+    """定时任务入口 (已有刷新在进行时跳过本次)"""
+    try:
+        if instrument_master.refresh(blocking=False) is None:
+            print("【合约主数据】已有刷新在进行，跳过本次定时刷新")
+    except Exception as e:
+        print(f"【合约主数据】刷新失败: {e}")
+
+
+# 全局单例
+instrument_master = InstrumentMaster()
@@ -0,0 +1,147 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from peewee import fn
+
+from models.market_models import KlineData, KlineSyncState
+
+# 图表数据起始日期
+KLINE_START_DATE = '2022-01-01'
+
+# 1970-01-01 的序数，用于日期 -> 毫秒时间戳换算
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# 东八区偏移 (毫秒)，保持与原 pandas 换算口径一致 (当日 00:00 北京时间)
+_CST_OFFSET_MS = 8 * 3600 * 1000
+_CST = timezone(timedelta(hours=8))
+
+
+def _date_to_timestamp(date_str):
+    """YYYY-MM-DD -> 北京时间当日零点的13位时间戳"""
+    days = date.fromisoformat(date_str[:10]).toordinal() - _EPOCH_ORDINAL
+    return days * 86400000 - _CST_OFFSET_MS
+
+
+def get_sync_watermark(stock_code):
+    """
+    获取标的同步水位：(最新日期, 记录数, 同步代次, 最后写入时间)
+    仅走 (stock_code, date) 联合主键索引的聚合查询与同步状态主键查询，不读取行数据
+    """
+    row = (KlineData
+           .select(fn.MAX(KlineData.date), fn.COUNT(KlineData.date))
+           .where((KlineData.stock_code == stock_code) &
+                  (KlineData.date >= KLINE_START_DATE))
+           .tuples()
+           .first())
+    if not row or not row[0]:
+        return None, 0, 0, None
+    state = (KlineSyncState
+             .select(KlineSyncState.generation, KlineSyncState.updated_at)
+             .where(KlineSyncState.stock_code == stock_code)
+             .tuples()
+             .first())
+    generation, updated_at = state or (0, None)
+    return row[0], row[1], generation, updated_at
+
+
+def bump_sync_generation(stock_codes):
+    """
+    递增标的的同步代次 (须与K线写入在同一事务内调用)
+    原地修订已有K线时日期与记录数不变，依靠代次使 ETag 失效
+    """
+    stock_codes = sorted(set(stock_codes))
+    if not stock_codes:
+        return
+    now = datetime.now()
+    KlineSyncState.insert_many(
+        [{'stock_code': code, 'generation': 0} for code in stock_codes]
+    ).on_conflict_ignore().execute()
+    (KlineSyncState
+     .update(generation=KlineSyncState.generation + 1, updated_at=now)
+     .where(KlineSyncState.stock_code.in_(stock_codes))
+     .execute())
+
+
+def build_kline_payload(stock_code):
+    """
+    构建紧凑的列式图表数据
+    返回结构: {'code': 200, 'msg': 'success', 'data': {'contract': code, 'columns': {...}}}
+    """
+    query = (KlineData
+             .select(KlineData.date, KlineData.open, KlineData.high, KlineData.low,
+                     KlineData.close, KlineData.volume, KlineData.amount)
+             .where((KlineData.stock_code == stock_code) &
+                    (KlineData.date >= KLINE_START_DATE))
+             .order_by(KlineData.date)
+             .tuples())
+
+    rows = list(query)
+    if not rows:
+        return {'code': 204, 'msg': 'data not found', 'data': []}
+
+    dates, opens, highs, lows, closes, volumes, amounts = zip(*rows)
+    # 字段名与 klinecharts 数据结构保持一致
+    columns = {
+        'timestamp': [_date_to_timestamp(d) for d in dates],
+        'open': list(opens),
+        'high': list(highs),
+        'low': list(lows),
+        'close': list(closes),
+        'volume': [v or 0 for v in volumes],
+        'turnover': [a or 0 for a in amounts],
+    }
+    return {
+        'code': 200,
+        'msg': 'success',
+        'data': {'contract': stock_code, 'columns': columns}
+    }
+
+
+class KlinePayloadCache:
+    """
+    K线接口响应缓存
+    以同步水位 (含同步代次) 生成 ETag，按标的缓存已序列化并预压缩的响应体 (LRU)
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_validators(stock_code, watermark):
+        """根据同步水位生成 (ETag, Last-Modified)"""
+        last_date, count, generation, updated_at = watermark
+        etag = f"{stock_code}-{last_date}-{count}-{generation}"
+        # 日线数据以最新交易日收盘时间作为最后修改时间，收盘后修订的以写入时间为准
+        last_modified = datetime.combine(
+            date.fromisoformat(last_date[:10]), datetime.min.time(), tzinfo=_CST
+        ).replace(hour=15)
+        if updated_at is not None:
+            last_modified = max(last_modified, updated_at.replace(tzinfo=_CST, microsecond=0))
+        return etag, last_modified.astimezone(timezone.utc)
+
+    def get(self, stock_code, etag):
+        """命中且 ETag 一致时返回 (raw_bytes, gzip_bytes)"""
+        with self._lock:
+            item = self._items.get(stock_code)
+            if item is None or item[0] != etag:
+                return None
+            self._items.move_to_end(stock_code)
+            return item[1], item[2]
+
+    def put(self, stock_code, etag, payload):
+        """序列化并预压缩响应体"""
+        raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        compressed = gzip.compress(raw, compresslevel=6)
+        with self._lock:
+            self._items[stock_code] = (etag, raw, compressed)
+            self._items.move_to_end(stock_code)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return raw, compressed
+
+
+# 全局单例
+kline_payload_cache = KlinePayloadCache()
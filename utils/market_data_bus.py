@@ -0,0 +1,185 @@
+import queue
+import threading
+from xtquant import xtdata
+
+# 消费者队列关闭标记
+_STOP = object()
+
+
+class MarketDataConsumer:
+    """
+    行情消费者
+    每个消费者拥有独立的有界队列与分发线程，QMT 回调线程只负责入队；
+    队列满时丢弃最旧的一条推送，慢消费者不会阻塞回调线程或其他消费者
+    """
+
+    def __init__(self, name, handler, maxsize=1000):
+        self.name = name
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name=f"md-consumer-{name}", daemon=True)
+        self._thread.start()
+
+    def offer(self, stock_code, period, data):
+        """非阻塞投递一条行情推送"""
+        item = (stock_code, period, data)
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # 丢弃最旧的推送，为最新行情腾出空间
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+
+    def close(self):
+        """停止分发线程 (队列满时等待腾出空间)"""
+        self.queue.put(_STOP)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            try:
+                self.handler(*item)
+            except Exception as e:
+                print(f"【行情总线】消费者 {self.name} 处理推送失败: {e}")
+
+
+class MarketDataBus:
+    """
+    进程内行情总线
+    每个 (code, period) 只向 xtdata 发起一次订阅，按引用计数管理订阅生命周期，
+    并将推送扇出到所有已注册的消费者队列
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MarketDataBus, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            # (code, period) -> {'seq': 订阅号, 'refs': 引用计数, 'consumers': 消费者元组,
+            #                    'ready': 订阅完成事件, 'failed': 订阅是否失败}
+            cls._instance._subscriptions = {}
+        return cls._instance
+
+    def register_consumer(self, name, handler, maxsize=1000):
+        """注册消费者，handler 签名为 handler(stock_code, period, data)"""
+        return MarketDataConsumer(name, handler, maxsize=maxsize)
+
+    def _make_callback(self, key):
+        def on_data(datas):
+            # 运行于 QMT 回调线程：读取消费者快照后仅做入队操作
+            sub = self._subscriptions.get(key)
+            if not sub:
+                return
+            consumers = sub['consumers']
+            for stock_code, data in datas.items():
+                for consumer in consumers:
+                    consumer.offer(stock_code, key[1], data)
+        return on_data
+
+    @staticmethod
+    def _attach(sub, consumer):
+        """为已生效的订阅增加一次引用 (调用方持有锁)"""
+        # 同一消费者重复订阅不重复计数
+        if consumer is not None and consumer in sub['consumers']:
+            return
+        sub['refs'] += 1
+        if consumer is not None:
+            # 写时复制，回调线程始终读取完整的消费者元组
+            sub['consumers'] = sub['consumers'] + (consumer,)
+
+    def subscribe(self, stock_code, period='1d', consumer=None):
+        """
+        订阅行情
+        consumer 为空时仅持有订阅引用 (保持 xtdata 本地行情实时更新)，
+        每次匿名订阅需对应一次 unsubscribe
+        xtdata.subscribe_quote 在锁外调用，同一标的的并发订阅等待首个订阅完成
+        """
+        key = (stock_code, period)
+        while True:
+            with self._lock:
+                sub = self._subscriptions.get(key)
+                if sub is None:
+                    # 先登记占位，其他线程看到后等待本次订阅结果
+                    sub = {'seq': None, 'refs': 0, 'consumers': (), 'ready': threading.Event(), 'failed': False}
+                    self._subscriptions[key] = sub
+                    break
+                if sub['ready'].is_set():
+                    self._attach(sub, consumer)
+                    return True
+            sub['ready'].wait()
+            if sub['failed']:
+                return False
+
+        seq = None
+        try:
+            seq = xtdata.subscribe_quote(stock_code, period=period, count=0, callback=self._make_callback(key))
+            if seq is None or seq < 0:
+                print(f"【行情总线】订阅失败 {stock_code} {period}: 返回订阅号 {seq}")
+        except Exception as e:
+            print(f"【行情总线】订阅失败 {stock_code} {period}: {e}")
+
+        with self._lock:
+            if seq is None or seq < 0:
+                sub['failed'] = True
+                del self._subscriptions[key]
+            else:
+                sub['seq'] = seq
+                self._attach(sub, consumer)
+        sub['ready'].set()
+        return not sub['failed']
+
+    def unsubscribe(self, stock_code, period='1d', consumer=None):
+        """释放一次订阅引用，引用归零时取消 xtdata 订阅"""
+        key = (stock_code, period)
+        with self._lock:
+            sub = self._subscriptions.get(key)
+            # 订阅尚未生效时没有可释放的引用
+            if sub is None or not sub['ready'].is_set():
+                return
+            if consumer is not None:
+                if consumer not in sub['consumers']:
+                    return
+                sub['consumers'] = tuple(c for c in sub['consumers'] if c is not consumer)
+            sub['refs'] -= 1
+            if sub['refs'] > 0:
+                return
+            del self._subscriptions[key]
+        try:
+            xtdata.unsubscribe_quote(sub['seq'])
+        except Exception as e:
+            print(f"【行情总线】取消订阅失败 {stock_code} {period}: {e}")
+
+    def remove_consumer(self, consumer):
+        """移除消费者并释放其持有的全部订阅"""
+        with self._lock:
+            keys = [k for k, sub in self._subscriptions.items() if consumer in sub['consumers']]
+        for stock_code, period in keys:
+            self.unsubscribe(stock_code, period, consumer)
+        consumer.close()
+
+    def get_stats(self):
+        """订阅与消费者队列状态"""
+        with self._lock:
+            subs = list(self._subscriptions.items())
+        consumers = {}
+        for _, sub in subs:
+            for c in sub['consumers']:
+                consumers[c.name] = {'queue_size': c.queue.qsize(), 'dropped': c.dropped}
+        return {
+            'subscriptions': {f"{code}|{period}": sub['refs'] for (code, period), sub in subs},
+            'consumers': consumers,
+        }
+
+
+# 全局单例
+market_data_bus = MarketDataBus()
@@ -7,6 +7,8 @@ from xtquant import xtdata
 
 from models.market_models import KlineData, market_db
 from utils.utility import millisecond_to_time
+from utils.instrument_master import instrument_master, UNIVERSE_SECTORS
+from utils.kline_service import bump_sync_generation
 
 xtdata.enable_hello = False
 
@@ -22,21 +24,10 @@ def safe_float(val):
         return 0.0
 
 def get_target_codes():
-    """获取标的代码列表"""
-    # 建议注释掉下载板块，避免阻塞
-    # xtdata.download_sector_data() 
-    
-    
-    target_sectors = ['沪深A股', '沪深ETF', '沪深指数', '沪深转债', '北交所']
-    all_codes = set()
-    for sector in target_sectors:
-        try:
-            codes = xtdata.get_stock_list_in_sector(sector)
-            if codes:
-                all_codes.update(codes)
-        except Exception as e:
-            print(f"获取板块 {sector} 失败: {e}")
-    return list(all_codes)
+    """获取标的代码列表 (来自合约主数据，主数据为空时先刷新一次)"""
+    if instrument_master.is_empty():
+        instrument_master.refresh()
+    return instrument_master.get_codes(UNIVERSE_SECTORS)
 
 def get_last_update_map():
     """获取数据库中每个标的的最新日期"""
@@ -148,6 +139,8 @@ def run_daily_sync_task():
                 # 使用 chunked 分块插入
                 for batch in chunked(rows_to_insert, 500):
                     KlineData.insert_many(batch).on_conflict_replace().execute()
+                # 同一事务内递增同步代次，K线接口据此生成新的 ETag
+                bump_sync_generation(row['stock_code'] for row in rows_to_insert)
             total_inserted += len(rows_to_insert)
             
         print(f"【进度】{min(i + batch_size, len(stock_list))}/{len(stock_list)}，累计入库 {total_inserted}")
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from peewee import chunked
+
+from models.trade_models import FundFlow, DailyPerformance, NavSnapshot, trade_db
+from utils.trade_persistence import trade_persistence
+
+# 判断输入是否变化的容差
+_TOLERANCE = 1e-6
+
+
+def load_net_flows():
+    """出入金流水：date (YYYY-MM-DD), amount (入金为正，出金为负)"""
+    rows = list(FundFlow.select(FundFlow.date, FundFlow.flow_type, FundFlow.amount).tuples())
+    df = pd.DataFrame(rows, columns=['date', 'flow_type', 'amount'])
+    if df.empty:
+        return pd.DataFrame(columns=['date', 'amount'])
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+    df['amount'] = np.where(df['flow_type'] == 'withdraw', -df['amount'].abs(), df['amount'].abs())
+    return df[['date', 'amount']]
+
+
+def compute_unit_nav(assets, flows, prev_units=0.0, prev_nav=1.0, prev_assets=0.0):
+    """
+    份额法计算单位净值
+    出入金按当日净值申购/赎回：nav_t = (A_t - F_t) / units_(t-1)，units_t = units_(t-1) * A_t / (A_t - F_t)；
+    份额连续的区间内以累乘求解，上一日资产非正或出入金前资产非正时以上一净值重新起算
+    prev_units / prev_nav / prev_assets: 区间前一日的份额、净值与总资产 (从头计算时为 0 / 1 / 0)
+    返回 (units, unit_nav, daily_return)
+    """
+    assets = np.asarray(assets, dtype=np.float64)
+    flows = np.asarray(flows, dtype=np.float64)
+    n = len(assets)
+    pre = assets - flows
+    units = np.zeros(n)
+    nav = np.zeros(n)
+
+    # 重新起算点：上一日资产非正 或 出入金前资产非正
+    reset = (pre <= 0) | (np.r_[prev_assets, assets[:-1]] <= 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(reset, 1.0, assets / pre)
+
+    bounds = np.r_[0, np.flatnonzero(reset[1:]) + 1, n] if n else np.array([0])
+    carry_units, carry_nav = prev_units, prev_nav
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if start == end:
+            continue
+        if reset[start]:
+            # 以上一净值折算当日资产为份额
+            carry_units = max(assets[start], 0.0) / carry_nav
+            units[start], nav[start] = carry_units, carry_nav
+            start += 1
+        if start < end:
+            seg_units = carry_units * np.cumprod(growth[start:end])
+            seg_prev = np.r_[carry_units, seg_units[:-1]]
+            units[start:end] = seg_units
+            nav[start:end] = pre[start:end] / seg_prev
+        carry_units, carry_nav = units[end - 1], nav[end - 1]
+
+    daily_return = nav / np.r_[prev_nav, nav[:-1]] - 1.0
+    return units, nav, daily_return
+
+
+def _first_changed_date(current, stored):
+    """比较当前输入与已保存快照，返回最早不一致的日期"""
+    merged = current.merge(stored[['date', 'total_asset', 'net_flow']], on='date', how='outer', suffixes=('', '_old'))
+    changed = (
+        merged['total_asset'].isna() | merged['total_asset_old'].isna() |
+        ~np.isclose(merged['total_asset'], merged['total_asset_old'], atol=_TOLERANCE) |
+        ~np.isclose(merged['net_flow'], merged['net_flow_old'], atol=_TOLERANCE)
+    )
+    dates = merged.loc[changed, 'date']
+    return dates.min() if not dates.empty else None
+
+
+def _write_snapshots(start_date, records):
+    """替换起始日期之后的净值快照 (运行于交易数据写线程)"""
+    with trade_db.atomic():
+        NavSnapshot.delete().where(NavSnapshot.date >= start_date).execute()
+        for batch in chunked(records, 500):
+            NavSnapshot.insert_many(batch).execute()
+    return len(records)
+
+
+def update_nav_snapshots():
+    """
+    增量更新单位净值快照
+    仅从总资产或出入金发生变化的最早日期起重算，之前的份额与净值沿用已保存结果
+    """
+    current = pd.DataFrame(
+        list(DailyPerformance.select(DailyPerformance.date, DailyPerformance.total_asset)
+             .order_by(DailyPerformance.date).tuples()),
+        columns=['date', 'total_asset']
+    )
+    flows = load_net_flows().groupby('date')['amount'].sum()
+    current['net_flow'] = current['date'].map(flows).fillna(0.0)
+
+    stored = pd.DataFrame(
+        list(NavSnapshot.select(NavSnapshot.date, NavSnapshot.total_asset, NavSnapshot.net_flow,
+                                NavSnapshot.units, NavSnapshot.unit_nav)
+             .order_by(NavSnapshot.date).tuples()),
+        columns=['date', 'total_asset', 'net_flow', 'units', 'unit_nav']
+    )
+
+    start_date = _first_changed_date(current, stored)
+    if start_date is None:
+        return 0
+
+    before = stored[stored['date'] < start_date]
+    if before.empty:
+        prev_units, prev_nav, prev_assets = 0.0, 1.0, 0.0
+    else:
+        last = before.iloc[-1]
+        prev_units, prev_nav, prev_assets = last['units'], last['unit_nav'], last['total_asset']
+
+    suffix = current[current['date'] >= start_date]
+    units, nav, daily_return = compute_unit_nav(suffix['total_asset'], suffix['net_flow'],
+                                                prev_units, prev_nav, prev_assets)
+    records = [
+        {'date': d, 'total_asset': a, 'net_flow': f, 'units': u, 'unit_nav': v, 'daily_return': r}
+        for d, a, f, u, v, r in zip(suffix['date'], suffix['total_asset'].tolist(), suffix['net_flow'].tolist(),
+                                    units.tolist(), nav.tolist(), daily_return.tolist())
+    ]
+    count = trade_persistence.run(lambda: _write_snapshots(start_date, records))
+    print(f"【单位净值】自 {start_date} 起重算 {count} 日")
+    return count
@@ -0,0 +1,92 @@
+import threading
+from datetime import date
+from peewee import chunked
+
+from models.trade_models import OrderRecord
+
+# 判断委托是否发生实质变化的字段
+MATERIAL_FIELDS = ('order_status', 'traded_volume', 'traded_price')
+
+
+class OrderRecordWriter:
+    """
+    委托记录写入器
+    按 order_id 缓存当日已提交的委托状态，状态/成交量/成交均价均未变化时跳过写入；
+    缓存按交易日失效 (与成交聚合器的当日对账状态一致)，实际写入由交易持久化服务的写线程在其批次事务内调用。
+    本次事务写入的状态先记为待确认，事务提交后 (commit) 才并入缓存，回滚时 (rollback) 丢弃，
+    回滚的更新不会让之后相同的推送被当作未变化而跳过。
+    合并写入依赖持久化服务的批次：写线程每次取出全部积压事件，同一委托在批次内只写入最后一条，
+    写入繁忙时积压增多、批次随之变大 (上限 BATCH_SIZE)，空闲时立即写入，无需另设定时/定量刷新
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None       # order_id -> 已提交的实质字段元组
+        self._state_day = None   # 缓存所属的交易日
+        self._pending = {}       # order_id -> 本次事务写入、尚未提交的实质字段元组
+
+    @staticmethod
+    def _material(record):
+        return tuple(record.get(f) for f in MATERIAL_FIELDS)
+
+    def _ensure_state(self):
+        """首次使用或跨交易日时从数据库加载当日委托状态"""
+        today = date.today()
+        if self._state is not None and self._state_day == today:
+            return
+        # 跨交易日时丢弃前一日的缓存，长期运行时缓存只保留当日委托
+        state = {}
+        try:
+            query = (OrderRecord
+                     .select(OrderRecord.order_id, *[getattr(OrderRecord, f) for f in MATERIAL_FIELDS])
+                     .where(OrderRecord.order_date == today.strftime('%Y-%m-%d'))
+                     .tuples())
+            state = {row[0]: tuple(row[1:]) for row in query}
+        except Exception as e:
+            print(f"【委托写入】加载委托状态失败: {e}")
+        self._state = state
+        self._state_day = today
+        self._pending = {}
+
+    def filter_changed(self, records):
+        """
+        过滤出有实质变化的委托并记为待确认状态
+        同一委托的多条更新只保留最后一条
+        """
+        latest = {}
+        for record in records:
+            latest[record['order_id']] = record
+
+        with self._lock:
+            self._ensure_state()
+            changed = []
+            for order_id, record in latest.items():
+                material = self._material(record)
+                if self._pending.get(order_id, self._state.get(order_id)) == material:
+                    continue
+                self._pending[order_id] = material
+                changed.append(record)
+        return changed
+
+    def commit(self, payloads=None):
+        """事务提交后将待确认状态并入缓存 (payloads 仅为与持久化服务回调签名一致)"""
+        with self._lock:
+            if self._state is not None:
+                self._state.update(self._pending)
+            self._pending = {}
+
+    def rollback(self, payloads=None):
+        """事务回滚后丢弃待确认状态，后续相同的推送仍会写入"""
+        with self._lock:
+            self._pending = {}
+
+    def save(self, records):
+        """写入有变化的委托 (需在调用方事务内执行，提交/回滚后调用 commit/rollback)，返回实际写入条数"""
+        changed = self.filter_changed(records)
+        for batch in chunked(changed, 100):
+            OrderRecord.insert_many(batch).on_conflict_replace().execute()
+        return len(changed)
+
+
+# 全局单例
+order_writer = OrderRecordWriter()
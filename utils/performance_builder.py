@@ -0,0 +1,302 @@
+import json
+import os
+import time
+import threading
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta
+from peewee import fn, chunked
+
+from configs.settings import DATA_DIR
+from models.market_models import KlineData
+from models.trade_models import TradeRecord, FundFlow, DailyPerformance, trade_db
+from utils.trade_persistence import trade_persistence
+from utils.nav_unitisation import load_net_flows, update_nav_snapshots
+
+# 增量构建状态文件 (各日期输入指纹)
+PERFORMANCE_STATE_PATH = DATA_DIR / "performance_state.json"
+
+# 随窗口一并读取的起点前收盘价天数 (更早停牌的起点持仓另行查找最后收盘价)
+PRICE_SEED_DAYS = 30
+
+# 检查状态文件是否被其他进程更新的最小间隔 (秒)
+VERSION_CHECK_INTERVAL = 1.0
+
+_build_lock = threading.Lock()
+# 进程内缓存的快照版本号 (None 表示尚未从状态文件读取) 及读取时状态文件的修改时间
+_version = None
+_version_mtime = None
+_next_check = 0.0
+
+
+def _load_state():
+    try:
+        with open(PERFORMANCE_STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_state(state):
+    tmp_path = f"{PERFORMANCE_STATE_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, PERFORMANCE_STATE_PATH)
+
+
+def _state_mtime():
+    try:
+        return os.stat(PERFORMANCE_STATE_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_performance_version():
+    """
+    绩效快照版本号，每次写入 DailyPerformance 后递增
+    多进程部署时按状态文件修改时间 (每 VERSION_CHECK_INTERVAL 秒至多检查一次) 发现其他进程的重建
+    """
+    global _version, _version_mtime, _next_check
+    now = time.monotonic()
+    if _version is None or now >= _next_check:
+        _next_check = now + VERSION_CHECK_INTERVAL
+        mtime = _state_mtime()
+        if _version is None or mtime != _version_mtime:
+            # 先取修改时间再读取，读取期间的更新会在下次检查时发现
+            _version = _load_state().get('version', 0)
+            _version_mtime = mtime
+    return _version
+
+
+def _input_fingerprints():
+    """
+    按日期汇总成交与出入金，作为判断输入是否变化的指纹
+    返回 {日期: [成交笔数, 净成交量, 成交额, 费用, 净入金]}
+    """
+    fingerprints = {}
+    query = (TradeRecord
+             .select(TradeRecord.trade_date, fn.COUNT(TradeRecord.id),
+                     fn.SUM(TradeRecord.volume * TradeRecord.side),
+                     fn.SUM(TradeRecord.amount), fn.SUM(TradeRecord.total_fees))
+             .group_by(TradeRecord.trade_date)
+             .tuples())
+    for d, count, net_volume, amount, fees in query:
+        fingerprints[d] = [count, net_volume or 0, round(amount or 0.0, 4), round(fees or 0.0, 4), 0.0]
+
+    flows = load_net_flows()
+    for d, amount in flows.groupby('date')['amount'].sum().items():
+        fingerprints.setdefault(d, [0, 0, 0.0, 0.0, 0.0])[4] = round(float(amount), 4)
+    return fingerprints
+
+
+def _load_base(start_date):
+    """窗口起点之前的持仓数量与现金余额"""
+    holdings = dict(TradeRecord
+                    .select(TradeRecord.stock_code, fn.SUM(TradeRecord.volume * TradeRecord.side))
+                    .where(TradeRecord.trade_date < start_date)
+                    .group_by(TradeRecord.stock_code)
+                    .tuples())
+    holdings = {code: qty for code, qty in holdings.items() if qty}
+
+    # 成交对现金的影响：-(成交额 * 方向 + 费用)
+    trade_cash = -((TradeRecord
+                    .select(fn.SUM(TradeRecord.amount * TradeRecord.side + TradeRecord.total_fees))
+                    .where(TradeRecord.trade_date < start_date)
+                    .scalar()) or 0.0)
+
+    prev = (DailyPerformance
+            .select(DailyPerformance.total_asset)
+            .where(DailyPerformance.date < start_date)
+            .order_by(DailyPerformance.date.desc())
+            .tuples()
+            .first())
+    return holdings, trade_cash, prev[0] if prev else 0.0
+
+
+def _pivot(df, values, aggfunc):
+    """dates × codes 透视 (空数据返回空表)"""
+    if df.empty:
+        return pd.DataFrame()
+    return df.pivot_table(index='date', columns='stock_code', values=values, aggfunc=aggfunc)
+
+
+def _load_closes(codes, start_date):
+    """读取窗口内 (含向前补价区间) 的收盘价，返回 dates × codes 透视表"""
+    seed_date = (date.fromisoformat(start_date) - timedelta(days=PRICE_SEED_DAYS)).isoformat()
+    rows = []
+    for batch in chunked(sorted(codes), 500):
+        rows.extend(KlineData
+                    .select(KlineData.date, KlineData.stock_code, KlineData.close)
+                    .where(KlineData.stock_code.in_(batch), KlineData.date >= seed_date)
+                    .tuples())
+    return _pivot(pd.DataFrame(rows, columns=['date', 'stock_code', 'close']), 'close', 'last')
+
+
+def _load_seed_prices(codes, start_date):
+    """
+    起点持仓的补价：窗口起点前最后一个收盘价 (不限时间)，无行情的以起点前买入均价补齐
+    仍无价格的标的打印警告，其市值按 0 计
+    """
+    seeds = {}
+    for batch in chunked(sorted(codes), 500):
+        latest = (KlineData
+                  .select(KlineData.stock_code, fn.MAX(KlineData.date).alias('last_date'))
+                  .where(KlineData.stock_code.in_(batch), KlineData.date < start_date)
+                  .group_by(KlineData.stock_code))
+        seeds.update(KlineData
+                     .select(KlineData.stock_code, KlineData.close)
+                     .join(latest, on=((KlineData.stock_code == latest.c.stock_code) &
+                                       (KlineData.date == latest.c.last_date)))
+                     .tuples())
+
+    missing = sorted(set(codes) - set(seeds))
+    for batch in chunked(missing, 500):
+        buys = (TradeRecord
+                .select(TradeRecord.stock_code, fn.SUM(TradeRecord.amount), fn.SUM(TradeRecord.volume))
+                .where(TradeRecord.stock_code.in_(batch), TradeRecord.side > 0,
+                       TradeRecord.trade_date < start_date)
+                .group_by(TradeRecord.stock_code)
+                .tuples())
+        seeds.update((code, amount / volume) for code, amount, volume in buys if volume)
+
+    unpriced = sorted(set(codes) - set(seeds))
+    if unpriced:
+        print(f"【绩效构建】{start_date} 起点持仓缺少价格，市值按 0 计: {', '.join(unpriced)}")
+    return seeds
+
+
+def compute_performance(start_date, end_date=None):
+    """
+    向量化计算 [start_date, end_date] 区间的每日绩效
+    持仓 = 起点持仓 + 按日净成交量的累计和 (dates × codes)，按收盘价逐日估值；
+    daily_return 为扣除当日出入金影响的收益率：(A_t - A_(t-1) - F_t) / (A_(t-1) + F_t)
+    """
+    end_date = end_date or date.today().isoformat()
+    base_holdings, base_trade_cash, prev_asset = _load_base(start_date)
+
+    trades = pd.DataFrame(
+        list(TradeRecord
+             .select(TradeRecord.trade_date, TradeRecord.stock_code, TradeRecord.side,
+                     TradeRecord.volume, TradeRecord.amount, TradeRecord.total_fees)
+             .where(TradeRecord.trade_date >= start_date, TradeRecord.trade_date <= end_date)
+             .tuples()),
+        columns=['date', 'stock_code', 'side', 'volume', 'amount', 'total_fees']
+    )
+    flows = load_net_flows()
+    base_flow = flows.loc[flows['date'] < start_date, 'amount'].sum()
+    flows = flows[(flows['date'] >= start_date) & (flows['date'] <= end_date)]
+
+    codes = set(base_holdings) | set(trades['stock_code'])
+    closes = _load_closes(codes, start_date) if codes else pd.DataFrame()
+
+    # 交易日历：行情日期与成交/出入金日期的并集
+    dates = sorted(
+        {d for d in closes.index if start_date <= d <= end_date} |
+        set(trades['date']) | set(flows['date'])
+    )
+    if not dates:
+        return pd.DataFrame(columns=['date', 'total_asset', 'market_value', 'cash', 'daily_return'])
+    codes = sorted(codes)
+
+    # 1. 持仓矩阵
+    trades['signed_volume'] = trades['volume'] * trades['side']
+    trades['cash_delta'] = -trades['amount'] * trades['side'] - trades['total_fees']
+    volume_delta = _pivot(trades, 'signed_volume', 'sum').reindex(index=dates, columns=codes).fillna(0)
+    base = np.array([base_holdings.get(c, 0) for c in codes], dtype=np.float64)
+    holdings = base + volume_delta.to_numpy(dtype=np.float64).cumsum(axis=0)
+
+    # 2. 价格矩阵：收盘价向前填充，缺失时以最近成交均价补齐
+    all_dates = sorted(set(closes.index) | set(dates))
+    prices = closes.reindex(index=all_dates, columns=codes).ffill()
+    trade_prices = (_pivot(trades.assign(price=trades['amount'] / trades['volume']), 'price', 'last')
+                    .reindex(index=all_dates, columns=codes).ffill())
+    prices = prices.combine_first(trade_prices).reindex(dates)
+    # 起点持仓在窗口首日仍无价格 (长期停牌等) 时以更早的收盘价或成本价补齐
+    unseeded = [c for c in base_holdings if pd.isna(prices.at[dates[0], c])]
+    if unseeded:
+        prices = prices.fillna(pd.Series(_load_seed_prices(unseeded, start_date), dtype=np.float64))
+    prices = prices.to_numpy(dtype=np.float64)
+
+    market_value = np.nansum(holdings * prices, axis=1)
+
+    # 3. 现金与出入金
+    flow_by_date = flows.groupby('date')['amount'].sum().reindex(dates, fill_value=0.0).to_numpy(dtype=np.float64)
+    cash_delta = trades.groupby('date')['cash_delta'].sum().reindex(dates, fill_value=0.0).to_numpy(dtype=np.float64)
+    cash = base_trade_cash + base_flow + np.cumsum(cash_delta + flow_by_date)
+    total_asset = cash + market_value
+
+    prev = np.r_[prev_asset, total_asset[:-1]]
+    denominator = prev + flow_by_date
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily_return = np.where(denominator > 0, (total_asset - denominator) / denominator, 0.0)
+
+    return pd.DataFrame({
+        'date': dates,
+        'total_asset': np.round(total_asset, 2),
+        'market_value': np.round(market_value, 2),
+        'cash': np.round(cash, 2),
+        'daily_return': np.round(daily_return, 8),
+    })
+
+
+def _write_performance(start_date, df):
+    """替换起始日期之后的绩效快照 (运行于交易数据写线程)"""
+    records = df.to_dict('records')
+    with trade_db.atomic():
+        DailyPerformance.delete().where(DailyPerformance.date >= start_date).execute()
+        for batch in chunked(records, 500):
+            DailyPerformance.insert_many(batch).execute()
+    return len(records)
+
+
+def build_daily_performance(full=False):
+    """
+    构建每日绩效快照
+    比较各日期成交/出入金指纹，仅从最早发生变化的日期 (或上次构建的最后一日) 开始重算，
+    随后增量更新单位净值快照
+    返回重算的日数 (绩效快照与净值快照中较多者)
+    """
+    global _version, _version_mtime
+    with _build_lock:
+        started = time.monotonic()
+        state = _load_state()
+        fingerprints = _input_fingerprints()
+        if not fingerprints:
+            return 0
+
+        old = {} if full else state.get('fingerprints', {})
+        changed = [d for d in fingerprints.keys() | old.keys() if fingerprints.get(d) != old.get(d)]
+        # 上次构建的最后一日可能使用了未收盘或缺失的价格，始终重新估值
+        if state.get('last_date') and not full:
+            changed.append(state['last_date'])
+
+        count = 0
+        if changed:
+            start_date = min(min(changed), date.today().isoformat())
+            df = compute_performance(start_date)
+            count = trade_persistence.run(lambda: _write_performance(start_date, df))
+            state.update({
+                'fingerprints': fingerprints,
+                'last_date': df['date'].iloc[-1] if not df.empty else state.get('last_date'),
+            })
+            print(f"【绩效快照】自 {start_date} 起重算 {count} 日，耗时 {time.monotonic() - started:.2f}s")
+
+        nav_count = update_nav_snapshots()
+        if not (count or nav_count):
+            return 0
+
+        state.update({
+            'version': state.get('version', 0) + 1,
+            'built_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        _save_state(state)
+        _version, _version_mtime = state['version'], _state_mtime()
+        return max(count, nav_count)
+
+
+def run_daily_performance_task():
+    """定时任务入口"""
+    try:
+        build_daily_performance()
+    except Exception as e:
+        print(f"【绩效快照】构建失败: {e}")
@@ -0,0 +1,166 @@
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+
+from models.market_models import KlineData
+from models.trade_models import DailyPerformance, NavSnapshot
+from utils.performance_builder import get_performance_version
+
+# 年化交易日数
+TRADING_DAYS = 252
+# 默认基准指数
+DEFAULT_BENCHMARK = '000300.SH'
+# 默认滚动窗口 (交易日)
+DEFAULT_WINDOW = 60
+
+
+def load_performance_series():
+    """
+    读取每日收益序列，按日期升序
+    优先使用份额法的时间加权收益，尚未生成单位净值时退回每日绩效快照
+    """
+    rows = list(NavSnapshot
+                .select(NavSnapshot.date, NavSnapshot.total_asset, NavSnapshot.daily_return)
+                .order_by(NavSnapshot.date)
+                .tuples())
+    if rows:
+        return pd.DataFrame(rows, columns=['date', 'total_asset', 'daily_return'])
+    rows = list(DailyPerformance
+                .select(DailyPerformance.date, DailyPerformance.total_asset, DailyPerformance.daily_return)
+                .order_by(DailyPerformance.date)
+                .tuples())
+    return pd.DataFrame(rows, columns=['date', 'total_asset', 'daily_return'])
+
+
+def load_benchmark_closes(code, start_date, end_date):
+    """读取基准指数收盘价"""
+    rows = list(KlineData
+                .select(KlineData.date, KlineData.close)
+                .where((KlineData.stock_code == code) &
+                       (KlineData.date >= start_date) & (KlineData.date <= end_date))
+                .order_by(KlineData.date)
+                .tuples())
+    return pd.Series(dict(rows), dtype=np.float64)
+
+
+def _rolling_sum(x, window):
+    """基于累计和的滚动求和，前 window-1 个位置为 NaN"""
+    c = np.cumsum(np.r_[0.0, x])
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = c[window:] - c[:-window]
+    return out
+
+
+def compute_metrics(dates, returns, benchmark=None, window=DEFAULT_WINDOW):
+    """
+    计算净值、回撤、滚动波动率/夏普与月度收益 (全部为数组运算)
+    dates: 日期字符串数组；returns: 日收益率数组；benchmark: 与 dates 对齐的基准收盘价
+    """
+    returns = np.nan_to_num(np.asarray(returns, dtype=np.float64))
+    nav = np.cumprod(1.0 + returns)
+    peak = np.maximum.accumulate(nav)
+    drawdown = nav / peak - 1.0
+
+    # 滚动波动率与夏普：Var = E[x^2] - E[x]^2
+    mean = _rolling_sum(returns, window) / window
+    var = _rolling_sum(returns ** 2, window) / window - mean ** 2
+    std = np.sqrt(np.clip(var * window / max(window - 1, 1), 0.0, None))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rolling_vol = std * np.sqrt(TRADING_DAYS)
+        rolling_sharpe = np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS), np.nan)
+
+    # 月度收益：按月份分组的 (1+r) 连乘
+    months = np.array([d[:7] for d in dates])
+    month_keys, month_index = np.unique(months, return_inverse=True)
+    log_growth = np.bincount(month_index, weights=np.log1p(returns), minlength=len(month_keys))
+    monthly = np.expm1(log_growth)
+
+    n = len(returns)
+    total_return = nav[-1] - 1.0 if n else 0.0
+    annual_return = nav[-1] ** (TRADING_DAYS / n) - 1.0 if n and nav[-1] > 0 else 0.0
+    daily_std = returns.std(ddof=1) if n > 1 else 0.0
+    annual_vol = daily_std * np.sqrt(TRADING_DAYS)
+    max_drawdown = drawdown.min() if n else 0.0
+    stats = {
+        'days': n,
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'annual_volatility': annual_vol,
+        'sharpe': returns.mean() / daily_std * np.sqrt(TRADING_DAYS) if daily_std else None,
+        'max_drawdown': max_drawdown,
+        'calmar': annual_return / -max_drawdown if max_drawdown < 0 else None,
+    }
+
+    result = {
+        'dates': list(dates),
+        'nav': nav,
+        'drawdown': drawdown,
+        'rolling_vol': rolling_vol,
+        'rolling_sharpe': rolling_sharpe,
+        'months': month_keys.tolist(),
+        'monthly_returns': monthly,
+        'stats': stats,
+        'benchmark_nav': None,
+    }
+
+    if benchmark is not None and len(benchmark):
+        bench = np.asarray(benchmark, dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(bench))
+        if len(valid):
+            bench_nav = bench / bench[valid[0]]
+            result['benchmark_nav'] = bench_nav
+            stats['benchmark_return'] = bench_nav[valid[-1]] - 1.0
+            stats['excess_return'] = total_return - stats['benchmark_return']
+    return result
+
+
+class PerformanceReportCache:
+    """
+    绩效指标缓存
+    以 (快照版本, 基准, 窗口) 为键，绩效快照更新前重复访问直接返回计算结果
+    """
+
+    def __init__(self, maxsize=16):
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._maxsize = maxsize
+
+    def get_report(self, benchmark=DEFAULT_BENCHMARK, window=DEFAULT_WINDOW):
+        key = (get_performance_version(), benchmark, window)
+        with self._lock:
+            report = self._cache.get(key)
+            if report is not None:
+                self._cache.move_to_end(key)
+                return report
+
+        report = self._build(benchmark, window)
+        with self._lock:
+            self._cache[key] = report
+            while len(self._cache) > self._maxsize:
+                self._cache.popitem(last=False)
+        return report
+
+    @staticmethod
+    def _build(benchmark, window):
+        df = load_performance_series()
+        if df.empty:
+            return None
+        dates = df['date'].tolist()
+        bench = None
+        if benchmark:
+            closes = load_benchmark_closes(benchmark, dates[0], dates[-1])
+            # 基准停牌/缺失日期沿用前值
+            bench = closes.reindex(dates).ffill().to_numpy() if not closes.empty else None
+        report = compute_metrics(dates, df['daily_return'].to_numpy(), bench, window)
+        report['total_asset'] = df['total_asset'].to_numpy()
+        return report
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+# 全局单例
+performance_report_cache = PerformanceReportCache()
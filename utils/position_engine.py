@@ -0,0 +1,314 @@
+import threading
+import numpy as np
+import pandas as pd
+from collections import deque
+from xtquant import xtdata
+
+from models.trade_models import TradeRecord
+from utils.trade_persistence import trade_persistence
+
+# 持仓分组键
+POSITION_KEYS = ['stock_code', 'strategy_name']
+# 建仓周期内保留比例累乘的下限，低于此值 b / p 会溢出或丢失精度，改为逐笔递推
+PRODUCT_FLOOR = 1e-100
+
+
+class _Position:
+    """
+    单个 (代码, 策略) 的持仓状态
+    cost: 移动加权平均法下的持仓总成本 (含买入费用)
+    lots: 先进先出法下的剩余批次 [数量, 单位成本]
+    """
+    __slots__ = (
+        'stock_code', 'strategy_name', 'quantity', 'cost', 'lots',
+        'realized_avg', 'realized_fifo', 'total_fees', 'unmatched_volume', 'last_trade_time'
+    )
+
+    def __init__(self, stock_code, strategy_name):
+        self.stock_code = stock_code
+        self.strategy_name = strategy_name
+        self.quantity = 0
+        self.cost = 0.0
+        self.lots = deque()
+        self.realized_avg = 0.0
+        self.realized_fifo = 0.0
+        self.total_fees = 0.0
+        self.unmatched_volume = 0
+        self.last_trade_time = None
+
+    def apply(self, side, volume, amount, fees, trade_time=None):
+        """应用一笔成交增量 (买入计入成本，卖出按平均/先进先出两种口径结转已实现盈亏)"""
+        self.total_fees += fees
+        if trade_time is not None:
+            self.last_trade_time = trade_time
+
+        if side > 0:
+            self.quantity += volume
+            self.cost += amount + fees
+            self.lots.append([volume, (amount + fees) / volume])
+            return
+
+        # 超出持仓的卖出 (如缺少早期买入记录) 不参与盈亏结转
+        matched = min(volume, self.quantity)
+        self.unmatched_volume += volume - matched
+        if not matched:
+            return
+        proceeds = (amount - fees) * matched / volume
+
+        avg_cost = self.cost * matched / self.quantity
+        self.realized_avg += proceeds - avg_cost
+        self.cost -= avg_cost
+
+        fifo_cost, remaining = 0.0, matched
+        while remaining:
+            lot = self.lots[0]
+            take = min(lot[0], remaining)
+            fifo_cost += take * lot[1]
+            lot[0] -= take
+            remaining -= take
+            if not lot[0]:
+                self.lots.popleft()
+        self.realized_fifo += proceeds - fifo_cost
+
+        self.quantity -= matched
+        if not self.quantity:
+            self.cost = 0.0
+            self.lots.clear()
+
+    def to_dict(self):
+        fifo_cost = sum(q * c for q, c in self.lots)
+        return {
+            'key': f"{self.stock_code}|{self.strategy_name}",
+            'stock_code': self.stock_code,
+            'strategy_name': self.strategy_name,
+            'quantity': self.quantity,
+            'avg_cost': self.cost / self.quantity if self.quantity else None,
+            'fifo_cost': fifo_cost / self.quantity if self.quantity else None,
+            'cost_basis': self.cost,
+            'realized_pnl_avg': self.realized_avg,
+            'realized_pnl_fifo': self.realized_fifo,
+            'total_fees': self.total_fees,
+            'unmatched_volume': self.unmatched_volume,
+            'last_trade_time': self.last_trade_time.strftime('%Y-%m-%d %H:%M:%S') if self.last_trade_time else None,
+        }
+
+
+def _load_trade_frame():
+    """一次性读取计算持仓所需的成交字段"""
+    query = (TradeRecord
+             .select(TradeRecord.order_id, TradeRecord.stock_code, TradeRecord.strategy_name,
+                     TradeRecord.trade_time, TradeRecord.side, TradeRecord.volume,
+                     TradeRecord.amount, TradeRecord.total_fees)
+             .where(TradeRecord.side != 0, TradeRecord.volume > 0)
+             .order_by(TradeRecord.trade_time, TradeRecord.id)
+             .tuples())
+    return pd.DataFrame(
+        list(query),
+        columns=['order_id', 'stock_code', 'strategy_name', 'trade_time', 'side', 'volume', 'amount', 'total_fees']
+    )
+
+
+def _sequential_cost(m, b, group_id, episode):
+    """逐笔递推建仓周期内的持仓总成本 (行按时间排序，不同周期可交错)"""
+    cost = np.empty(len(m))
+    last = {}
+    for i, key in enumerate(zip(group_id.tolist(), episode.tolist())):
+        cost[i] = last[key] = m[i] * last.get(key, 0.0) + b[i]
+    return cost
+
+
+def replay_positions(df):
+    """
+    向量化回放成交流水，返回 {(代码, 策略): _Position}
+    - 持仓数量：下限为 0 的累计和 Q = S - min(0, cummin(S))
+    - 平均成本：每段建仓周期内成本满足 C_k = m_k * C_(k-1) + b_k，以累乘/累加求解
+    - 先进先出：已卖出部分消耗的必然是买入流水的前 M 股，成本由累计买入成本曲线插值得到
+    """
+    positions = {}
+    if df.empty:
+        return positions
+
+    df = df.reset_index(drop=True)
+    df['strategy_name'] = df['strategy_name'].fillna('手动下单')
+    buy = (df['side'] > 0).to_numpy()
+    volume = df['volume'].to_numpy(dtype=np.float64)
+    amount = df['amount'].to_numpy(dtype=np.float64)
+    fees = df['total_fees'].fillna(0.0).to_numpy(dtype=np.float64)
+    group_id = df.groupby(POSITION_KEYS, sort=False).ngroup().to_numpy()
+
+    # 1. 持仓数量 (超卖部分不形成负持仓)
+    signed = pd.Series(np.where(buy, volume, -volume))
+    raw = signed.groupby(group_id).cumsum()
+    q_after = (raw - np.minimum(0.0, raw.groupby(group_id).cummin())).to_numpy()
+    q_before = pd.Series(q_after).groupby(group_id).shift(fill_value=0.0).to_numpy()
+    matched = np.where(buy, 0.0, q_before - q_after)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        proceeds = np.where(buy, 0.0, (amount - fees) * matched / volume)
+
+    # 2. 平均成本：持仓归零后开始新的建仓周期
+    closed = pd.Series(q_after == 0)
+    episode = closed.groupby(group_id).shift(fill_value=False).groupby(group_id).cumsum().to_numpy()
+    episode_key = [group_id, episode]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m = np.where(~buy & (q_after > 0), q_after / q_before, 1.0)
+    b = np.where(buy, amount + fees, 0.0)
+    p = pd.Series(m).groupby(episode_key).cumprod().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        cost = p * pd.Series(b / p).groupby(episode_key).cumsum().to_numpy()
+    # 多次部分卖出使累乘过小的建仓周期，按 C_k = m_k * C_(k-1) + b_k 逐笔递推
+    unstable = pd.Series(p < PRODUCT_FLOOR).groupby(episode_key).transform('any').to_numpy()
+    if unstable.any():
+        cost[unstable] = _sequential_cost(m[unstable], b[unstable], group_id[unstable], episode[unstable])
+    cost_before = pd.Series(cost).groupby(episode_key).shift(fill_value=0.0).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_released = np.where(~buy & (q_before > 0), cost_before * matched / q_before, 0.0)
+    cost = np.where(q_after > 0, cost, 0.0)
+
+    frame = pd.DataFrame({
+        'g': group_id, 'buy': buy, 'volume': volume, 'lot_cost': b,
+        'proceeds': proceeds, 'matched': matched, 'realized_avg': proceeds - avg_released,
+        'unmatched': np.where(buy, 0.0, volume - matched), 'fees': fees,
+    })
+    summary = frame.groupby('g').agg(
+        proceeds=('proceeds', 'sum'), matched=('matched', 'sum'), realized_avg=('realized_avg', 'sum'),
+        unmatched=('unmatched', 'sum'), fees=('fees', 'sum'),
+    )
+    last_rows = pd.Series(np.arange(len(df))).groupby(group_id).last()
+    buys_by_group = dict(tuple(frame[frame['buy']].groupby('g')))
+
+    # 3. 先进先出：按组插值累计买入成本
+    for g, row in summary.iterrows():
+        last = last_rows[g]
+        pos = _Position(df.at[last, 'stock_code'], df.at[last, 'strategy_name'])
+        pos.quantity = int(q_after[last])
+        pos.cost = float(cost[last])
+        pos.realized_avg = float(row['realized_avg'])
+        pos.total_fees = float(row['fees'])
+        pos.unmatched_volume = int(row['unmatched'])
+        pos.last_trade_time = df.at[last, 'trade_time']
+
+        buys = buys_by_group.get(g)
+        consumed = 0.0
+        if buys is not None:
+            cum_volume = buys['volume'].cumsum().to_numpy()
+            cum_cost = buys['lot_cost'].cumsum().to_numpy()
+            consumed = float(np.interp(row['matched'], np.r_[0.0, cum_volume], np.r_[0.0, cum_cost]))
+            # 剩余批次：累计买入量超过已消耗数量的部分
+            start = np.r_[0.0, cum_volume[:-1]]
+            lot_volume = buys['volume'].to_numpy()
+            remaining = cum_volume - np.maximum(start, row['matched'])
+            for qty, vol, lot_cost in zip(remaining, lot_volume, buys['lot_cost'].to_numpy()):
+                if qty > 0:
+                    pos.lots.append([int(round(qty)), lot_cost / vol])
+        pos.realized_fifo = float(row['proceeds']) - consumed
+        positions[(pos.stock_code, pos.strategy_name)] = pos
+    return positions
+
+
+class PositionEngine:
+    """
+    实时持仓与成本引擎
+    首次使用时从 TradeRecord 向量化回放建立持仓，之后由成交写入流程按委托增量更新；
+    初始化与增量更新均在交易持久化写线程上执行，与数据库提交顺序一致
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._positions = None
+        # order_id -> (分组键, 方向, 已计入的成交量, 成交额, 费用)
+        self._applied = {}
+
+    def _bootstrap(self):
+        """从数据库全量回放 (运行于写线程)"""
+        if self._positions is not None:
+            return
+        df = _load_trade_frame()
+        positions = replay_positions(df)
+
+        applied = {}
+        if not df.empty:
+            df['strategy_name'] = df['strategy_name'].fillna('手动下单')
+            totals = df.groupby('order_id', sort=False).agg(
+                stock_code=('stock_code', 'first'), strategy_name=('strategy_name', 'first'),
+                side=('side', 'first'), volume=('volume', 'sum'),
+                amount=('amount', 'sum'), fees=('total_fees', 'sum'),
+            )
+            for order_id, r in zip(totals.index, totals.itertuples(index=False)):
+                applied[order_id] = ((r.stock_code, r.strategy_name), r.side, r.volume, r.amount, r.fees)
+
+        with self._lock:
+            self._positions = positions
+            self._applied = applied
+        print(f"【持仓引擎】回放 {len(df)} 条成交，建立 {len(positions)} 个持仓")
+
+    def invalidate(self):
+        """丢弃内存状态，下次读取时重新回放"""
+        with self._lock:
+            self._positions = None
+            self._applied = {}
+
+    def apply_records(self, records):
+        """
+        按委托增量应用 TradeRecord 行数据 (需在写线程内调用)
+        同一委托的合并记录重复写入时只计入与上次的差额
+        """
+        with self._lock:
+            if self._positions is None:
+                return
+            for r in records:
+                if not r.get('side') or not r.get('volume'):
+                    continue
+                key = (r['stock_code'], r['strategy_name'] or '手动下单')
+                prev = self._applied.get(r['order_id'])
+                if prev is None:
+                    prev = (key, r['side'], 0, 0.0, 0.0)
+                d_volume = r['volume'] - prev[2]
+                d_amount = r['amount'] - prev[3]
+                d_fees = r['total_fees'] - prev[4]
+                if not (d_volume or d_amount or d_fees):
+                    continue
+                # 归属或方向变化、成交量回退、仅费用变化等无法增量处理，改为全量回放
+                if prev[0] != key or prev[1] != r['side'] or d_volume <= 0:
+                    self._positions = None
+                    self._applied = {}
+                    return
+
+                pos = self._positions.get(key)
+                if pos is None:
+                    pos = self._positions[key] = _Position(*key)
+                pos.apply(r['side'], d_volume, d_amount, d_fees, r.get('trade_time'))
+                self._applied[r['order_id']] = (key, r['side'], r['volume'], r['amount'], r['total_fees'])
+
+    def get_positions(self, include_closed=False):
+        """当前持仓列表 (首次调用时在写线程上完成回放)"""
+        if self._positions is None:
+            trade_persistence.run(self._bootstrap)
+        with self._lock:
+            positions = list((self._positions or {}).values())
+            rows = [p.to_dict() for p in positions if include_closed or p.quantity]
+        return sorted(rows, key=lambda r: (r['stock_code'], r['strategy_name']))
+
+
+def attach_market_prices(rows):
+    """为持仓附加最新价、市值与浮动盈亏 (批量获取一次快照)"""
+    codes = sorted({r['stock_code'] for r in rows if r['quantity']})
+    try:
+        ticks = xtdata.get_full_tick(codes) if codes else {}
+    except Exception as e:
+        print(f"【持仓引擎】获取最新价失败: {e}")
+        ticks = {}
+
+    for r in rows:
+        price = (ticks.get(r['stock_code']) or {}).get('lastPrice')
+        r['last_price'] = price or None
+        if price and r['quantity']:
+            r['market_value'] = price * r['quantity']
+            r['unrealized_pnl_avg'] = r['market_value'] - r['avg_cost'] * r['quantity']
+            r['unrealized_pnl_fifo'] = r['market_value'] - r['fifo_cost'] * r['quantity']
+        else:
+            r['market_value'] = r['unrealized_pnl_avg'] = r['unrealized_pnl_fifo'] = None
+    return rows
+
+
+# 全局单例
+position_engine = PositionEngine()
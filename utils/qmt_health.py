@@ -0,0 +1,113 @@
+import time
+import threading
+from datetime import datetime
+
+from configs import BaseConfig
+from utils.xt_manager import xt_manager
+
+
+class QmtHealthMonitor:
+    """
+    QMT 连接健康监测
+    由唯一的后台线程按固定间隔探测连接，断开时在交易接口初始化线程中重连 (探测线程不等待)，
+    重连结束后立即更新状态，失败时按指数退避延长下次探测时间；
+    探测结果缓存在内存中，页面回调只读取缓存状态，不直接触发连接
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(QmtHealthMonitor, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._thread = None
+            cls._instance._wakeup = threading.Event()
+            cls._instance._probe_requested = False
+            cls._instance._status_lock = threading.Lock()
+            cls._instance._failures = 0
+            cls._instance._status = {
+                'connected': False,
+                'message': "尚未探测",
+                'checked_at': None,
+                'next_check_at': None,
+                'failures': 0,
+            }
+        return cls._instance
+
+    def start(self):
+        """启动探测线程 (重复调用无副作用)"""
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='qmt-health-monitor', daemon=True)
+            self._thread.start()
+
+    def _next_delay(self):
+        """下次探测间隔：连接正常时为固定间隔，失败时按 2^n 退避"""
+        interval = BaseConfig.qmt_health_interval
+        if self._failures == 0:
+            return interval
+        return min(interval * (2 ** (self._failures - 1)), BaseConfig.qmt_reconnect_max_backoff)
+
+    def _run(self):
+        while True:
+            self.probe()
+            # 等待至下次探测时间；重连结束时会更新 next_check_at 并唤醒，按新的时间重新等待
+            while not self._probe_requested:
+                delay = self._status['next_check_at'] - time.time()
+                if delay <= 0:
+                    break
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+            self._probe_requested = False
+
+    def probe(self):
+        """执行一次探测并更新缓存状态 (仅由探测线程调用，断开时发起后台重连后立即返回)"""
+        connected, msg = xt_manager.check_connection(on_reconnected=self._on_reconnected)
+        self._publish(connected, msg)
+
+    def _on_reconnected(self):
+        """后台重连结束 (运行于交易接口初始化线程)：更新状态并唤醒探测线程重新计算等待时间"""
+        if xt_manager.is_ready:
+            self._publish(True, "自动重连成功")
+        else:
+            self._publish(False, xt_manager.state_message)
+        self._wakeup.set()
+
+    def _publish(self, connected, msg):
+        with self._status_lock:
+            # 后台初始化中不计入失败次数
+            if connected:
+                self._failures = 0
+            elif xt_manager.state not in (xt_manager.STATE_CONNECTING, xt_manager.STATE_SYNCING):
+                self._failures += 1
+
+            now = time.time()
+            # 整体替换状态字典，读取端无需加锁
+            self._status = {
+                'connected': connected,
+                'message': msg,
+                'checked_at': now,
+                'next_check_at': now + self._next_delay(),
+                'failures': self._failures,
+            }
+
+    def request_probe(self):
+        """唤醒探测线程立即探测 (如手动重连)，不等待探测或重连结果"""
+        self.start()
+        self._probe_requested = True
+        self._wakeup.set()
+
+    def get_status(self):
+        """读取缓存的连接状态与交易接口就绪状态"""
+        status = dict(self._status)
+        status.update({f"trader_{k}": v for k, v in xt_manager.get_status().items()})
+        for key in ('checked_at', 'next_check_at'):
+            if status[key] is not None:
+                status[key] = datetime.fromtimestamp(status[key]).strftime('%H:%M:%S')
+        return status
+
+
+# 全局单例
+qmt_health = QmtHealthMonitor()
@@ -0,0 +1,177 @@
+import time
+import threading
+import numpy as np
+from xtquant import xtdata
+
+from configs import BaseConfig
+from utils.market_data_sync import get_target_codes
+from utils.stock_info_manager import stock_info_manager
+
+# 行情看板字段 (与 get_full_tick 返回字段一致)
+QUOTE_FIELDS = ('lastPrice', 'open', 'high', 'low', 'lastClose', 'volume', 'amount')
+
+
+class _BoardSnapshot:
+    """
+    看板快照 (不可变)
+    values: (N, len(QUOTE_FIELDS)) 的 float64 数组
+    row_versions: 每行最近一次发生变化时的版本号
+    """
+    __slots__ = ('epoch', 'version', 'codes', 'names', 'values', 'row_versions')
+
+    def __init__(self, epoch, version, codes, names, values, row_versions):
+        self.epoch = epoch
+        self.version = version
+        self.codes = codes
+        self.names = names
+        self.values = values
+        self.row_versions = row_versions
+
+
+class QuoteBoard:
+    """
+    全市场行情看板
+    由单个后台线程定时调用 xtdata.get_full_tick 批量获取快照，
+    以数组形式保存最新行情，并记录每行的变化版本，供客户端按版本增量拉取
+    """
+    _instance = None
+
+    # 无客户端访问超过该时长 (秒) 后自动停止轮询
+    IDLE_TIMEOUT = 300
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(QuoteBoard, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._thread = None
+            cls._instance._snapshot = None
+            cls._instance._epoch = 0
+            cls._instance._last_access = 0.0
+        return cls._instance
+
+    def _load_universe(self):
+        """加载看板标的：优先使用自选列表，否则为全市场"""
+        codes = list(BaseConfig.quote_board_watchlist) or sorted(get_target_codes())
+        names = [stock_info_manager._cache.get(c, c) for c in codes]
+        return codes, names
+
+    def ensure_started(self):
+        """确保轮询线程运行 (由页面回调惰性触发)"""
+        self._last_access = time.monotonic()
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='quote-board-poller', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        print("【行情看板】轮询线程启动")
+        try:
+            codes, names = self._load_universe()
+            self._epoch += 1
+            self._snapshot = _BoardSnapshot(
+                epoch=self._epoch,
+                version=0,
+                codes=codes,
+                names=names,
+                values=np.full((len(codes), len(QUOTE_FIELDS)), np.nan),
+                row_versions=np.zeros(len(codes), dtype=np.int64),
+            )
+        except Exception as e:
+            print(f"【行情看板】加载标的失败: {e}")
+            return
+
+        while time.monotonic() - self._last_access < self.IDLE_TIMEOUT:
+            started = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"【行情看板】获取快照失败: {e}")
+            time.sleep(max(0.0, BaseConfig.quote_board_interval - (time.monotonic() - started)))
+        print("【行情看板】长时间无访问，轮询线程退出")
+
+    def poll_once(self):
+        """拉取一次全量快照，并标记发生变化的行"""
+        snapshot = self._snapshot
+        if snapshot is None or not snapshot.codes:
+            return
+
+        ticks = xtdata.get_full_tick(snapshot.codes) or {}
+        values = snapshot.values.copy()
+        for i, code in enumerate(snapshot.codes):
+            tick = ticks.get(code)
+            if tick:
+                values[i] = [tick.get(f, np.nan) for f in QUOTE_FIELDS]
+
+        # 仅比较数值变化 (两侧均为 NaN 视为未变化)
+        changed = ((values != snapshot.values) &
+                   ~(np.isnan(values) & np.isnan(snapshot.values))).any(axis=1)
+        if not changed.any():
+            return
+
+        version = snapshot.version + 1
+        row_versions = snapshot.row_versions.copy()
+        row_versions[changed] = version
+        # 整体替换快照引用，读取端无需加锁
+        self._snapshot = _BoardSnapshot(
+            snapshot.epoch, version, snapshot.codes, snapshot.names, values, row_versions
+        )
+
+    @staticmethod
+    def _format_rows(snapshot, indexes):
+        """将指定行转换为表格数据"""
+        values = snapshot.values[indexes]
+        last_price, last_close = values[:, 0], values[:, 4]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = np.where(last_close > 0, (last_price / last_close - 1) * 100, np.nan)
+        values = np.round(values, 3)
+        pct = np.round(pct, 2)
+
+        rows = []
+        for k, i in enumerate(indexes.tolist()):
+            v = [None if np.isnan(x) else x for x in values[k].tolist()]
+            rows.append({
+                'key': snapshot.codes[i],
+                'stock_code': snapshot.codes[i],
+                'stock_name': snapshot.names[i],
+                'last_price': v[0],
+                'pct_change': None if np.isnan(pct[k]) else float(pct[k]),
+                'open': v[1],
+                'high': v[2],
+                'low': v[3],
+                'last_close': v[4],
+                'volume': v[5],
+                'amount': v[6],
+            })
+        return rows
+
+    @property
+    def row_count(self):
+        """当前看板标的数量"""
+        snapshot = self._snapshot
+        return len(snapshot.codes) if snapshot else 0
+
+    def get_changes(self, client_epoch=None, client_version=0):
+        """
+        获取客户端版本之后发生变化的行
+        返回: (epoch, version, is_full, rows)
+        - is_full 为 True 时 rows 为全量列表，否则为 [(行号, 行数据), ...]
+        """
+        self.ensure_started()
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None, 0, True, []
+
+        if client_epoch != snapshot.epoch:
+            indexes = np.arange(len(snapshot.codes))
+            return snapshot.epoch, snapshot.version, True, self._format_rows(snapshot, indexes)
+
+        indexes = np.flatnonzero(snapshot.row_versions > (client_version or 0))
+        rows = self._format_rows(snapshot, indexes)
+        return snapshot.epoch, snapshot.version, False, list(zip(indexes.tolist(), rows))
+
+
+# 全局单例
+quote_board = QuoteBoard()
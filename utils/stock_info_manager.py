@@ -1,12 +1,22 @@
+import atexit
 import json
+import os
+import time
+import threading
 from pathlib import Path
 from xtquant import xtdata
+from utils.instrument_master import instrument_master
 
 # 缓存文件路径
 BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / "data"
 CACHE_FILE = DATA_DIR / "stock_names.json"
 
+# 缓存变更后延迟写盘的间隔 (秒)，期间的多次变更合并为一次写入
+FLUSH_INTERVAL = 5.0
+# xtdata 查不到的代码在该时间内 (秒) 不再重复查询
+MISSING_TTL = 3600
+
 class StockInfoManager:
     _instance = None
     _cache = {}
@@ -14,63 +24,103 @@ class StockInfoManager:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(StockInfoManager, cls).__new__(cls)
+            # 保护 _cache / _missing / version 及写盘状态
+            cls._instance._lock = threading.Lock()
+            cls._instance._dirty = False
+            # 变更计数，写盘后据此判断写入期间是否又有新的变更
+            cls._instance._changes = 0
+            cls._instance._flush_timer = None
+            # 查询失败的代码 -> 失效时间 (monotonic)
+            cls._instance._missing = {}
+            # 映射版本号，内容变化 (新增/改名/重新加载) 时递增，供检索索引判断是否需要重建
+            cls._instance.version = 0
             cls._instance.load_cache()
         return cls._instance
 
     def load_cache(self):
         """加载本地缓存"""
+        cache = {}
         if CACHE_FILE.exists():
             try:
                 with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-                    self._cache = json.load(f)
+                    cache = json.load(f)
             except Exception as e:
                 print(f"【StockInfo】加载缓存失败: {e}")
-                self._cache = {}
-        else:
-            self._cache = {}
+        with self._lock:
+            self._cache = cache
+            self.version += 1
+
+    def get_names_snapshot(self):
+        """返回 (版本号, 代码 -> 名称 的副本)，二者一致"""
+        with self._lock:
+            return self.version, dict(self._cache)
 
     def save_cache(self):
-        """保存缓存到本地"""
+        """保存缓存到本地 (写入临时文件后原子替换，写入成功后才清除未保存标记)"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            data = dict(self._cache)
+            changes = self._changes
         try:
-            with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self._cache, f, ensure_ascii=False)
+            tmp_path = f"{CACHE_FILE}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, CACHE_FILE)
         except Exception as e:
+            # 保留未保存标记，下次变更或进程退出时重试
             print(f"【StockInfo】保存缓存失败: {e}")
+            return
+        with self._lock:
+            # 写入期间的新变更仍待下次写盘
+            if self._changes == changes:
+                self._dirty = False
+
+    def _mark_dirty(self):
+        """标记缓存已变更，FLUSH_INTERVAL 秒后统一写盘 (调用方须持有 _lock)"""
+        self._dirty = True
+        self._changes += 1
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(FLUSH_INTERVAL, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _put_name(self, stock_code, name):
+        """写入单个名称 (延迟批量写盘)"""
+        with self._lock:
+            self._cache[stock_code] = name
+            self._missing.pop(stock_code, None)
+            self.version += 1
+            self._mark_dirty()
+
+    def flush(self):
+        """有未写盘的变更时立即保存 (定时器与进程退出时调用)"""
+        if self._dirty:
+            self.save_cache()
 
     def refresh_mapping(self):
         """
         全量更新代码名称映射
-        从 xtdata 获取 沪深A股、ETF、可转债 等板块数据
+        刷新合约主数据 (沪深A股、ETF、可转债 等板块) 后同步名称
         """
         print("【StockInfo】开始更新证券代码映射...")
-        xtdata.enable_hello = False
-        # 定义需要获取的板块
-        target_sectors = [
-            '沪深A股', '沪深ETF', '沪深转债', '沪深指数', 
-            '北交所'
-        ]
-        
-        # 获取所有相关板块的成分股并去重
-        all_codes = set()
-        for sector in target_sectors:
-            try:
-                codes = xtdata.get_stock_list_in_sector(sector)
-                if codes:
-                    all_codes.update(codes)
-            except:
-                pass
-        
-        xtdata.download_history_contracts() # 下载已退市合约数据
-        # 批量获取合约信息 (xtdata 没有批量获取名称的简单接口，只能遍历 get_instrument_detail)
-        # 注意：如果有几千只股票，循环调用可能会慢，但这是纯本地操作(MiniQMT缓存)，通常很快
-        new_map = {}
-        for code in all_codes:
-            detail = xtdata.get_instrument_detail(code)
-            if detail and 'InstrumentName' in detail:
-                new_map[code] = detail['InstrumentName']
-        
-        # 更新内存和文件
-        self._cache.update(new_map)
+        instrument_master.refresh()
+        return self._sync_names()
+
+    def start_refresh_mapping(self):
+        """后台更新代码名称映射，立即返回 (进度见 instrument_master.get_progress)"""
+        return instrument_master.start_refresh(on_complete=self._sync_names)
+
+    def _sync_names(self):
+        """以合约主数据中的名称更新内存和文件"""
+        names = instrument_master.get_names()
+        with self._lock:
+            self._cache.update(names)
+            self.version += 1
+            self._missing.clear()
+            self._changes += 1
+            self._dirty = True
         self.save_cache()
         print(f"【StockInfo】更新完成，共收录 {len(self._cache)} 条证券信息")
         return len(self._cache)
@@ -78,22 +128,36 @@ class StockInfoManager:
     def get_stock_name(self, stock_code):
         """获取证券名称，如果缓存没有，尝试实时获取并更新"""
         # 1. 查缓存
-        if stock_code in self._cache:
-            return self._cache[stock_code]
+        name = self._cache.get(stock_code)
+        if name is not None:
+            return name
+
+        # 近期已确认查不到的代码直接返回
+        expire_at = self._missing.get(stock_code)
+        if expire_at is not None and time.monotonic() < expire_at:
+            return stock_code
         
-        # 2. 缓存未命中，尝试实时获取
+        # 2. 缓存未命中，先查合约主数据，再尝试实时获取
+        name = instrument_master.get_name(stock_code)
+        if name:
+            self._put_name(stock_code, name)
+            return name
         try:
             detail = xtdata.get_instrument_detail(stock_code)
             if detail and 'InstrumentName' in detail:
                 name = detail['InstrumentName']
-                # 更新缓存
-                self._cache[stock_code] = name
-                self.save_cache()
+                # 更新缓存 (延迟批量写盘)
+                self._put_name(stock_code, name)
                 return name
+            # 查询成功但无此合约，短期内不再重复查询
+            with self._lock:
+                self._missing[stock_code] = time.monotonic() + MISSING_TTL
         except:
             pass
-            
+
         return stock_code # 实在找不到，返回代码本身
 
 # 全局单例
-stock_info_manager = StockInfoManager()
\ No newline at end of file
+stock_info_manager = StockInfoManager()
+# 进程退出前写入尚未保存的变更
+atexit.register(stock_info_manager.flush)
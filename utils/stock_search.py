@@ -0,0 +1,169 @@
+import bisect
+import threading
+from utils.stock_info_manager import stock_info_manager
+
+# 拼音首字母检索为可选功能，请使用`pip install pypinyin`安装必要依赖
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:
+    lazy_pinyin = None
+
+# 前缀检索上界哨兵字符
+_PREFIX_SENTINEL = "\uffff"
+
+
+def _pinyin_initials(name):
+    """提取证券名称的拼音首字母 (如 贵州茅台 -> gzmt)"""
+    if lazy_pinyin is None or not name:
+        return ""
+    try:
+        return "".join(lazy_pinyin(name, style=Style.FIRST_LETTER, errors="default")).lower()
+    except Exception:
+        return ""
+
+
+class _SortedKeyIndex:
+    """有序数组前缀索引：keys 升序排列，ids 为对应的证券下标"""
+
+    __slots__ = ("keys", "ids")
+
+    def __init__(self, pairs):
+        pairs.sort()
+        self.keys = [k for k, _ in pairs]
+        self.ids = [i for _, i in pairs]
+
+    def prefix_range(self, prefix):
+        """返回前缀命中的证券下标 (惰性迭代，避免大范围切片拷贝)"""
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + _PREFIX_SENTINEL, lo)
+        return map(self.ids.__getitem__, range(lo, hi))
+
+
+class StockSearchIndex:
+    """
+    证券代码检索索引
+    基于 stock_info_manager 的 代码->名称 映射构建代码、名称、拼音首字母三组有序数组，
+    通过二分查找实现前缀匹配，单次检索为 O(log N + limit)
+    映射变化后在后台线程中重建，重建完成前继续使用旧索引，检索请求不等待重建
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(StockSearchIndex, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._snapshot = None
+            cls._instance._source_version = -1
+            cls._instance._rebuild_thread = None
+        return cls._instance
+
+    def _build(self, mapping):
+        """根据映射表构建索引快照"""
+        codes = sorted(mapping.keys())
+        names = [mapping[c] or c for c in codes]
+
+        code_pairs, name_pairs, pinyin_pairs = [], [], []
+        for i, (code, name) in enumerate(zip(codes, names)):
+            code_pairs.append((code.upper(), i))
+            name_pairs.append((name.lower(), i))
+            initials = _pinyin_initials(name)
+            if initials:
+                pinyin_pairs.append((initials, i))
+
+        # 检索优先级：代码 > 拼音首字母 > 名称
+        return (
+            codes,
+            names,
+            (
+                _SortedKeyIndex(code_pairs),
+                _SortedKeyIndex(pinyin_pairs),
+                _SortedKeyIndex(name_pairs),
+            ),
+        )
+
+    def _rebuild(self):
+        """按当前映射重建索引 (整体替换快照引用，检索端无需加锁)"""
+        # 版本号与映射副本在同一把锁下取得，二者一致
+        version, names = stock_info_manager.get_names_snapshot()
+        self._snapshot = self._build(names)
+        self._source_version = version
+
+    def _rebuild_loop(self):
+        # 重建期间映射再次变化时继续重建，多次变化合并为一次
+        while stock_info_manager.version != self._source_version:
+            try:
+                self._rebuild()
+            except Exception as e:
+                print(f"【证券检索】重建索引失败: {e}")
+                return
+
+    def _ensure_fresh(self):
+        """
+        返回可用的索引快照
+        首次使用时同步构建；之后映射版本变化 (新增/改名/重新加载) 时发起后台重建，本次仍返回旧快照
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            if stock_info_manager.version != self._source_version:
+                with self._lock:
+                    thread = self._rebuild_thread
+                    if thread is None or not thread.is_alive():
+                        self._rebuild_thread = threading.Thread(
+                            target=self._rebuild_loop, name='stock-search-rebuild', daemon=True
+                        )
+                        self._rebuild_thread.start()
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None:
+                self._rebuild()
+        return self._snapshot
+
+    def search(self, keyword, limit=20):
+        """
+        前缀检索证券
+        keyword: 代码 / 名称 / 拼音首字母前缀
+        返回: [(code, name), ...]
+        """
+        keyword = (keyword or "").strip()
+        if not keyword:
+            return []
+
+        codes, names, indexes = self._ensure_fresh()
+        keys = (keyword.upper(), keyword.lower(), keyword.lower())
+
+        seen = set()
+        result = []
+        for index, key in zip(indexes, keys):
+            for i in index.prefix_range(key):
+                if i in seen:
+                    continue
+                seen.add(i)
+                result.append((codes[i], names[i]))
+                if len(result) >= limit:
+                    return result
+        return result
+
+    @staticmethod
+    def format_option(code, name=None):
+        """生成下拉选项"""
+        name = name or stock_info_manager._cache.get(code) or code
+        return {"label": f"{name} ({code})", "value": code}
+
+    def search_options(self, keyword, limit=20):
+        """检索并返回可直接用于 AntdSelect 的选项列表"""
+        return [self.format_option(code, name) for code, name in self.search(keyword, limit)]
+
+    def select_options(self, keyword, current_value=None, limit=20):
+        """
+        证券代码下拉框的联想选项
+        保留当前已选标的，避免选项刷新后显示为原始代码
+        """
+        options = self.search_options(keyword, limit)
+        if current_value and all(o['value'] != current_value for o in options):
+            options.append(self.format_option(current_value))
+        return options
+
+
+# 全局单例
+stock_search_index = StockSearchIndex()
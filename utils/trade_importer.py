@@ -0,0 +1,276 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from peewee import chunked
+from xtquant import xtconstant
+
+from models.trade_models import TradeRecord, trade_db
+from utils.broker_statement import parse_statement_file, expand_statement_paths
+from utils.fee_calculator import FeeCalculator
+from utils.instrument_master import instrument_master
+from utils.stock_info_manager import stock_info_manager
+from utils.trade_persistence import trade_persistence
+from utils.position_engine import position_engine
+
+# 每次写入的成交条数
+IMPORT_CHUNK_SIZE = 20000
+
+# 代码前缀 -> 交易所后缀 (主数据中查不到时使用，按顺序匹配，未匹配的默认沪市)
+# 6/5 开头为沪市股票及ETF；0/3/1 开头为深市股票、ETF/LOF 及可转债；8/4 开头为北交所
+SUFFIX_RULES = (
+    (('6', '5'), '.SH'),
+    (('0', '3', '1'), '.SZ'),
+    (('8', '4'), '.BJ'),
+)
+
+# 指数板块 (同一数字代码存在多个市场时，优先选择非指数)
+_INDEX_SECTOR = '沪深指数'
+
+
+def _account_market(account):
+    """由股东账号推断市场：沪市账号以字母开头 (A/B/C...)，深市为数字"""
+    if not account:
+        return None
+    return 'SH' if account[0].isalpha() else 'SZ'
+
+
+def _resolve_code(number, market_hint):
+    """为单个不带后缀的代码选择交易所后缀"""
+    candidates = instrument_master.get_candidates(number)
+    if len(candidates) > 1:
+        # 多个市场同名：先按股东账号所属市场，再排除指数
+        hinted = [c for c in candidates if market_hint and c.endswith(f".{market_hint}")]
+        if len(hinted) == 1:
+            return hinted[0]
+        non_index = [c for c in (hinted or candidates) if not instrument_master.in_sector(c, _INDEX_SECTOR)]
+        if non_index:
+            return non_index[0]
+    if candidates:
+        return candidates[0]
+    for prefixes, suffix in SUFFIX_RULES:
+        if number.startswith(prefixes):
+            return f"{number}{suffix}"
+    return f"{number}.SH"  # 默认兜底
+
+
+def resolve_stock_codes(raw_codes, accounts=None):
+    """
+    为不带后缀的代码批量补全交易所后缀 (已带后缀的保持不变)
+    优先查合约主数据，同一数字代码存在多个市场时参考股东账号；按 (代码, 账号市场) 去重后逐个解析
+    """
+    codes = pd.Series(raw_codes, dtype=object).astype(str).str.strip().tolist()
+    markets = [_account_market(a) for a in accounts] if accounts is not None else [None] * len(codes)
+    index, unique_keys = pd.factorize(pd.Series(list(zip(codes, markets)), dtype=object), sort=False)
+    resolved = np.array(
+        [code if '.' in code else _resolve_code(code, market) for code, market in unique_keys],
+        dtype=object
+    )
+    return resolved[index]
+
+
+def build_traded_ids(frame, codes):
+    """
+    生成确定性的成交编号
+    - 有成交/合同编号时：[账号_]日期_代码_编号
+    - 否则：[账号_]日期_代码_价格_数量_方向，同一文件内完全相同的多笔成交追加出现序号 (_1, _2 ...)，
+      避免同日同价同量的成交互相覆盖；同一文件重复导入时序号不变
+    同时返回旧版编号 (不含账号与序号)，用于识别旧版导入过的成交
+    """
+    dates = frame['date'].tolist()
+    legacy = [
+        f"{d}_{c}_{p}_{v}_{s}"
+        for d, c, p, v, s in zip(dates, codes.tolist(), frame['price'].tolist(),
+                                 frame['volume'].tolist(), frame['side'].astype(int).tolist())
+    ]
+    accounts = frame['account'].tolist()
+    ordinal = pd.DataFrame({'account': accounts, 'key': legacy}).groupby(['account', 'key'], sort=False).cumcount()
+
+    traded_ids = []
+    legacy_ids = []
+    for account, contract, base, n, d, c in zip(accounts, frame['contract'].tolist(), legacy, ordinal.tolist(),
+                                                dates, codes.tolist()):
+        key = f"{d}_{c}_{contract}" if contract else (f"{base}_{n}" if n else base)
+        traded_ids.append(f"{account}_{key}" if account else key)
+        # 旧版导入只保留了每组的第一笔
+        legacy_ids.append(base if n == 0 else None)
+    return traded_ids, legacy_ids
+
+
+def prepare_statement(frame):
+    """
+    补全整份交割单的代码后缀并生成成交编号 (出现序号需在整份文件范围内计算，须在分块写入前完成)
+    返回增加 stock_code / traded_id / legacy_id 列的 DataFrame
+    """
+    frame = frame.reset_index(drop=True)
+    codes = resolve_stock_codes(frame['code'], frame['account'].tolist())
+    traded_ids, legacy_ids = build_traded_ids(frame, codes)
+    return frame.assign(stock_code=codes, traded_id=traded_ids, legacy_id=legacy_ids)
+
+
+def build_records(frame, batch_tag):
+    """prepare_statement 的结果 (可为其中一块) -> (TradeRecord 行字典列表, 旧版成交编号列表)"""
+    codes = frame['stock_code'].to_numpy()
+    side = frame['side'].to_numpy(dtype=np.int64)
+    volume = frame['volume'].to_numpy(dtype=np.float64)
+    price = frame['price'].to_numpy(dtype=np.float64)
+    amount = frame['amount'].to_numpy(dtype=np.float64)
+    dates = frame['date'].tolist()
+    traded_ids = frame['traded_id'].tolist()
+    fees = FeeCalculator.calculate_fees_batch(codes, price, volume, side, trade_dates=frame['date'].to_numpy())
+
+    # 名称按去重后的代码查询
+    code_index, unique_codes = pd.factorize(pd.Series(codes, dtype=object), sort=False)
+    names = np.array([stock_info_manager.get_stock_name(c) for c in unique_codes], dtype=object)[code_index]
+
+    # 交割单无成交时间时统一记为收盘时间 15:00
+    times = frame['time'].where(frame['time'] != '', '15:00:00')
+    trade_times = list(pd.to_datetime(frame['date'] + ' ' + times).dt.to_pydatetime())
+    order_type = np.where(side == 1, xtconstant.STOCK_BUY, xtconstant.STOCK_SELL)
+
+    records = []
+    for i, row in enumerate(frame['row'].tolist()):
+        records.append({
+            'traded_id': traded_ids[i],
+            'order_id': f"IMPORT_{batch_tag}_{row}",  # 虚拟订单ID
+            'stock_code': codes[i],
+            'stock_name': names[i],
+            'trade_time': trade_times[i],
+            'trade_date': dates[i],
+            'order_type': int(order_type[i]),
+            'direction': None,
+            'offset_flag': None,
+            'price': float(price[i]),
+            'volume': int(volume[i]),
+            'amount': float(amount[i]),
+            'commission': float(fees['commission'][i]),
+            'stamp_duty': float(fees['stamp_duty'][i]),
+            'other_fees': float(fees['other_fees'][i]),
+            'total_fees': float(fees['total_fees'][i]),
+            'side': int(side[i]),
+            'strategy_name': '手动下单',
+            'source': 'excel',
+            'remark': None,
+        })
+    return records, frame['legacy_id'].tolist()
+
+
+def _insert_new(records, legacy_ids):
+    """
+    写入尚不存在的成交 (运行于交易数据写线程)
+    先按成交编号 (及旧版编号) 批量查询已存在的记录，插入时再以 on_conflict_ignore 兜底
+    旧版编号不含账号，每条旧版记录只认领一笔成交并改写为带账号的新编号，
+    其他账号中相同的成交照常写入
+    """
+    keys = {r['traded_id'] for r in records} | {k for k in legacy_ids if k}
+    existing = set()
+    for batch in chunked(list(keys), 500):
+        existing.update(t for (t,) in TradeRecord.select(TradeRecord.traded_id)
+                        .where(TradeRecord.traded_id.in_(batch)).tuples())
+    claimed = {}
+    new_records = []
+    for r, legacy in zip(records, legacy_ids):
+        if r['traded_id'] in existing:
+            continue
+        if legacy in existing and legacy not in claimed:
+            claimed[legacy] = r['traded_id']
+            continue
+        new_records.append(r)
+    with trade_db.atomic():
+        for legacy, traded_id in claimed.items():
+            TradeRecord.update(traded_id=traded_id).where(TradeRecord.traded_id == legacy).execute()
+        # 使用 chunked 避免 SQL 语句过长
+        for batch in chunked(new_records, 100):
+            TradeRecord.insert_many(batch).on_conflict_ignore().execute()
+    return len(new_records)
+
+
+def _parse_all(files, broker, workers):
+    """
+    解析全部文件：多个文件时在进程池中并行解析，结果按文件顺序返回
+    逐个返回 (文件, 解析结果, 异常)，单个文件解析失败不影响其他文件
+    """
+    if len(files) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=min(len(files), workers or os.cpu_count() or 1)) as pool:
+            futures = [pool.submit(parse_statement_file, path, broker) for path in files]
+            for path, future in zip(files, futures):
+                try:
+                    yield path, future.result(), None
+                except Exception as e:
+                    yield path, None, e
+    else:
+        for path in files:
+            try:
+                yield path, parse_statement_file(path, broker), None
+            except Exception as e:
+                yield path, None, e
+
+
+def _import_frame(frame, batch_tag, seen):
+    """补全代码、计算费用并分块写入一份已解析的交割单，返回新增条数"""
+    inserted = 0
+    frame = prepare_statement(frame)
+    for start in range(0, len(frame), IMPORT_CHUNK_SIZE):
+        records, legacy_ids = build_records(frame.iloc[start:start + IMPORT_CHUNK_SIZE], batch_tag)
+        # 多个文件中重复出现的成交只保留第一条
+        keep = [i for i, r in enumerate(records) if r['traded_id'] not in seen]
+        seen.update(records[i]['traded_id'] for i in keep)
+        records = [records[i] for i in keep]
+        legacy_ids = [legacy_ids[i] for i in keep]
+        if records:
+            inserted += trade_persistence.run(lambda: _insert_new(records, legacy_ids))
+    return inserted
+
+
+def import_statements(paths, broker=None, workers=None, progress=None):
+    """
+    批量导入交割单 (可为多个文件/目录，可包含多个账户)
+    文件解析在进程池中并行进行，主进程负责补全代码后缀、批量计算费用与去重写入
+    broker: 券商格式 (configs.broker_config 中的键)，为空时按列名自动识别
+    progress(path, rows, inserted): 可选的进度回调
+    单个文件解析或写入失败时记录并跳过，继续导入其余文件
+    返回 {'files', 'rows', 'inserted', 'duplicates', 'invalid', 'skipped', 'failed'}
+    """
+    started = time.monotonic()
+    files = expand_statement_paths(paths)
+    batch_tag = int(time.time())
+    summary = {'files': 0, 'rows': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0, 'skipped': 0, 'failed': 0}
+    seen = set()
+
+    for file_no, (path, parsed, error) in enumerate(_parse_all(files, broker, workers)):
+        if error is None:
+            broker_key, frame, stats = parsed
+            try:
+                inserted = _import_frame(frame, f"{batch_tag}_{file_no}", seen)
+            except Exception as e:
+                error = e
+        if error is not None:
+            # 已写入的分块保留 (重复导入时按成交编号去重)，继续处理后续文件
+            summary['failed'] += 1
+            print(f"【交割单导入】{path.name} 导入失败: {error}")
+            continue
+
+        summary['files'] += 1
+        summary['rows'] += stats['rows']
+        summary['inserted'] += inserted
+        summary['duplicates'] += len(frame) - inserted
+        summary['invalid'] += stats['invalid']
+        summary['skipped'] += stats['skipped']
+        print(f"【交割单导入】{path.name} ({broker_key}): {stats['rows']} 行，新增 {inserted} 条，"
+              f"无法解析 {stats['invalid']} 行，跳过非成交 {stats['skipped']} 行")
+        if progress:
+            progress(path, summary['rows'], summary['inserted'])
+
+    # 导入的成交未经持仓引擎增量应用，下次读取时重新回放 (失败的文件可能已写入部分分块)
+    if summary['inserted'] or summary['failed']:
+        position_engine.invalidate()
+    print(f"【交割单导入】{summary['files']} 个文件，共 {summary['rows']} 行，新增 {summary['inserted']} 条，"
+          f"重复 {summary['duplicates']} 条，失败 {summary['failed']} 个文件，耗时 {time.monotonic() - started:.2f}s")
+    return summary
+
+
+def import_statement(path, broker=None, progress=None):
+    """导入单个交割单文件"""
+    return import_statements([path], broker=broker, workers=1,
+                             progress=(lambda _, rows, inserted: progress(rows, inserted)) if progress else None)
@@ -0,0 +1,201 @@
+import time
+import queue
+import atexit
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+
+from models.trade_models import trade_db
+
+# 写入事件 (入队后不再修改)
+# kind: 事件类型；payload: 事件数据；enqueued_at: 入队时间；future: 同步调用结果；key: 去重键
+WriteEvent = namedtuple('WriteEvent', ['kind', 'payload', 'enqueued_at', 'future', 'key'])
+
+# 函数调用类事件
+_CALL = '__call__'
+
+
+class TradePersistenceService:
+    """
+    交易数据持久化服务
+    由唯一的写线程负责 trade_db 的全部写入：
+    - XtQuant 回调线程只投递事件，不做任何数据库或查询操作
+    - 写线程每次取出队列中积压的全部事件，按类型交给处理函数，并在单个事务内提交
+    """
+
+    # 单批次最多处理的事件数
+    BATCH_SIZE = 1000
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pending_keys = set()
+        self._metrics = {
+            'enqueued': 0,
+            'processed': 0,
+            'errors': 0,
+            'batches': 0,
+            'last_batch_size': 0,
+            'last_lag_ms': 0.0,
+            'max_lag_ms': 0.0,
+            'last_commit_at': None,
+        }
+
+    def register_handler(self, kind, handle, recover=None, committed=None):
+        """
+        注册事件处理函数
+        handle(payloads): 在写线程的批次事务内处理同类事件
+        recover(payloads): 批次事务回滚后调用，用于恢复内存状态
+        committed(payloads): 批次事务提交后调用，用于确认随事务写入的内存状态
+        """
+        self._handlers[kind] = (handle, recover, committed)
+
+    def _put(self, event):
+        self._ensure_thread()
+        self._metrics['enqueued'] += 1
+        self._queue.put(event)
+
+    def submit(self, kind, payload):
+        """投递写入事件 (非阻塞)"""
+        self._put(WriteEvent(kind, payload, time.monotonic(), None, None))
+
+    def submit_call(self, fn, key=None):
+        """投递由写线程执行的函数 (非阻塞)，相同 key 的调用在执行前只保留一个"""
+        if key is not None:
+            with self._lock:
+                if key in self._pending_keys:
+                    return
+                self._pending_keys.add(key)
+        self._put(WriteEvent(_CALL, fn, time.monotonic(), None, key))
+
+    def run(self, fn):
+        """在写线程上执行函数并等待结果 (写线程内调用时直接执行)"""
+        if threading.current_thread() is self._thread:
+            return fn()
+        future = Future()
+        self._put(WriteEvent(_CALL, fn, time.monotonic(), future, None))
+        return future.result()
+
+    def get_metrics(self):
+        """队列深度与写入延迟指标"""
+        with self._queue.mutex:
+            depth = len(self._queue.queue)
+            oldest = self._queue.queue[0].enqueued_at if depth else None
+        metrics = dict(self._metrics)
+        metrics['queue_depth'] = depth
+        # 当前积压事件中最早一条已等待的时长
+        metrics['current_lag_ms'] = round((time.monotonic() - oldest) * 1000, 1) if oldest else 0.0
+        return metrics
+
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='trade-db-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # 取出当前积压的全部事件，写入繁忙时自然形成更大的批次
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch):
+        """按顺序处理批次：函数调用事件之前的写入事件先行提交"""
+        events = []
+        for event in batch:
+            if event.kind == _CALL:
+                self._commit(events)
+                events = []
+                self._execute(event)
+            else:
+                events.append(event)
+        self._commit(events)
+        self._metrics['last_batch_size'] = len(batch)
+
+    def _execute(self, event):
+        if event.key is not None:
+            with self._lock:
+                self._pending_keys.discard(event.key)
+        try:
+            result = event.payload()
+            if event.future is not None:
+                event.future.set_result(result)
+        except Exception as e:
+            self._metrics['errors'] += 1
+            if event.future is not None:
+                event.future.set_exception(e)
+            else:
+                print(f"【交易持久化】执行任务失败: {e}")
+        self._record(event.enqueued_at, 1)
+
+    def _commit(self, events):
+        """在单个事务内处理一组写入事件"""
+        if not events:
+            return
+        groups = {}
+        for event in events:
+            groups.setdefault(event.kind, []).append(event.payload)
+
+        try:
+            with trade_db.atomic():
+                for kind, payloads in groups.items():
+                    handler = self._handlers.get(kind)
+                    if handler is None:
+                        print(f"【交易持久化】未注册的事件类型: {kind}")
+                        continue
+                    handler[0](payloads)
+            self._metrics['batches'] += 1
+        except Exception as e:
+            self._metrics['errors'] += 1
+            print(f"【交易持久化】批量写入失败 ({len(events)} 条事件): {e}")
+            for kind, payloads in groups.items():
+                recover = self._handlers.get(kind, (None, None, None))[1]
+                if recover is not None:
+                    try:
+                        recover(payloads)
+                    except Exception as re:
+                        print(f"【交易持久化】恢复状态失败: {re}")
+        else:
+            for kind, payloads in groups.items():
+                committed = self._handlers.get(kind, (None, None, None))[2]
+                if committed is not None:
+                    try:
+                        committed(payloads)
+                    except Exception as ce:
+                        print(f"【交易持久化】确认状态失败: {ce}")
+        self._record(min(e.enqueued_at for e in events), len(events))
+
+    def _record(self, enqueued_at, count):
+        lag_ms = round((time.monotonic() - enqueued_at) * 1000, 1)
+        self._metrics['processed'] += count
+        self._metrics['last_lag_ms'] = lag_ms
+        self._metrics['max_lag_ms'] = max(self._metrics['max_lag_ms'], lag_ms)
+        self._metrics['last_commit_at'] = time.time()
+
+    def drain(self, timeout=5):
+        """等待当前已投递的事件处理完成 (用于进程退出前)"""
+        if not (self._thread and self._thread.is_alive()):
+            return
+        done = Future()
+        self._put(WriteEvent(_CALL, lambda: None, time.monotonic(), done, None))
+        try:
+            done.result(timeout=timeout)
+        except Exception:
+            pass
+
+
+# 全局单例
+trade_persistence = TradePersistenceService()
+
+# 进程退出前写入剩余事件
+atexit.register(trade_persistence.drain)
@@ -1,34 +1,152 @@
 import time
+import threading
 import pandas as pd
+from types import SimpleNamespace
 from datetime import datetime
 from xtquant import xtdata
 from xtquant.xttrader import XtQuantTrader, XtQuantTraderCallback
 from xtquant.xttype import StockAccount
 from xtquant import xtconstant
-from models.trade_models import TradeRecord, OrderRecord
+from models.trade_models import TradeRecord, OrderRecord, trade_db
 from utils.fee_calculator import FeeCalculator
 from utils.stock_info_manager import stock_info_manager
-from peewee import IntegrityError
+from utils.market_data_bus import market_data_bus
+from utils.fill_aggregator import fill_aggregator, trade_to_dict
+from utils.order_writer import order_writer
+from utils.trade_persistence import trade_persistence
+from utils.position_engine import position_engine
+from peewee import IntegrityError, chunked
 from configs.settings import GLOBAL_SECRETS
 
+# 委托快照需要复制的 XtOrder 字段
+ORDER_FIELDS = (
+    'order_id', 'stock_code', 'order_time', 'order_type', 'direction', 'offset_flag',
+    'price_type', 'order_volume', 'price', 'traded_volume', 'traded_price',
+    'order_status', 'status_msg', 'strategy_name', 'order_remark'
+)
+
+class _InflightRequest:
+    """进行中的行情请求，供并发的相同请求等待复用结果"""
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
 class XtManager:
     _instance = None
     
     # 配置
     MINI_QMT_PATH = GLOBAL_SECRETS.get("MINI_QMT_PATH", "")
     ACCOUNT_ID = GLOBAL_SECRETS.get("ACCOUNT_ID", "")
+
+    # 行情缓存有效期 (秒)，周期越短数据变化越快，有效期越短
+    MARKET_DATA_TTL = {
+        'tick': 1, '1m': 3, '5m': 10, '15m': 20, '30m': 30,
+        '1h': 60, '1d': 30, '1w': 300, '1mon': 600
+    }
+    MARKET_DATA_DEFAULT_TTL = 10
+    # 行情缓存最大条目数
+    MARKET_DATA_CACHE_SIZE = 512
+    # 等待进行中请求的最长时间 (秒)
+    MARKET_DATA_WAIT_TIMEOUT = 30
+    
+    # 交易接口就绪状态
+    STATE_IDLE = 'idle'                  # 尚未启动
+    STATE_UNCONFIGURED = 'unconfigured'  # 未配置路径或账号
+    STATE_CONNECTING = 'connecting'      # 正在连接
+    STATE_SYNCING = 'syncing'            # 已连接，正在同步当日成交/委托
+    STATE_READY = 'ready'                # 就绪
+    STATE_FAILED = 'failed'              # 连接失败
+    STATE_LABELS = {
+        STATE_IDLE: '未启动',
+        STATE_UNCONFIGURED: '未配置',
+        STATE_CONNECTING: '连接中',
+        STATE_SYNCING: '同步中',
+        STATE_READY: '已就绪',
+        STATE_FAILED: '连接失败',
+    }
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(XtManager, cls).__new__(cls)
-            cls._instance.init_trader()
+            cls._instance._market_lock = threading.Lock()
+            cls._instance._market_cache = {}     # (code, period, count) -> (过期时间, DataFrame)
+            cls._instance._market_inflight = {}  # (code, period, count) -> _InflightRequest
+            # 交易接口延迟到 start() 时在后台初始化，导入本模块不会连接 QMT
+            cls._instance.trader = None
+            cls._instance.acc = None
+            cls._instance._init_lock = threading.Lock()
+            cls._instance._init_start_lock = threading.Lock()
+            cls._instance._init_thread = None
+            cls._instance._set_state(cls.STATE_IDLE, "交易接口尚未启动")
+            # 成交/委托推送统一交由持久化服务的写线程批量落库
+            trade_persistence.register_handler(
+                'trade', cls._instance._handle_trade_events, cls._instance._recover_trade_events
+            )
+            trade_persistence.register_handler(
+                'order', cls._instance._handle_order_events, order_writer.rollback, order_writer.commit
+            )
         return cls._instance
 
+    def _set_state(self, state, message):
+        self.state = state
+        self.state_message = message
+        self.state_since = datetime.now()
+
+    @property
+    def is_ready(self):
+        return self.state == self.STATE_READY and self.trader is not None
+
+    def get_status(self):
+        """交易接口就绪状态 (供界面展示)"""
+        return {
+            'state': self.state,
+            'label': self.STATE_LABELS.get(self.state, self.state),
+            'message': self.state_message,
+            'since': self.state_since.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def start(self, on_done=None):
+        """
+        在后台线程中初始化交易接口 (已在初始化中时直接返回 False)
+        on_done(): 本次初始化结束 (无论成功与否) 后在初始化线程中调用
+        """
+        with self._init_start_lock:
+            if self._init_thread and self._init_thread.is_alive():
+                return False
+            # 先标记为连接中，调用方立即读取状态时不会误判为连接失败
+            self._set_state(self.STATE_CONNECTING, "正在连接 MiniQMT")
+
+            def target():
+                try:
+                    self.init_trader()
+                finally:
+                    if on_done:
+                        on_done()
+
+            self._init_thread = threading.Thread(target=target, name='xt-trader-init', daemon=True)
+            self._init_thread.start()
+        return True
+
     def init_trader(self):
+        """连接 MiniQMT 并同步当日成交/委托 (同一时刻只允许一个初始化过程)"""
+        if not self._init_lock.acquire(blocking=False):
+            print("【XtQuant】交易接口正在初始化，跳过本次请求")
+            return
+        try:
+            self._init_trader()
+        finally:
+            self._init_lock.release()
+
+    def _init_trader(self):
         if not self.MINI_QMT_PATH or not self.ACCOUNT_ID:
             print("【错误】未配置 QMT 路径或账号，请检查 secrets/config.json")
             self.trader = None
+            self._set_state(self.STATE_UNCONFIGURED, "未配置 QMT 路径或账号")
             return
+        self._set_state(self.STATE_CONNECTING, "正在连接 MiniQMT")
         try:
             session_id = int(time.time())
             self.trader = XtQuantTrader(self.MINI_QMT_PATH, session_id)
@@ -44,9 +162,7 @@ class XtManager:
                 self.acc = StockAccount(self.ACCOUNT_ID)
                 print("MiniQMT 连接成功")
                 self.trader.subscribe(self.acc)
-
-                if not stock_info_manager._cache:
-                    stock_info_manager.refresh_mapping()
+                self._set_state(self.STATE_SYNCING, "正在同步当日成交与委托")
 
                 # 1. 同步成交 (合并模式)
                 print("正在自动同步当日成交...")
@@ -57,12 +173,19 @@ class XtManager:
                 o_count = self.sync_orders()
                 
                 print(f"启动同步完成: 成交(合并后)+{t_count}, 委托+{o_count}")
+                self._set_state(self.STATE_READY, "连接正常")
+
+                # 3. 证券名称映射为空时补充全量映射 (不影响交易接口就绪)
+                if not stock_info_manager._cache:
+                    stock_info_manager.refresh_mapping()
             else:
                 print(f"MiniQMT 连接失败: {res}")
                 self.trader = None
+                self._set_state(self.STATE_FAILED, f"连接失败，错误码 {res}")
         except Exception as e:
             print(f"初始化交易接口失败: {e}")
             self.trader = None
+            self._set_state(self.STATE_FAILED, f"初始化失败: {e}")
 
     def _calc_side(self, order_type, direction, offset_flag):
         """计算交易方向系数"""
@@ -78,188 +201,309 @@ class XtManager:
             
         return 0
 
+    def _build_trade_record(self, merged):
+        """将合并成交转换为 TradeRecord 行数据 (含费用重算)"""
+        total_volume = merged['volume']
+        total_amount = merged['amount']
+        avg_price = total_amount / total_volume
+
+        side = self._calc_side(merged['order_type'], merged['direction'], merged['offset_flag'])
+        dt = datetime.fromtimestamp(merged['last_time'])
+        fees = FeeCalculator.calculate_all_fees(
+            merged['stock_code'], avg_price, total_volume, side, trade_date=dt.strftime('%Y-%m-%d')
+        )
+
+        return {
+            'traded_id': merged['primary_traded_id'],
+            'order_id': merged['order_id'],
+            'stock_code': merged['stock_code'],
+            'stock_name': stock_info_manager.get_stock_name(merged['stock_code']),
+            'trade_time': dt,
+            'trade_date': dt.strftime('%Y-%m-%d'),
+
+            'order_type': merged['order_type'],
+            'direction': merged['direction'],
+            'offset_flag': merged['offset_flag'],
+
+            'price': avg_price,           # 加权均价
+            'volume': int(total_volume),  # 累积总量
+            'amount': total_amount,       # 累积总额
+
+            'side': side,
+            'strategy_name': merged['strategy_name'] if merged['strategy_name'] else '手动下单',
+            'source': 'auto',
+            'remark': merged['order_remark'],
+
+            'commission': fees['commission'],
+            'stamp_duty': fees['stamp_duty'],
+            'other_fees': fees['other_fees'],
+            'total_fees': fees['total_fees']
+        }
+
+    def _save_merged_trades(self, merged_list, stale_ids=()):
+        """
+        批量写入合并成交 (单个事务)
+        merged_list: 合并结果列表 (见 FillAggregator.to_merged)
+        stale_ids: 需要清理的旧分笔/旧主记录 traded_id
+        """
+        records = [self._build_trade_record(m) for m in merged_list if m['volume']]
+        stale_ids = list(stale_ids)
+        if not records and not stale_ids: return 0
+
+        with trade_db.atomic():
+            # 清理旧数据：删除已被合并的分笔记录，只保留合并后的主记录
+            for batch in chunked(stale_ids, 500):
+                TradeRecord.delete().where(TradeRecord.traded_id.in_(batch)).execute()
+            # 更新或插入：以 traded_id 唯一索引冲突替换
+            for batch in chunked(records, 100):
+                TradeRecord.insert_many(batch).on_conflict_replace().execute()
+            # 按委托增量更新持仓
+            position_engine.apply_records(records)
+        return len(records)
+
+    def _recover_trade_events(self, fills):
+        """成交批次回滚后清空内存状态，本批成交暂存后排队全量对账重建"""
+        fill_aggregator.clear()
+        fill_aggregator.defer(fills)
+        position_engine.invalidate()
+        trade_persistence.submit_call(self.sync_trades, key='reconcile_trades')
+
+    def _handle_trade_events(self, fills):
+        """
+        处理一批成交推送 (运行于写线程的批次事务内)
+        逐笔增量聚合，同一委托在批次内只写入最终的合并结果
+        """
+        # 当日尚未完成全量对账：暂存推送，由排队中的对账任务与查询结果一并合并
+        if not fill_aggregator.seeded:
+            count = fill_aggregator.defer(fills)
+            print(f"【XtQuant】成交聚合器未初始化，暂存 {len(fills)} 笔推送成交 (共 {count} 笔待对账)")
+            return
+
+        merged_by_order = {}
+        stale_ids = []
+        for fill in fills:
+            result = fill_aggregator.apply(fill)
+            if result is None:
+                print(f"【XtQuant】重复成交推送已忽略: {fill['traded_id']}")
+                continue
+            merged, stale = result
+            merged_by_order[merged['order_id']] = merged
+            stale_ids.extend(stale)
+        self._save_merged_trades(list(merged_by_order.values()), stale_ids)
+
     def _process_merge_and_save(self, trade_list):
         """
         【核心逻辑】接收原始成交列表，按 order_id 合并后入库
         解决：分笔成交合并、去重、费用重算
+        所有委托一次性分组聚合，并在单个事务内完成删除与写入
         """
         if not trade_list: return 0
         
-        # 1. 手动提取对象属性 (修复 __dict__ 报错)
-        data = []
-        for t in trade_list:
-            if isinstance(t, dict):
-                d = t
-            else:
-                d = {
-                    'traded_id': str(t.traded_id),
-                    'order_id': str(t.order_id),
-                    'stock_code': t.stock_code,
-                    'traded_time': t.traded_time,
-                    'order_type': t.order_type,
-                    'direction': t.direction,
-                    'offset_flag': t.offset_flag,
-                    'traded_price': t.traded_price,
-                    'traded_volume': t.traded_volume,
-                    'traded_amount': t.traded_amount,
-                    'strategy_name': t.strategy_name,
-                    'order_remark': t.order_remark
-                }
-            data.append(d)
-            
-        df = pd.DataFrame(data)
+        # 1. 提取对象属性 (修复 __dict__ 报错)
+        df = pd.DataFrame([trade_to_dict(t) for t in trade_list])
         if df.empty: return 0
-        
-        count = 0
-        
-        # 2. 按 order_id 分组聚合
-        for order_id, group in df.groupby('order_id'):
-            try:
-                # --- 聚合计算 ---
-                total_volume = group['traded_volume'].sum()
-                total_amount = group['traded_amount'].sum()
-                
-                if total_volume == 0: continue
-                
-                avg_price = total_amount / total_volume
-                
-                # --- 确定主记录信息 ---
-                # 按时间排序：取最早的一笔作为“身份标识”（traded_id），取最新的一笔作为“更新时间”
-                group = group.sort_values('traded_time') 
-                first = group.iloc[0] 
-                last = group.iloc[-1] 
-                
-                primary_traded_id = first['traded_id'] # 始终锁定第一笔的ID为主键，保证ID稳定
-                
-                # --- 3. 清理旧数据 (关键) ---
-                # 这一步保证：如果之前存过分笔记录(非主ID)，把它们删掉，只保留合并后的主记录
-                all_ids = group['traded_id'].tolist()
-                ids_to_delete = [tid for tid in all_ids if tid != primary_traded_id]
-                
-                if ids_to_delete:
-                    TradeRecord.delete().where(TradeRecord.traded_id.in_(ids_to_delete)).execute()
-                
-                # --- 4. 费用重算 ---
-                side = self._calc_side(first['order_type'], first['direction'], first['offset_flag'])
-                fees = FeeCalculator.calculate_all_fees(first['stock_code'], avg_price, total_volume, side)
-                
-                stock_name = stock_info_manager.get_stock_name(first['stock_code'])
-                dt = datetime.fromtimestamp(last['traded_time']) 
-                
-                strategy = first['strategy_name'] if first['strategy_name'] else '手动下单'
-
-                # --- 5. 更新或插入 (Replace) ---
-                # 无论数据库里有没有，都直接覆盖。
-                # 如果是新单子 -> Insert
-                # 如果是旧单子更新 -> Update
-                TradeRecord.replace(
-                    traded_id=primary_traded_id,
-                    order_id=order_id,
-                    stock_code=first['stock_code'],
-                    stock_name=stock_name,
-                    trade_time=dt,
-                    trade_date=dt.strftime('%Y-%m-%d'),
-                    
-                    order_type=first['order_type'],
-                    direction=first['direction'],
-                    offset_flag=first['offset_flag'],
-                    
-                    price=avg_price,          # 加权均价
-                    volume=int(total_volume), # 累积总量
-                    amount=total_amount,      # 累积总额
-                    
-                    side=side,
-                    strategy_name=strategy,
-                    source='auto',
-                    remark=first['order_remark'],
-                    
-                    commission=fees['commission'],
-                    stamp_duty=fees['stamp_duty'],
-                    other_fees=fees['other_fees'],
-                    total_fees=fees['total_fees']
-                ).execute()
-                
-                count += 1
-            except Exception as e:
-                print(f"合并入库失败 OrderID={order_id}: {e}")
-                
-        return count
+
+        # 2. 去重后按时间稳定排序：每组首行即最早一笔 (身份标识)，末行即最新一笔 (更新时间)
+        df = df.drop_duplicates('traded_id').sort_values('traded_time', kind='stable')
+        grouped = df.groupby('order_id', sort=False)
+
+        # 3. 向量化聚合：首笔身份信息 + 成交量/额求和 + 最新成交时间
+        identity_cols = ['order_id', 'traded_id', 'stock_code', 'order_type', 'direction',
+                         'offset_flag', 'strategy_name', 'order_remark']
+        merged = grouped.head(1)[identity_cols].set_index('order_id')
+        merged = merged.join(grouped.agg(
+            volume=('traded_volume', 'sum'),
+            amount=('traded_amount', 'sum'),
+            last_time=('traded_time', 'max'),
+        ))
+        merged = merged[merged['volume'] != 0]
+        merged = merged.rename(columns={'traded_id': 'primary_traded_id'}).reset_index()
+
+        # 4. 始终锁定第一笔的ID为主键，其余分笔ID统一批量删除
+        kept = df[df['order_id'].isin(merged['order_id'])]
+        stale_ids = kept.loc[~kept['traded_id'].isin(merged['primary_traded_id']), 'traded_id'].tolist()
+
+        merged_list = [
+            {k: (v.item() if hasattr(v, 'item') else v) for k, v in row.items()}
+            for row in merged.to_dict('records')
+        ]
+        try:
+            return self._save_merged_trades(merged_list, stale_ids)
+        except Exception as e:
+            # 聚合状态作废，本次成交暂存后由下一次对账重新写入
+            print(f"合并入库失败 (共 {len(merged_list)} 笔委托)，待下次对账重新写入: {e}")
+            fill_aggregator.clear()
+            fill_aggregator.defer(trade_list)
+            position_engine.invalidate()
+            return 0
 
     def sync_trades(self):
-        """同步当日成交"""
+        """
+        同步当日成交 (全量对账，同时重建分笔成交聚合状态)
+        查询与重建都在写线程上执行：对账期间到达的推送排在其后增量应用，不会被较早的查询结果覆盖
+        """
         if not self.trader: return 0
-        trades = self.trader.query_stock_trades(self.acc)
-        if not trades: return 0
-        return self._process_merge_and_save(trades)
+
+        def reconcile():
+            try:
+                trades = self.trader.query_stock_trades(self.acc)
+            except Exception as e:
+                # 暂存的推送成交保留到下一次对账
+                print(f"【XtQuant】成交对账查询失败，{fill_aggregator.pending_count} 笔推送成交待下次对账: {e}")
+                raise
+            # 查询结果可能尚未包含对账前暂存的推送 (首笔成交可能查不到)，一并合并，重复的按 traded_id 去重
+            all_trades = list(trades or []) + fill_aggregator.take_pending()
+            fill_aggregator.reset(all_trades)
+            if not all_trades: return 0
+            return self._process_merge_and_save(all_trades)
+
+        return trade_persistence.run(reconcile)
     
+    @staticmethod
+    def _snapshot_order(o):
+        """复制 XtOrder 的字段，生成与回调对象无关的只读快照"""
+        return SimpleNamespace(**{f: getattr(o, f) for f in ORDER_FIELDS})
+
+    def _build_order_record(self, o):
+        """将委托对象 (XtOrder 或其快照) 转换为 OrderRecord 行数据"""
+        side = self._calc_side(o.order_type, o.direction, o.offset_flag)
+        strategy_name = o.strategy_name if o.strategy_name else '手动下单'
+        dt = datetime.fromtimestamp(o.order_time)
+        return {
+            'order_id': str(o.order_id),
+            'stock_code': o.stock_code,
+            'stock_name': stock_info_manager.get_stock_name(o.stock_code),
+            'order_time': dt,
+            'order_date': dt.strftime('%Y-%m-%d'),
+            'order_type': o.order_type,
+            'direction': o.direction,
+            'offset_flag': o.offset_flag,
+            'price_type': o.price_type,
+            'order_volume': o.order_volume,
+            'price': o.price,
+            'traded_volume': o.traded_volume,
+            'traded_price': o.traded_price,
+            'order_status': o.order_status,
+            'status_msg': o.status_msg,
+            'side': side,
+            'strategy_name': strategy_name,
+            'order_remark': o.order_remark,
+            'source': 'auto'
+        }
+
     def sync_orders(self):
-        """同步当日委托"""
+        """同步当日委托 (仅写入有变化的委托，单个事务批量提交)"""
         if not self.trader: return 0
         orders = self.trader.query_stock_orders(self.acc, cancelable_only=False)
         if not orders: return 0
         
-        count = 0
+        records = []
         for o in orders:
             try:
-                side = self._calc_side(o.order_type, o.direction, o.offset_flag)
-                strategy_name = o.strategy_name if o.strategy_name else '手动下单'
-                name = stock_info_manager.get_stock_name(o.stock_code)
-                dt = datetime.fromtimestamp(o.order_time)
-                
-                OrderRecord.replace(
-                    order_id=str(o.order_id),
-                    stock_code=o.stock_code,
-                    stock_name=name,
-                    order_time=dt,
-                    order_date=dt.strftime('%Y-%m-%d'),
-                    order_type=o.order_type,
-                    direction=o.direction,
-                    offset_flag=o.offset_flag,
-                    price_type=o.price_type,
-                    order_volume=o.order_volume,
-                    price=o.price,
-                    traded_volume=o.traded_volume,
-                    traded_price=o.traded_price,
-                    order_status=o.order_status,
-                    status_msg=o.status_msg,
-                    side=side,
-                    strategy_name=strategy_name,
-                    order_remark=o.order_remark,
-                    source='auto'
-                ).execute()
-                count += 1
+                records.append(self._build_order_record(o))
             except Exception as e:
                 print(f"同步单条委托失败: {e}")
+        try:
+            return trade_persistence.run(lambda: self._save_order_records(records))
+        except Exception as e:
+            print(f"同步委托批量写入失败: {e}")
+            return 0
+
+    def _save_order_records(self, records):
+        """在单个事务内写入有变化的委托 (运行于写线程)"""
+        try:
+            with trade_db.atomic():
+                count = order_writer.save(records)
+        except Exception:
+            order_writer.rollback()
+            raise
+        order_writer.commit()
         return count
+
+    def _handle_order_events(self, orders):
+        """处理一批委托推送 (运行于写线程的批次事务内)"""
+        records = [self._build_order_record(o) for o in orders]
+        order_writer.save(records)
     
-    def check_connection(self):
-        if not self.trader:
-            self.init_trader()
-            return (True, "重新初始化成功") if self.trader else (False, "初始化失败")
+    def check_connection(self, on_reconnected=None):
+        """
+        探测连接状态，断开时在后台线程中重连并立即返回 (由 QMT 健康监测线程调用)
+        on_reconnected(): 后台重连结束后调用
+        """
+        # 初始化进行中：直接返回当前状态，不重复发起连接
+        if self.state in (self.STATE_CONNECTING, self.STATE_SYNCING):
+            return False, self.state_message
 
         try:
-            if self.trader.connect() == 0:
+            if self.trader and self.trader.connect() == 0:
                 return True, "连接正常"
-            self.init_trader()
-            return (True, "自动重连成功") if self.trader and self.trader.connect() == 0 else (False, "自动重连失败")
         except Exception as e:
-            return False, f"检测异常: {str(e)}"
+            print(f"【XtQuant】连接检测异常: {e}")
+        self.start(on_done=on_reconnected)
+        return False, self.state_message
 
-    def get_market_data(self, stock_code, period='1d', count=200):
+    def _fetch_market_data(self, stock_code, period, count):
+        """直接向 xtdata 请求行情"""
         data = xtdata.get_market_data_ex(stock_list=[stock_code], period=period, count=count).get(stock_code)
         if data is None or data.empty: return pd.DataFrame()
         df = data.reset_index()
         if 'time' not in df.columns and 'index' in df.columns:
             df.rename(columns={'index': 'time'}, inplace=True)
         return df
-    
-    def subscribe(self, stock_code, period='1d'):
+
+    def get_market_data(self, stock_code, period='1d', count=200):
+        """
+        获取K线行情 (带缓存)
+        - 按 (code, period, count) 缓存，有效期随周期变化
+        - 并发的相同请求只会触发一次 xtdata 调用，其余请求等待复用结果
+        注意：返回的 DataFrame 为共享对象，调用方不应原地修改
+        """
+        key = (stock_code, period, count)
+        ttl = self.MARKET_DATA_TTL.get(period, self.MARKET_DATA_DEFAULT_TTL)
+
+        with self._market_lock:
+            entry = self._market_cache.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            inflight = self._market_inflight.get(key)
+            is_leader = inflight is None
+            if is_leader:
+                inflight = self._market_inflight[key] = _InflightRequest()
+
+        # 已有相同请求在途：等待其结果
+        if not is_leader:
+            if not inflight.event.wait(self.MARKET_DATA_WAIT_TIMEOUT):
+                return self._fetch_market_data(stock_code, period, count)
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.result
+
         try:
-            xtdata.subscribe_quote(stock_code, period=period, count=0)
-            return True
+            df = self._fetch_market_data(stock_code, period, count)
+            inflight.result = df
+            with self._market_lock:
+                now = time.monotonic()
+                # 超出容量时先清理过期条目，仍超出则整体清空
+                if len(self._market_cache) >= self.MARKET_DATA_CACHE_SIZE:
+                    self._market_cache = {k: v for k, v in self._market_cache.items() if v[0] > now}
+                    if len(self._market_cache) >= self.MARKET_DATA_CACHE_SIZE:
+                        self._market_cache.clear()
+                self._market_cache[key] = (now + ttl, df)
+            return df
         except Exception as e:
-            print(f"订阅失败 {stock_code}: {e}")
-            return False
+            inflight.error = e
+            raise
+        finally:
+            with self._market_lock:
+                self._market_inflight.pop(key, None)
+            inflight.event.set()
+    
+    def subscribe(self, stock_code, period='1d', consumer=None):
+        """经由行情总线订阅，同一 (code, period) 在进程内只订阅一次"""
+        return market_data_bus.subscribe(stock_code, period, consumer)
+
+    def unsubscribe(self, stock_code, period='1d', consumer=None):
+        market_data_bus.unsubscribe(stock_code, period, consumer)
 
 # --- 回调类定义 ---
 class MyTraderCallback(XtQuantTraderCallback):
@@ -268,7 +512,7 @@ class MyTraderCallback(XtQuantTraderCallback):
 
     def on_stock_trade(self, trade):
         """
-        实时成交推送 (合并逻辑)
+        实时成交推送：仅复制字段并投递事件，合并与落库由写线程完成
         """
         try:
             print(f"【XtQuant】收到成交推送: {trade.stock_code} ({trade.traded_volume}股)")
@@ -276,27 +520,12 @@ class MyTraderCallback(XtQuantTraderCallback):
             manager = XtManager()
             if not manager.trader: return
 
-            # 1. 核心策略：收到推送后，不直接只处理这一笔，而是去查询该委托的“全家桶”
-            #    这样无论是第1笔还是第N笔，我们都能拿到当前状态的所有分笔
-            all_trades = manager.trader.query_stock_trades(manager.acc)
-            
-            related_trades = []
-            target_order_id = str(trade.order_id) # 统一转字符串
-            
-            if all_trades:
-                # 过滤出该 OrderID 的所有成交
-                related_trades = [t for t in all_trades if str(t.order_id) == target_order_id]
-            
-            # 2. 兜底处理：如果 query 结果里没有当前这笔（极低概率，如QMT还没来得及更新缓存）
-            #    我们手动把当前推送的 trade 加进去，确保不会漏单
-            #    这也是解决“首笔交易可能查不到”的关键
-            known_ids = set(str(t.traded_id) for t in related_trades)
-            if str(trade.traded_id) not in known_ids:
-                print("【注意】查询列表未包含当前推送，手动追加")
-                related_trades.append(trade)
-                
-            # 3. 统一合并入库
-            manager._process_merge_and_save(related_trades)
+            # 当日尚未完成全量对账 (启动同步失败或跨交易日)：先排队一次全量对账
+            if not fill_aggregator.seeded:
+                print("【注意】成交聚合器未初始化，排队执行全量对账")
+                trade_persistence.submit_call(manager.sync_trades, key='reconcile_trades')
+
+            trade_persistence.submit('trade', trade_to_dict(trade))
             
         except Exception as e:
             print(f"【XtQuant】处理成交推送失败: {e}")
@@ -305,34 +534,9 @@ class MyTraderCallback(XtQuantTraderCallback):
     
     def on_stock_order(self, order):
         try:
-            manager = XtManager()
-            side = manager._calc_side(order.order_type, order.direction, order.offset_flag)
-            strategy_name = order.strategy_name if order.strategy_name else '手动下单'
-            name = stock_info_manager.get_stock_name(order.stock_code)
-            dt = datetime.fromtimestamp(order.order_time)
-            
-            OrderRecord.replace(
-                order_id=str(order.order_id),
-                stock_code=order.stock_code,
-                stock_name=name,
-                order_time=dt,
-                order_date=dt.strftime('%Y-%m-%d'),
-                order_type=order.order_type,
-                direction=order.direction,
-                offset_flag=order.offset_flag,
-                price_type=order.price_type,
-                order_volume=order.order_volume,
-                price=order.price,
-                traded_volume=order.traded_volume,
-                traded_price=order.traded_price,
-                order_status=order.order_status,
-                status_msg=order.status_msg,
-                side=side,
-                strategy_name=strategy_name,
-                order_remark=order.order_remark,
-                source='auto'
-            ).execute()
+            # 状态变化检测与批量落库均由写线程完成
+            trade_persistence.submit('order', XtManager._snapshot_order(order))
         except Exception as e:
-            print(f"【XtQuant】更新委托记录失败: {e}")
+            print(f"【XtQuant】投递委托推送失败: {e}")
 
 xt_manager = XtManager()
\ No newline at end of file
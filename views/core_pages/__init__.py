@@ -155,7 +155,20 @@ def render(current_user_access_rule: str, current_pathname: str = None):
                                 id="core-update-stock-list-btn", 
                                 type="default", 
                                 loadingChildren="更新中..."
-                            )
+                            ),
+                            # 后台更新进度
+                            fac.AntdProgress(
+                                id="core-update-stock-list-progress",
+                                percent=0,
+                                size="small",
+                                style={"display": "none"},
+                            ),
+                            fac.AntdText(id="core-update-stock-list-status", type="secondary"),
+                            dcc.Interval(
+                                id="core-update-stock-list-interval",
+                                interval=1000,
+                                disabled=True,
+                            ),
                         ],
                         direction="vertical",
                         style={'width': '100%'}
@@ -9,6 +9,21 @@ def render():
         [
             dcc.Store(id='fee-edit-target-store'),
             fac.AntdBreadcrumb(items=[{"title": "量化平台"}, {"title": "费率管理"}]),
+
+            # 费率版本选择
+            fac.AntdSpace(
+                [
+                    fac.AntdText("费率版本："),
+                    fac.AntdSelect(
+                        id='fee-schedule-select',
+                        options=[],
+                        allowClear=False,
+                        placeholder='当前生效版本',
+                        style={'width': 200},
+                    ),
+                    fac.AntdText("编辑时修改生效日期即可新增版本", type='secondary'),
+                ]
+            ),
             
 
             # 费率展示表格
@@ -50,7 +65,14 @@ def render():
                         layout='vertical',
                         enableBatchControl=True,
                         children=[
-                            
+                            fac.AntdFormItem(
+                                fac.AntdDatePicker(
+                                    id='edit-effective-from',
+                                    allowClear=False,
+                                    style={'width': '100%'}
+                                ),
+                                label='生效日期 (不同于当前版本时新增版本)'
+                            ),
                             fac.AntdFormItem(
                                 fac.AntdInputNumber(
                                     id='edit-rate', 
@@ -85,7 +107,20 @@ def render():
                         ]
                     )
                 ]
-            )
+            ),
+
+            # 历史成交费用重算
+            fac.AntdCard(
+                fac.AntdSpace(
+                    [
+                        fac.AntdDateRangePicker(id='fee-recompute-range', placeholder=['起始日期', '结束日期']),
+                        fac.AntdButton("按适用费率重算成交费用", id='fee-recompute-btn', type='primary'),
+                        fac.AntdText(id='fee-recompute-result', type='secondary'),
+                    ]
+                ),
+                title='历史费用重算',
+                size='small',
+            ),
         ],
         direction="vertical",
         style=style(width="100%"),
@@ -1,6 +1,10 @@
 import feffery_antd_components as fac
 import feffery_utils_components as fuc
 from feffery_dash_utils.style_utils import style
+from utils.stock_search import stock_search_index
+
+# 默认展示标的
+DEFAULT_STOCK_CODE = '600519.SH'
 
 def render():
     return fac.AntdSpace(
@@ -11,15 +15,14 @@ def render():
                     fac.AntdCol(
                         fac.AntdSelect(
                             id='market-stock-select',
-                            placeholder='请输入代码搜索',
-                            options=[
-                                {'label': '贵州茅台 (600519.SH)', 'value': '600519.SH'},
-                                {'label': '宁德时代 (300750.SZ)', 'value': '300750.SZ'},
-                                {'label': '平安银行 (000001.SZ)', 'value': '000001.SZ'}
-                            ],
-                            style={'width': 200},
+                            placeholder='输入代码/名称/拼音首字母搜索',
+                            # 选项由远程检索回调按输入动态生成
+                            options=[stock_search_index.format_option(DEFAULT_STOCK_CODE)],
+                            optionFilterMode='remote-match',
+                            debounceWait=150,
+                            style={'width': 260},
                             allowClear=False,
-                            defaultValue='600519.SH'
+                            defaultValue=DEFAULT_STOCK_CODE
                         ),
                         span=6
                     ),
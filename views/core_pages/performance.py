@@ -0,0 +1,60 @@
+import feffery_antd_components as fac
+import feffery_utils_components as fuc
+from feffery_dash_utils.style_utils import style
+from utils.performance_metrics import DEFAULT_BENCHMARK, DEFAULT_WINDOW
+
+# 可选基准指数
+BENCHMARK_OPTIONS = [
+    {'label': '沪深300', 'value': '000300.SH'},
+    {'label': '中证500', 'value': '000905.SH'},
+    {'label': '上证指数', 'value': '000001.SH'},
+    {'label': '创业板指', 'value': '399006.SZ'},
+]
+
+def _chart_card(title, chart_id, height='320px'):
+    return fac.AntdCard(
+        fuc.FefferyDiv(id=chart_id, style={'height': height, 'width': '100%'}),
+        title=title,
+        size='small',
+    )
+
+def render():
+    return fac.AntdSpace(
+        [
+            fac.AntdBreadcrumb(items=[{"title": "量化平台"}, {"title": "账户绩效"}]),
+            fuc.FefferyTimeout(id='performance-init-trigger', delay=0),
+
+            # 操作栏
+            fac.AntdSpace(
+                [
+                    fac.AntdText("基准："),
+                    fac.AntdSelect(
+                        id='performance-benchmark-select',
+                        options=BENCHMARK_OPTIONS,
+                        defaultValue=DEFAULT_BENCHMARK,
+                        allowClear=True,
+                        placeholder='不对比基准',
+                        style={'width': 140},
+                    ),
+                    fac.AntdText("滚动窗口："),
+                    fac.AntdRadioGroup(
+                        id='performance-window-select',
+                        options=[{'label': f'{n}日', 'value': n} for n in (20, 60, 120, 250)],
+                        defaultValue=DEFAULT_WINDOW,
+                        optionType='button',
+                    ),
+                    fac.AntdButton("重新构建快照", id='performance-rebuild-btn'),
+                ]
+            ),
+
+            # 核心指标
+            fac.AntdRow(id='performance-stats', gutter=[16, 16]),
+
+            _chart_card("净值曲线", 'performance-nav-chart', '380px'),
+            _chart_card("回撤", 'performance-drawdown-chart', '240px'),
+            _chart_card("滚动波动率 / 夏普", 'performance-rolling-chart'),
+            _chart_card("月度收益", 'performance-monthly-chart'),
+        ],
+        direction="vertical",
+        style=style(width="100%"),
+    )
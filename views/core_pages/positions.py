@@ -0,0 +1,51 @@
+import feffery_antd_components as fac
+import feffery_utils_components as fuc
+from feffery_dash_utils.style_utils import style
+
+def render():
+    cols = [
+        {'title': '代码', 'dataIndex': 'stock_code', 'width': 120},
+        {'title': '名称', 'dataIndex': 'stock_name', 'width': 120},
+        {'title': '策略', 'dataIndex': 'strategy_name', 'width': 150},
+        {'title': '持仓数量', 'dataIndex': 'quantity', 'width': 100},
+        {'title': '平均成本', 'dataIndex': 'avg_cost', 'width': 100},
+        {'title': 'FIFO成本', 'dataIndex': 'fifo_cost', 'width': 100},
+        {'title': '最新价', 'dataIndex': 'last_price', 'width': 100},
+        {'title': '市值', 'dataIndex': 'market_value', 'width': 120},
+        {'title': '浮动盈亏(平均)', 'dataIndex': 'unrealized_pnl_avg', 'width': 130},
+        {'title': '已实现盈亏(平均)', 'dataIndex': 'realized_pnl_avg', 'width': 140},
+        {'title': '已实现盈亏(FIFO)', 'dataIndex': 'realized_pnl_fifo', 'width': 140},
+        {'title': '累计费用', 'dataIndex': 'total_fees', 'width': 100},
+        {'title': '最近成交', 'dataIndex': 'last_trade_time', 'width': 180},
+    ]
+    return fac.AntdSpace(
+        [
+            fac.AntdBreadcrumb(items=[{"title": "量化平台"}, {"title": "持仓分析"}]),
+            fuc.FefferyTimeout(id='positions-init-trigger', delay=0),
+
+            # 操作栏
+            fac.AntdSpace(
+                [
+                    fac.AntdSwitch(id='positions-include-closed', checked=False),
+                    fac.AntdText("显示已清仓"),
+                    fac.AntdButton("刷新", id='positions-refresh-btn', icon=fac.AntdIcon(icon='antd-reload')),
+                    fac.AntdButton("重新回放成交", id='positions-rebuild-btn', danger=True),
+                    fac.AntdText(id='positions-summary', type='secondary'),
+                ]
+            ),
+
+            fac.AntdTable(
+                id='positions-table',
+                columns=cols,
+                data=[],
+                rowKey='key',
+                bordered=True,
+                filterOptions={'stock_code': {'filterMode': 'keyword'}, 'strategy_name': {'filterMode': 'checkbox'}},
+                sortOptions={'sortDataIndexes': ['quantity', 'market_value', 'unrealized_pnl_avg', 'realized_pnl_avg']},
+                pagination={'pageSize': 20},
+                size='small',
+            ),
+        ],
+        direction="vertical",
+        style=style(width="100%"),
+    )
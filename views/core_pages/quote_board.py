@@ -0,0 +1,44 @@
+from dash import dcc
+import feffery_antd_components as fac
+from feffery_dash_utils.style_utils import style
+from configs import BaseConfig
+
+def render():
+    cols = [
+        {'title': '代码', 'dataIndex': 'stock_code', 'width': 120},
+        {'title': '名称', 'dataIndex': 'stock_name', 'width': 120},
+        {'title': '最新价', 'dataIndex': 'last_price', 'width': 100},
+        {'title': '涨跌幅(%)', 'dataIndex': 'pct_change', 'width': 100},
+        {'title': '开盘', 'dataIndex': 'open', 'width': 100},
+        {'title': '最高', 'dataIndex': 'high', 'width': 100},
+        {'title': '最低', 'dataIndex': 'low', 'width': 100},
+        {'title': '昨收', 'dataIndex': 'last_close', 'width': 100},
+        {'title': '成交量', 'dataIndex': 'volume', 'width': 120},
+        {'title': '成交额', 'dataIndex': 'amount', 'width': 150},
+    ]
+    return fac.AntdSpace(
+        [
+            fac.AntdBreadcrumb(items=[{"title": "量化平台"}, {"title": "行情看板"}]),
+            # 客户端当前持有的看板版本，用于增量拉取
+            dcc.Store(id='quote-board-version-store'),
+            dcc.Interval(
+                id='quote-board-interval',
+                interval=BaseConfig.quote_board_interval * 1000,
+                n_intervals=0
+            ),
+            fac.AntdText(id='quote-board-status', type='secondary'),
+            fac.AntdTable(
+                id='quote-board-table',
+                columns=cols,
+                data=[],
+                rowKey='key',
+                bordered=True,
+                filterOptions={'stock_code': {'filterMode': 'keyword'}, 'stock_name': {'filterMode': 'keyword'}},
+                sortOptions={'sortDataIndexes': ['last_price', 'pct_change', 'volume', 'amount']},
+                pagination={'pageSize': 50},
+                size='small',
+            ),
+        ],
+        direction="vertical",
+        style=style(width="100%"),
+    )
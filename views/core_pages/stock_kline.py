@@ -1,43 +1,13 @@
 import dash
-import pandas as pd
 from yarl import URL
 from dash import dcc, html
 import feffery_antd_components as fac
 import feffery_utils_components as fuc
 from dash.dependencies import Input, Output, State, ClientsideFunction
 from server import app
-from models.market_models import KlineData  # 引用之前建立的模型
+from utils.stock_search import stock_search_index
 
 
-def get_kline_data_from_db(stock_code):
-    try:
-        # 查询数据库
-        query = KlineData.select().where(
-            (KlineData.stock_code == stock_code) & 
-            (KlineData.date >= '2022-01-01')
-        ).order_by(KlineData.date)
-        
-        df = pd.DataFrame(list(query.dicts()))
-        
-        if df.empty:
-            return {'code': 204, 'msg': 'data not found', 'data': []}
-
-        # 数据清洗适配
-        df['timestamp'] = (pd.to_datetime(df['date']) - pd.Timedelta(hours=8)).view("i8") // 10 ** 6
-        df = df.rename(columns={'amount': 'turnover'})
-        required_cols = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover']
-        for col in required_cols:
-            if col not in df.columns: df[col] = 0
-    
-        # print(df)
-        return {
-            'code': 200,
-            'msg': 'success',
-            'data': {'contract': stock_code, 'df': df[required_cols].to_dict('records')}
-        }
-    except Exception as e:
-        return {'code': 500, 'msg': str(e), 'data': []}
-
 # 设置模态框
 stock_line_SETTING_MODAL = fac.AntdModal(
     id='stock-line_modal_setting',
@@ -76,10 +46,12 @@ def render():
             # 顶部操作栏
             html.Div(
                 fac.AntdSpace([
-                    fac.AntdInput(
+                    fac.AntdSelect(
                         id='stock-line_input_contract',
-                        addonBefore='证券代码',
-                        placeholder='例如: 000001.SZ',
+                        placeholder='证券代码/名称/拼音首字母，例如: 000001',
+                        options=[],
+                        optionFilterMode='remote-match',
+                        debounceWait=150,
                         style={'width': '300px'},
                     ),
                     fac.AntdButton(
@@ -108,20 +80,34 @@ def render():
 # 1. 自动从URL读取参数并查询
 @app.callback(
     [Output('stock-line_input_contract', 'value'),
+     Output('stock-line_input_contract', 'options', allow_duplicate=True),
      Output('stock-line_search', 'nClicks')],
-    Input('core-url', 'href')
+    Input('core-url', 'href'),
+    prevent_initial_call='initial_duplicate'
 )
 def auto_search_from_url(current_url):
 
     parsed_url = URL(current_url)
     if 'code' in parsed_url.query:
         code = parsed_url.query.get('code')
-        return code, 1 # 自动填充并触发查询点击
+        return code, [stock_search_index.format_option(code)], 1 # 自动填充并触发查询点击
     else:
         return dash.no_update
     
 
-# 2. 执行数据查询
+# 2. 证券代码联想检索
+@app.callback(
+    Output('stock-line_input_contract', 'options'),
+    Input('stock-line_input_contract', 'debounceSearchValue'),
+    State('stock-line_input_contract', 'value'),
+    prevent_initial_call=True
+)
+def search_contract_options(keyword, current_value):
+    if not keyword: return dash.no_update
+    return stock_search_index.select_options(keyword, current_value)
+
+
+# 3. 执行数据查询
 @app.callback(
     Output('stock-line_store', 'data'),
     Input('stock-line_search', 'nClicks'),
@@ -130,9 +116,10 @@ def auto_search_from_url(current_url):
 )
 def execute_query(n_clicks, contract):
     if not contract: return dash.no_update
-    return get_kline_data_from_db(contract)
+    # 仅下发查询目标，图表数据由浏览器直接请求 /api/kline/<code> 获取 (可走304缓存)
+    return {'contract': contract, 'nonce': n_clicks}
 
-# 3. 客户端渲染图表 (复用 assets/js/kline_render.js 中的逻辑)
+# 4. 客户端渲染图表 (复用 assets/js/kline_render.js 中的逻辑)
 app.clientside_callback(
     ClientsideFunction(namespace="kline", function_name="renderChart"),
     Output("stock-line_kline_container", "children"),
@@ -153,7 +140,7 @@ app.clientside_callback(
     prevent_initial_call=True
 )
 
-# 4. 弹窗控制
+# 5. 弹窗控制
 app.clientside_callback(
     """function(n) { return n > 0; }""",
     Output('stock-line_modal_setting', 'visible'),